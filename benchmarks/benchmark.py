@@ -0,0 +1,760 @@
+#!/usr/bin/env python
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+# Copyright (C) 2022  Patrick Baus
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# ##### END GPL LICENSE BLOCK #####
+"""
+Performance benchmarks of the UGPlus driver using the emulated adapter. No hardware is required.
+
+Metrics ending in "_s" are times in seconds (lower is better), metrics ending in "_per_s" are rates (higher is better).
+Metrics ending in "_bytes" are memory sizes and metrics ending in "_blocks" are numbers of memory blocks (lower is
+better). Results can be saved and compared against a previous run to detect regressions.
+
+The package must be importable, so either install it using `pip install -e .` or run the benchmarks from the root of
+the repository with `PYTHONPATH=.` set.
+
+Usage:
+    python benchmarks/benchmark.py --save results.json
+    python benchmarks/benchmark.py --compare results.json
+    python benchmarks/benchmark.py startup small_query  # Run selected benchmarks only
+"""
+
+import argparse
+import asyncio
+import contextlib
+import functools
+import io
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+from ug_gpib import (
+    AdapterLocationCache,
+    AdapterPool,
+    AsyncUGPlusGpib,
+    BusTopology,
+    CancellationToken,
+    OperationCancelled,
+    Priority,
+    QueryCache,
+    RecoveryPolicy,
+    ReplayDevice,
+    SharedUGPlusGpib,
+    TransferRecorder,
+    UGPlusGpib,
+    UGPlusGpibClient,
+    __version__,
+)
+from ug_gpib.acquisition import AcquisitionEngine, AcquisitionRun, Channel
+from ug_gpib.cli import main as cli_main
+from ug_gpib.codec import FIRMWARE_1_0, FrameCodec, UgPlusCommands
+from ug_gpib.emulator import EmulatedInstrument, EmulatedUGPlus
+from ug_gpib.server import GpibServer
+
+BENCHMARKS: dict[str, Callable[[], dict[str, float]]] = {}
+
+# Results more than this fraction worse than the baseline are reported as regressions
+REGRESSION_THRESHOLD = 0.1
+
+
+def benchmark(func: Callable[[], dict[str, float]]) -> Callable[[], dict[str, float]]:
+    """Register a benchmark."""
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def time_per_call(func: Callable[[], Any], number: int, repeat: int = 3) -> float:
+    """Return the best time per call in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def cpu_time_per_call(func: Callable[[], Any], number: int) -> float:
+    """Return the CPU time of the process per call in seconds."""
+    start = time.process_time()
+    for _ in range(number):
+        func()
+    return (time.process_time() - start) / number
+
+
+def echo(data: bytes) -> bytes:
+    """An instrument reply, that echoes the data written."""
+    return data
+
+
+def connect(*instruments: tuple[int, EmulatedInstrument], **kwargs: Any) -> tuple[UGPlusGpib, EmulatedUGPlus]:
+    """Create an emulated adapter with the given instruments and connect to it."""
+    adapter = EmulatedUGPlus(instruments=dict(instruments), **kwargs)
+    return UGPlusGpib(timeout=1, devices=[adapter]), adapter
+
+
+def resident_memory() -> int:
+    """Return the resident memory of the process in bytes. Only supported on Linux."""
+    with open("/proc/self/statm", encoding="ascii") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def import_time(statement: str, repeat: int = 5) -> float:
+    """Return the best time in seconds to run an import statement in a new interpreter."""
+    code = f"import time; start = time.perf_counter(); {statement}; print(time.perf_counter() - start)"
+    environment = dict(os.environ, PYTHONPATH=str(Path(__file__).resolve().parent.parent))
+    return min(
+        float(
+            subprocess.run(
+                [sys.executable, "-c", code], check=True, capture_output=True, text=True, env=environment
+            ).stdout
+        )
+        for _ in range(repeat)
+    )
+
+
+def binary_block(length: int) -> bytes:
+    """Create an IEEE 488.2 definite length block followed by a line feed."""
+    length_field = str(length).encode()
+    return b"#" + str(len(length_field)).encode() + length_field + bytes(length) + b"\n"
+
+
+@benchmark
+def startup() -> dict[str, float]:
+    """Constructor time with other devices on the bus, without and with the location cache."""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        cache = AdapterLocationCache(Path(directory) / "cache.json")
+
+        def devices() -> list[EmulatedUGPlus]:
+            # The adapter we are looking for is the last one enumerated
+            return [EmulatedUGPlus(series=series, port_numbers=(series,)) for series in range(1, 8)] + [
+                EmulatedUGPlus(port_numbers=(8,))
+            ]
+
+        results["cold_s"] = time_per_call(lambda: UGPlusGpib(devices=devices()), 3)
+        UGPlusGpib(devices=devices(), location_cache=cache)
+        results["warm_cached_s"] = time_per_call(lambda: UGPlusGpib(devices=devices(), location_cache=cache), 3)
+    return results
+
+
+@benchmark
+def lazy_startup() -> dict[str, float]:
+    """Import time of the package and time to the first reply with eager and lazy connections."""
+    results = {
+        "import_package_s": import_time("import ug_gpib"),
+        "import_driver_s": import_time("from ug_gpib import UGPlusGpib"),
+        "import_pyusb_s": import_time("import usb.core, usb.util"),
+    }
+    instrument = EmulatedInstrument(echo)
+
+    def first_query(mode: str) -> None:
+        gpib = UGPlusGpib(devices=[EmulatedUGPlus(instruments={9: instrument})], connect=mode)  # type: ignore[arg-type]
+        gpib.query(9, b"*IDN?\n")
+
+    results["lazy_construct_s"] = time_per_call(
+        lambda: UGPlusGpib(devices=[EmulatedUGPlus(instruments={9: instrument})], connect="lazy"), 100
+    )
+    results["eager_first_query_s"] = time_per_call(lambda: first_query("eager"), 100)
+    results["lazy_first_query_s"] = time_per_call(lambda: first_query("lazy"), 100)
+    return results
+
+
+@benchmark
+def small_query() -> dict[str, float]:
+    """Latency of a short query and of the adapter commands. The query cache is disabled to time the bus access."""
+    gpib = UGPlusGpib(
+        timeout=1,
+        devices=[EmulatedUGPlus(instruments={9: EmulatedInstrument(b"KEITHLEY INSTRUMENTS,MODEL 2002\n")})],
+        query_cache=QueryCache(max_entries=0),
+    )
+    return {
+        "query_s": time_per_call(lambda: gpib.query(9, b"*IDN?\n"), 2000),
+        "version_s": time_per_call(gpib.version, 2000),
+        "get_gpib_devices_s": time_per_call(gpib.get_gpib_devices, 2000),
+    }
+
+
+@benchmark
+def large_reply() -> dict[str, float]:
+    """Throughput of long replies read into a NumPy array."""
+    results = {}
+    for size in (1_000, 10_000, 100_000, 1_000_000):
+        gpib, _ = connect((9, EmulatedInstrument(binary_block(size))))
+
+        def read_block(gpib: UGPlusGpib = gpib) -> None:
+            gpib.write(9, b"CURV?\n")
+            gpib.read_binary_block(9)
+
+        results[f"block_{size}_bytes_per_s"] = size / time_per_call(read_block, max(1, 100_000 // size), repeat=2)
+    return results
+
+
+def legacy_read_message(adapter: EmulatedUGPlus, pad: int, out: bytearray) -> None:
+    """
+    Read the output of an instrument into a buffer using the receive buffer of the driver before the preallocated
+    window: each USB packet is appended to a growing bytearray, each frame is copied out and the rest of the buffer is
+    shifted down.
+    """
+    buffer = bytearray()
+
+    def usb_read(length: int) -> bytes:
+        while len(buffer) < length:
+            buffer.extend(adapter.read_transfer(adapter.read_ep.wMaxPacketSize, 1000))
+        data = bytes(buffer[0:length])
+        del buffer[0:length]
+        return data
+
+    position = 0
+    while True:
+        adapter.write_ep.write(bytes((UgPlusCommands.READ, 4, pad, 0x0F)))
+        _, length = usb_read(2)
+        payload = usb_read(length - 2)
+        if payload[1] == 0x0A:
+            # The instrument has no more output
+            return
+        data = payload[2:]
+        out[position : position + len(data)] = data
+        position += len(data)
+
+
+def traced_allocations(func: Callable[[], Any]) -> tuple[int, int]:
+    """
+    Return the peak of the memory allocated while running a function in bytes and the number of memory blocks allocated
+    by it, that are still alive afterward.
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "filename"))
+    return peak - current, blocks
+
+
+@benchmark
+def allocations() -> dict[str, float]:
+    """
+    Peak memory and retained memory blocks when reading replies of 1 kB to 1 MB into a preallocated buffer. The driver
+    with its preallocated receive window is compared with a bare read loop using the growing receive buffer, that the
+    window replaced. Neither may grow with the size of the reply. The driver also allocates for its metrics and the
+    write of the read request.
+    """
+    results: dict[str, float] = {}
+    for size in (1_000, 100_000, 1_000_000):
+        instrument = EmulatedInstrument(binary_block(size))
+        adapter = EmulatedUGPlus(instruments={9: instrument}, firmware_version=(1, 1))
+        gpib = UGPlusGpib(timeout=1, devices=[adapter])
+        out = bytearray(len(binary_block(size)))
+        label = f"{size // 1000}kB"
+        # Warm up, so that lazily created objects of the driver are not counted
+        gpib.query(9, b"CURV?\n")
+
+        gpib.write(9, b"CURV?\n")
+        peak, blocks = traced_allocations(functools.partial(gpib.read_binary_block, 9, out=out))
+        results[f"window_{label}_peak_bytes"] = peak
+        results[f"window_{label}_blocks"] = blocks
+
+        instrument.handle_write(b"CURV?\n")
+        peak, blocks = traced_allocations(functools.partial(legacy_read_message, adapter, 9, out))
+        results[f"legacy_{label}_peak_bytes"] = peak
+        results[f"legacy_{label}_blocks"] = blocks
+        gpib.close()
+    return results
+
+
+@benchmark
+def cpu_overhead() -> dict[str, float]:
+    """CPU time per query with logging disabled and metrics enabled."""
+    gpib, _ = connect((9, EmulatedInstrument(echo)))
+    return {"query_cpu_s": cpu_time_per_call(lambda: gpib.query(9, b"MEAS?\n"), 5000)}
+
+
+@benchmark
+def batched_query() -> dict[str, float]:
+    """Time per query when sending 100 queries one by one or batched."""
+    gpib, _ = connect((9, EmulatedInstrument(echo)), usb_latency=0.0002)
+    commands = [b"MEAS%d?\n" % i for i in range(100)]
+    return {
+        "sequential_s": time_per_call(lambda: [gpib.query(9, command) for command in commands], 5) / 100,
+        "query_many_s": time_per_call(lambda: gpib.query_many(9, commands), 5) / 100,
+    }
+
+
+@benchmark
+def adaptive_read() -> dict[str, float]:
+    """Query latency of an instrument with a 5 ms response time with a fixed, safe delay and with adaptive reads."""
+    gpib, _ = connect((9, EmulatedInstrument(echo, delay=0.005)))
+    results = {"fixed_delay_s": time_per_call(lambda: gpib.query(9, b"MEAS?\n", delay=0.02), 20)}
+    results["adaptive_s"] = time_per_call(lambda: gpib.query(9, b"MEAS?\n", adaptive=True), 20)
+    return results
+
+
+def naive_query_values(gpib: UGPlusGpib, pad: int, data: bytes) -> list[float]:
+    """Query comma separated ASCII values by reading until the termination and using str.split() and float()."""
+    gpib.write(pad, data)
+    message = bytearray()
+    while not message.endswith(b"\n"):
+        message += gpib.read(pad) or b""
+    return [float(value) for value in message.decode().split(",")]
+
+
+@benchmark
+def ascii_values() -> dict[str, float]:
+    """Querying comma separated ASCII values with query_values() and with read(), str.split() and float()."""
+    results = {}
+    for count in (10_000, 100_000, 1_000_000):
+        message = b",".join(b"%.6e" % value for value in np.random.default_rng(0).random(count)) + b"\n"
+        gpib, _ = connect((9, EmulatedInstrument(message)))
+        number = max(100_000 // count, 1)
+        results[f"query_values_{count}_values_s"] = time_per_call(
+            lambda gpib=gpib: gpib.query_values(9, b"TRAC:DATA?\n"), number  # type: ignore[misc]
+        )
+        results[f"naive_{count}_values_s"] = time_per_call(
+            lambda gpib=gpib: naive_query_values(gpib, 9, b"TRAC:DATA?\n"), number  # type: ignore[misc]
+        )
+        gpib.close()
+    return results
+
+
+@benchmark
+def shared_controller() -> dict[str, float]:
+    """Control loop query latency while a background thread floods the adapter with low priority queries."""
+    gpib, _ = connect((9, EmulatedInstrument(echo)), (10, EmulatedInstrument(echo)))
+    with SharedUGPlusGpib(gpib) as shared:
+        stop = threading.Event()
+
+        def background() -> None:
+            while not stop.is_set():
+                futures = [shared.query(10, b"LOG?\n", priority=Priority.LOW) for _ in range(100)]
+                futures[-1].result()
+
+        thread = threading.Thread(target=background)
+        thread.start()
+        latencies = []
+        try:
+            for _ in range(200):
+                start = time.perf_counter()
+                shared.query(9, b"CTRL?\n", priority=Priority.HIGH).result()
+                latencies.append(time.perf_counter() - start)
+        finally:
+            stop.set()
+            thread.join()
+    latencies.sort()
+    return {"control_median_s": statistics.median(latencies), "control_p99_s": latencies[int(len(latencies) * 0.99)]}
+
+
+@benchmark
+def server_overhead() -> dict[str, float]:
+    """Query latency through the Unix socket server compared to direct calls."""
+    adapter = EmulatedUGPlus(instruments={9: EmulatedInstrument(echo)})
+    direct = UGPlusGpib(devices=[adapter])
+    results = {"direct_s": time_per_call(lambda: direct.query(9, b"MEAS?\n"), 1000)}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "ug_gpib.sock"
+        started = threading.Event()
+        loop = asyncio.new_event_loop()
+
+        async def serve() -> None:
+            async with AsyncUGPlusGpib(devices=[adapter]) as gpib:
+                server = GpibServer(gpib, path)
+                await server.start()
+                started.set()
+                await server.serve_forever()
+
+        task = loop.create_task(serve())
+
+        def run_server() -> None:
+            with contextlib.suppress(asyncio.CancelledError):
+                loop.run_until_complete(task)
+
+        thread = threading.Thread(target=run_server)
+        thread.start()
+        started.wait()
+        try:
+            with UGPlusGpibClient(path) as client:
+                results["client_s"] = time_per_call(lambda: client.query(9, b"MEAS?\n"), 1000)
+                results["client_pipelined_s"] = (
+                    time_per_call(lambda: client.query_many(9, [b"MEAS?\n"] * 100), 10) / 100
+                )
+        finally:
+            loop.call_soon_threadsafe(task.cancel)
+            thread.join()
+            loop.close()
+    return results
+
+
+@benchmark
+def capture_overhead() -> dict[str, float]:
+    """Query latency with and without recording the USB transfers and the time to replay the recording."""
+    gpib, _ = connect((9, EmulatedInstrument(echo)))
+    results = {"query_s": time_per_call(lambda: gpib.query(9, b"MEAS?\n"), 2000)}
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "capture.ugcap"
+        with TransferRecorder(path) as recorder:
+            # Record from the start, so that the replay includes the enumeration
+            recorded = UGPlusGpib(
+                devices=[EmulatedUGPlus(instruments={9: EmulatedInstrument(echo)})], recorder=recorder
+            )
+            results["recorded_query_s"] = time_per_call(lambda: recorded.query(9, b"MEAS?\n"), 2000, repeat=1)
+
+        def replay() -> None:
+            replayed = UGPlusGpib(devices=[ReplayDevice(path, speed=float("inf"))])
+            for _ in range(2000):
+                replayed.query(9, b"MEAS?\n")
+
+        results["replayed_query_s"] = time_per_call(replay, 1, repeat=1) / 2000
+    return results
+
+
+@benchmark
+def identity_cache() -> dict[str, float]:
+    """Latency of identity queries with the query cache disabled and enabled."""
+    results = {}
+    for name, cache in (("uncached", QueryCache(max_entries=0)), ("cached", QueryCache())):
+        cache.register(9, b"*IDN?\n")
+        gpib = UGPlusGpib(
+            devices=[EmulatedUGPlus(instruments={9: EmulatedInstrument(b"KEITHLEY INSTRUMENTS,MODEL 2002\n")})],
+            query_cache=cache,
+        )
+        results[f"{name}_idn_s"] = time_per_call(lambda gpib=gpib: gpib.query(9, b"*IDN?\n"), 2000)  # type: ignore[misc]
+        results[f"{name}_version_s"] = time_per_call(gpib.version, 2000)
+    return results
+
+
+@benchmark
+def topology() -> dict[str, float]:
+    """Time to get the devices on the bus by scanning and from the bus topology tracker."""
+    gpib, _ = connect((9, EmulatedInstrument(echo)), (10, EmulatedInstrument(echo)))
+    with SharedUGPlusGpib(gpib) as shared, BusTopology(shared) as tracker:
+        tracker.wait_for_scan()
+        return {
+            "scan_s": time_per_call(lambda: shared.get_gpib_devices().result(), 1000),
+            "tracked_s": time_per_call(lambda: tracker.devices, 1000),
+        }
+
+
+@benchmark
+def cli_stream() -> dict[str, float]:
+    """Throughput of the command line tool executing a command file of 1000 queries and 100 writes."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "commands.txt"
+        path.write_bytes(b"".join(b"SET %d\n" % i + b"MEAS?\n" * 10 for i in range(100)))
+
+        def run() -> None:
+            adapter = EmulatedUGPlus(instruments={9: EmulatedInstrument(echo)})
+            with open(os.devnull, "wb") as null, contextlib.redirect_stdout(io.TextIOWrapper(null)):
+                with contextlib.redirect_stderr(io.StringIO()):
+                    cli_main(["stream", "9", str(path)], devices=[adapter])
+
+        return {"commands_per_s": 1100 / time_per_call(run, 1)}
+
+
+@benchmark
+def framing_recovery() -> dict[str, float]:
+    """
+    Fuzz the reply stream with random garbage before each query and measure how often and how fast the driver
+    resynchronizes. The query after each corrupted one must always succeed.
+    """
+    adapter = EmulatedUGPlus(instruments={9: EmulatedInstrument(echo)})
+    gpib = UGPlusGpib(timeout=0.2, devices=[adapter])
+    rng = random.Random(0)
+    recovered = poisoned = 0
+    elapsed = 0.0
+    logging.disable(logging.ERROR)  # Framing errors are logged
+    try:
+        for i in range(200):
+            adapter.inject(rng.randbytes(rng.randrange(1, 300)))
+            command = b"MEAS%d?\n" % i
+            start = time.perf_counter()
+            with contextlib.suppress(OSError):
+                recovered += gpib.query(9, command) == command
+            elapsed += time.perf_counter() - start
+            try:
+                poisoned += gpib.query(9, command) != command
+            except OSError:
+                poisoned += 1
+    finally:
+        logging.disable(logging.NOTSET)
+    assert poisoned == 0, f"{poisoned} queries failed after a corrupted query"
+    return {"recovered_ratio": recovered / 200, "corrupted_query_s": elapsed / 200}
+
+
+@benchmark
+def unplug_recovery() -> dict[str, float]:
+    """
+    Unplug the adapter for 50 ms before a query and measure the time the driver needs to notice that the adapter is back
+    beyond the outage itself. Also compare reconnecting to the last location with enumerating eight adapters.
+    """
+    outage = 0.05
+    others = [EmulatedUGPlus(series=series, port_numbers=(series,)) for series in range(1, 8)]
+    adapter = EmulatedUGPlus(instruments={9: EmulatedInstrument(echo)}, port_numbers=(8,))
+    gpib = UGPlusGpib(timeout=1, devices=[*others, adapter], recovery=RecoveryPolicy(initial_backoff=0.001))
+    logging.disable(logging.WARNING)  # The lost connections are logged
+    try:
+        for i in range(20):
+            adapter.unplug(outage)
+            command = b"MEAS%d?\n" % i
+            with contextlib.suppress(OSError):
+                gpib.query(9, command)  # The query is lost, but the driver reconnects
+            assert gpib.query(9, command) == command
+    finally:
+        logging.disable(logging.NOTSET)
+    stats = gpib.recovery.stats()
+    assert stats.reconnects == 20
+
+    def reconnect() -> None:
+        gpib.close()
+        gpib.connect()
+
+    def enumerate_all() -> None:
+        UGPlusGpib(timeout=1, devices=[*others, adapter]).close()
+
+    return {
+        "recovery_overhead_s": stats.downtime / stats.reconnects - outage,
+        "reconnect_s": time_per_call(reconnect, 100),
+        "enumerate_s": time_per_call(enumerate_all, 100),
+    }
+
+
+@benchmark
+def deadlines() -> dict[str, float]:
+    """
+    Overshoot of a 10 ms per-call timeout on an instrument, that answers after 200 ms, and the time between cancelling
+    a read from another thread and the call returning. Every aborted query is followed by a query to another
+    instrument, which must not receive the late reply.
+    """
+    gpib, _ = connect((9, EmulatedInstrument(b"PASS\n", delay=0.2)), (10, EmulatedInstrument(echo)))
+    overshoots = []
+    cancel_latencies = []
+    logging.disable(logging.ERROR)  # The timeouts are logged
+    try:
+        for i in range(10):
+            start = time.perf_counter()
+            assert gpib.query(9, b"*TST?\n", timeout=0.01) is None
+            overshoots.append(time.perf_counter() - start - 0.01)
+            command = b"MEAS%d?\n" % i
+            assert gpib.query(10, command) == command
+
+            token = CancellationToken()
+            cancelled = 0.0
+
+            def cancel(token: CancellationToken = token) -> None:
+                nonlocal cancelled
+                cancelled = time.perf_counter()
+                token.cancel()
+
+            timer = threading.Timer(0.03, cancel)
+            timer.start()
+            with contextlib.suppress(OperationCancelled):
+                gpib.query(9, b"*TST?\n", cancel=token)
+            cancel_latencies.append(time.perf_counter() - cancelled)
+            timer.join()
+            assert gpib.query(10, command) == command
+    finally:
+        logging.disable(logging.NOTSET)
+    return {
+        "deadline_overshoot_s": statistics.median(overshoots),
+        "cancel_latency_s": statistics.median(cancel_latencies),
+    }
+
+
+@benchmark
+def pool_scaling() -> dict[str, float]:
+    """
+    Query throughput of an adapter pool with 1, 2, 4 and 8 adapters. Each adapter answers after 1 ms, so the throughput
+    only scales if the transfers on different buses overlap. The efficiency is the throughput with 8 adapters divided
+    by 8 times the throughput of a single adapter.
+    """
+    queries = 200
+    results = {}
+    for count in (1, 2, 4, 8):
+        adapters = [
+            EmulatedUGPlus(
+                series=series, port_numbers=(series,), instruments={9: EmulatedInstrument(echo)}, usb_latency=0.001
+            )
+            for series in range(1, count + 1)
+        ]
+        with AdapterPool(adapters, timeout=1) as pool:
+
+            def run(pool: AdapterPool = pool) -> None:
+                futures = [pool.query((series, 9), b"MEAS?\n") for series in pool for _ in range(queries)]
+                for future in futures:
+                    future.result()
+
+            results[f"queries_per_s_{count}"] = count * queries / time_per_call(run, 1)
+    results["efficiency_8"] = results["queries_per_s_8"] / (8 * results["queries_per_s_1"])
+    return results
+
+
+@benchmark
+def acquisition() -> dict[str, float]:
+    """
+    Sustained sample rate of the acquisition engine polling four channels as fast as possible, the growth of the
+    resident memory between the first and the third second of the run and the time to load a channel of the run.
+    """
+    instruments = [EmulatedInstrument(b"+1.234567E+00\n"), EmulatedInstrument(b"-9.87E-03\n")]
+    gpib, _ = connect((9, instruments[0]), (10, instruments[1]))
+    channels = [Channel(f"channel{i}", 9 + i % 2, b"MEAS?\n", 0) for i in range(4)]
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        # Use small windows to include remapping the files in the measurement
+        with AcquisitionEngine(gpib, channels, directory, window_records=4096) as engine:
+            engine.start()
+            memory = 0
+            samples = 0
+            start = time.perf_counter()
+            for i in range(30):
+                time.sleep(0.1)
+                # The emulated instruments keep all commands received
+                for instrument in instruments:
+                    instrument.received.clear()
+                if i == 9:
+                    memory = resident_memory() if sys.platform == "linux" else 0
+                    samples = engine.samples
+                    start = time.perf_counter()
+            results["samples_per_s"] = (engine.samples - samples) / (time.perf_counter() - start)
+            if sys.platform == "linux":
+                results["memory_growth_bytes"] = max(resident_memory() - memory, 0)
+        run = AcquisitionRun(directory)
+        results["load_s"] = time_per_call(lambda: float(run.values("channel0").mean()), 10)
+    return results
+
+
+@benchmark
+def upload() -> dict[str, float]:
+    """
+    Throughput of uploading a waveform of 10 kB to 10 MB to an instrument, from memory using `write()` and from a file
+    using `write_stream()`. The uploads are split into frames by the driver.
+    """
+    instrument = EmulatedInstrument()
+    gpib, _ = connect((9, instrument))
+    results = {}
+    for size, label in ((10_000, "10kB"), (100_000, "100kB"), (1_000_000, "1MB"), (10_000_000, "10MB")):
+        data = random.Random(size).randbytes(size)
+        number = max(10_000_000 // size, 1)
+
+        def write(data: bytes = data) -> None:
+            gpib.write(9, data)
+            instrument.received.clear()
+
+        results[f"write_{label}_bytes_per_s"] = size / time_per_call(write, number)
+    with tempfile.TemporaryFile() as file:
+        file.write(data)
+
+        def write_file() -> None:
+            file.seek(0)
+            gpib.write_stream(9, file)
+            instrument.received.clear()
+
+        results["stream_10MB_bytes_per_s"] = len(data) / time_per_call(write_file, 1)
+    return results
+
+
+@benchmark
+def codec() -> dict[str, float]:
+    """Encoding and decoding rate of the frame codec. The codec is fuzzed by the test suite, see tests/test_codec.py."""
+    frame_codec = FrameCodec(FIRMWARE_1_0)
+    replies = b"".join(frame_codec.encode(UgPlusCommands.READ, bytes((9, 0)) + b"+1.234567E+00\n") for _ in range(1000))
+    buffer = bytearray()
+
+    def encode() -> None:
+        buffer.clear()
+        for _ in range(1000):
+            frame_codec.encode_into(buffer, UgPlusCommands.WRITE, b"\x09\x0fMEAS?\n", aligned=True)
+
+    return {
+        "encode_frames_per_s": 1000 / time_per_call(encode, 20),
+        "decode_frames_per_s": 1000 / time_per_call(lambda: list(frame_codec.iter_frames(replies)), 20),
+    }
+
+
+def compare(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]]) -> bool:
+    """Print the change of every metric relative to the baseline. Returns False if there are regressions."""
+    success = True
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            reference = baseline.get(name, {}).get(metric)
+            if not reference:
+                continue
+            ratio = value / reference
+            if metric.endswith(("_bytes", "_blocks")) or (metric.endswith("_s") and not metric.endswith("_per_s")):
+                regression = ratio > 1 + REGRESSION_THRESHOLD
+            else:
+                regression = ratio < 1 - REGRESSION_THRESHOLD
+            success &= not regression
+            print(f"{name}.{metric}: {ratio:.2f}x baseline{' REGRESSION' if regression else ''}")
+    return success
+
+
+def main() -> int:
+    """Run the benchmarks and optionally save or compare the results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("benchmarks", nargs="*", help=f"The benchmarks to run: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--save", type=Path, help="Save the results to this file")
+    parser.add_argument("--compare", type=Path, help="Compare the results to a previously saved file")
+    arguments = parser.parse_args()
+    unknown = set(arguments.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = {}
+    for name in arguments.benchmarks or BENCHMARKS:
+        results[name] = BENCHMARKS[name]()
+        for metric, value in results[name].items():
+            print(f"{name}.{metric}: {value:.6g}")
+
+    if arguments.save:
+        with open(arguments.save, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "version": __version__,
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "results": results,
+                },
+                file,
+                indent=2,
+            )
+    if arguments.compare:
+        with open(arguments.compare, encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+        return 0 if compare(results, baseline) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+Shared fixtures of the test suite. All tests run against the emulated adapter in `ug_gpib.emulator`.
+"""
+
+# pylint: disable=redefined-outer-name
+
+from __future__ import annotations
+
+from typing import Any, Callable, Iterator
+
+import pytest
+
+from ug_gpib import UGPlusGpib
+from ug_gpib.emulator import EmulatedInstrument, EmulatedUGPlus
+
+
+def pytest_collection_modifyitems(items: list[pytest.Item]) -> None:
+    """Move the tests marked as slow to the end of the test run."""
+    items.sort(key=lambda item: item.get_closest_marker("slow") is not None)
+
+
+@pytest.fixture
+def instrument() -> EmulatedInstrument:
+    """An instrument at pad 9, that echoes every message."""
+    return EmulatedInstrument(reply=lambda data: data)
+
+
+@pytest.fixture
+def adapter(instrument: EmulatedInstrument) -> EmulatedUGPlus:
+    """An emulated adapter with the instrument attached at pad 9."""
+    return EmulatedUGPlus(instruments={9: instrument})
+
+
+@pytest.fixture
+def make_gpib() -> Iterator[Callable[..., UGPlusGpib]]:
+    """A factory creating drivers, that are closed after the test."""
+    drivers: list[UGPlusGpib] = []
+
+    def factory(*devices: EmulatedUGPlus, **kwargs: Any) -> UGPlusGpib:
+        kwargs.setdefault("timeout", 1)
+        gpib = UGPlusGpib(devices=list(devices), **kwargs)  # type: ignore[arg-type]
+        drivers.append(gpib)
+        return gpib
+
+    yield factory
+    for gpib in drivers:
+        gpib.close()
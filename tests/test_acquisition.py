@@ -0,0 +1,87 @@
+"""
+Tests of the acquisition engine logging to memory-mapped channel files.
+"""
+
+# pylint: disable=missing-function-docstring,redefined-outer-name
+
+from __future__ import annotations
+
+import math
+import time
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from ug_gpib import AcquisitionEngine, AcquisitionRun, Channel, UGPlusGpib
+from ug_gpib.emulator import EmulatedInstrument, EmulatedUGPlus
+
+GpibFactory = Callable[..., UGPlusGpib]
+
+
+@pytest.fixture
+def gpib(make_gpib: GpibFactory) -> UGPlusGpib:
+    instruments = {
+        2: EmulatedInstrument(reply=b"1.5\n"),
+        5: EmulatedInstrument(reply=b"garbage\n"),
+    }
+    return make_gpib(EmulatedUGPlus(instruments=instruments))
+
+
+def test_run(gpib: UGPlusGpib, tmp_path: Path) -> None:
+    numpy = pytest.importorskip("numpy")
+    channels = [Channel("voltage", 2, b"VOLT?\n", interval=0.01), Channel("missing", 7, b"X?\n", interval=0.01)]
+    with AcquisitionEngine(gpib, channels, tmp_path) as engine:
+        engine.run(duration=0.2)
+    assert engine.samples > 10
+
+    run = AcquisitionRun(tmp_path)
+    assert run.channels == ("voltage", "missing")
+    values = run.values("voltage")
+    assert len(values) > 5
+    assert numpy.all(values == 1.5)
+    assert numpy.all(numpy.diff(run.timestamps("voltage")) > 0)
+    # The device at pad 7 does not exist
+    assert numpy.all(numpy.isnan(run.values("missing")))
+    assert engine.channel_errors == {"voltage": 0, "missing": len(run.values("missing"))}
+
+
+def failing_parser(reply: bytes) -> float:
+    # Fails with an IndexError instead of a ValueError
+    return float(reply.split(b",")[1])
+
+
+def test_parser_errors(gpib: UGPlusGpib, tmp_path: Path) -> None:
+    channels = [
+        Channel("index_error", 2, b"VOLT?\n", interval=0.01, parser=failing_parser),
+        Channel("value_error", 5, b"X?\n", interval=0.01),
+        Channel("good", 2, b"VOLT?\n", interval=0.01),
+    ]
+    with AcquisitionEngine(gpib, channels, tmp_path) as engine:
+        engine.start()
+        time.sleep(0.2)
+        assert engine.running
+        engine.stop()
+    assert not engine.running
+    assert engine.channel_errors["index_error"] > 5
+    assert engine.channel_errors["value_error"] > 5
+    assert engine.channel_errors["good"] == 0
+    assert engine.errors == engine.channel_errors["index_error"] + engine.channel_errors["value_error"]
+    assert all(math.isnan(value) for value in AcquisitionRun(tmp_path).values("index_error"))
+
+
+def test_fatal_error_is_raised_by_stop(gpib: UGPlusGpib, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def broken_query_batch(*args: object, **kwargs: object) -> None:
+        raise RuntimeError("test")
+
+    engine = AcquisitionEngine(gpib, [Channel("voltage", 2, b"VOLT?\n", interval=0.01)], tmp_path)
+    monkeypatch.setattr(gpib, "query_batch", broken_query_batch)
+    engine.start()
+    deadline = time.monotonic() + 2
+    while engine.running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not engine.running
+    with pytest.raises(RuntimeError):
+        engine.close()
+    # The error is raised once
+    engine.stop()
@@ -0,0 +1,108 @@
+"""
+Tests of the asyncio driver against the emulated adapter.
+"""
+
+# pylint: disable=missing-function-docstring
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from ug_gpib import AsyncUGPlusGpib
+from ug_gpib.emulator import EmulatedInstrument, EmulatedUGPlus
+
+
+def counter_instrument(delay: float = 0.0) -> EmulatedInstrument:
+    """An instrument, that answers every message with a running number."""
+    count = 0
+
+    def reply(_data: bytes) -> bytes:
+        nonlocal count
+        count += 1
+        return f"{count}\n".encode()
+
+    return EmulatedInstrument(reply=reply, delay=delay)
+
+
+def test_query(adapter: EmulatedUGPlus) -> None:
+    async def main() -> tuple[bytes | None, tuple[int, int]]:
+        async with AsyncUGPlusGpib(timeout=1, devices=[adapter]) as gpib:
+            return await gpib.query(9, b"*IDN?\n"), await gpib.version()
+
+    assert asyncio.run(main()) == (b"*IDN?\n", (1, 0))
+
+
+def test_write_read(adapter: EmulatedUGPlus, instrument: EmulatedInstrument) -> None:
+    async def main() -> bytes | None:
+        async with AsyncUGPlusGpib(timeout=1, devices=[adapter]) as gpib:
+            await gpib.write(9, b"MEAS?\n")
+            return await gpib.read(9)
+
+    assert asyncio.run(main()) == b"MEAS?\n"
+    assert instrument.received == [b"MEAS?\n"]
+
+
+def test_concurrent_queries(adapter: EmulatedUGPlus) -> None:
+    async def main() -> list[bytes | None]:
+        async with AsyncUGPlusGpib(timeout=1, devices=[adapter]) as gpib:
+            return await asyncio.gather(*(gpib.query(9, f"Q{i}\n".encode()) for i in range(20)))
+
+    assert asyncio.run(main()) == [f"Q{i}\n".encode() for i in range(20)]
+
+
+def test_not_connected() -> None:
+    async def main() -> None:
+        await AsyncUGPlusGpib().query(9, b"*IDN?\n")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(main())
+
+
+def test_cancelled_query_does_not_leak_reply() -> None:
+    adapter = EmulatedUGPlus(instruments={9: counter_instrument(delay=0.2)}, firmware_version=(1, 1))
+
+    async def main() -> bytes | None:
+        async with AsyncUGPlusGpib(timeout=1, devices=[adapter]) as gpib:
+            task = asyncio.create_task(gpib.query(9, b"N?\n"))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            # The reply to the cancelled query must not be returned to the next caller
+            return await gpib.query(9, b"N?\n")
+
+    assert asyncio.run(main()) == b"2\n"
+
+
+def test_cancelled_read_does_not_leak_reply() -> None:
+    adapter = EmulatedUGPlus(instruments={9: counter_instrument(delay=0.2)}, firmware_version=(1, 1))
+
+    async def main() -> bytes | None:
+        async with AsyncUGPlusGpib(timeout=1, devices=[adapter]) as gpib:
+            await gpib.write(9, b"N?\n")
+            task = asyncio.create_task(gpib.read(9))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return await gpib.query(9, b"N?\n")
+
+    assert asyncio.run(main()) == b"2\n"
+
+
+def test_timeout_is_passed_to_the_driver() -> None:
+    adapter = EmulatedUGPlus(instruments={9: counter_instrument(delay=0.5)}, firmware_version=(1, 1))
+
+    async def main() -> tuple[bytes | None, float]:
+        async with AsyncUGPlusGpib(timeout=1, devices=[adapter]) as gpib:
+            start = time.monotonic()
+            result = await gpib.query(9, b"N?\n", timeout=0.05)
+            return result, time.monotonic() - start
+
+    result, duration = asyncio.run(main())
+    # A timed out read is reported as None like in the synchronous driver
+    assert result is None
+    assert duration < 0.4
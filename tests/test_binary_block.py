@@ -0,0 +1,105 @@
+"""
+Tests of reading IEEE 488.2 definite length arbitrary blocks.
+"""
+
+# pylint: disable=missing-function-docstring
+
+from __future__ import annotations
+
+from typing import Callable
+
+import pytest
+
+from ug_gpib import UGPlusGpib
+from ug_gpib.emulator import EmulatedInstrument, EmulatedUGPlus
+
+GpibFactory = Callable[..., UGPlusGpib]
+
+# The header "#3nnn" is 5 bytes long, so a payload of 246 bytes fills a READ reply of 251 bytes
+HEADER_SIZE = 5
+MAX_READ_PAYLOAD = 251
+
+
+def block(payload: bytes, termination: bytes = b"\n") -> bytes:
+    return f"#3{len(payload):03d}".encode() + payload + termination
+
+
+def assert_drained(gpib: UGPlusGpib, instrument: EmulatedInstrument) -> None:
+    """Check, that the terminator was read and does not show up as the reply to the next query."""
+    assert instrument.output_ready_time is None
+    assert gpib.query(9, b"NEXT\n") == b"NEXT\n"
+
+
+def block_instrument(payload: bytes, termination: bytes = b"\n") -> EmulatedInstrument:
+    """An instrument, that answers "CURV?" with a block and echoes everything else."""
+    return EmulatedInstrument(reply=lambda data: block(payload, termination) if data == b"CURV?\n" else data)
+
+
+@pytest.mark.parametrize(
+    "length",
+    [
+        0,
+        1,
+        MAX_READ_PAYLOAD - HEADER_SIZE - 1,  # The terminator ends the first reply
+        MAX_READ_PAYLOAD - HEADER_SIZE,  # The terminator arrives in a separate reply
+        2 * MAX_READ_PAYLOAD - HEADER_SIZE,
+        999,
+    ],
+)
+def test_read_binary_block(make_gpib: GpibFactory, length: int) -> None:
+    payload = bytes(i % 256 for i in range(length))
+    instrument = block_instrument(payload)
+    gpib = make_gpib(EmulatedUGPlus(instruments={9: instrument}))
+    gpib.write(9, b"CURV?\n")
+
+    assert bytes(gpib.read_binary_block(9, out=bytearray(length))) == payload
+    assert_drained(gpib, instrument)
+
+
+@pytest.mark.parametrize("length", [MAX_READ_PAYLOAD - HEADER_SIZE, 2 * MAX_READ_PAYLOAD - HEADER_SIZE, 300])
+def test_iter_binary_block(make_gpib: GpibFactory, length: int) -> None:
+    payload = bytes(i % 256 for i in range(length))
+    instrument = block_instrument(payload)
+    gpib = make_gpib(EmulatedUGPlus(instruments={9: instrument}))
+    gpib.write(9, b"CURV?\n")
+
+    assert b"".join(gpib.iter_binary_block(9)) == payload
+    assert_drained(gpib, instrument)
+
+
+def test_split_termination(make_gpib: GpibFactory) -> None:
+    # The "\r" ends the first reply, the "\n" arrives in the next one
+    payload = bytes(MAX_READ_PAYLOAD - HEADER_SIZE - 1)
+    instrument = block_instrument(payload, b"\r\n")
+    gpib = make_gpib(EmulatedUGPlus(instruments={9: instrument}))
+    gpib.write(9, b"CURV?\n")
+
+    assert bytes(gpib.read_binary_block(9, out=bytearray(len(payload)), termination=b"\r\n")) == payload
+    assert_drained(gpib, instrument)
+
+
+def test_no_termination(make_gpib: GpibFactory) -> None:
+    payload = bytes(MAX_READ_PAYLOAD - HEADER_SIZE)
+    instrument = block_instrument(payload, b"")
+    gpib = make_gpib(EmulatedUGPlus(instruments={9: instrument}))
+    gpib.write(9, b"CURV?\n")
+
+    assert bytes(gpib.read_binary_block(9, out=bytearray(len(payload)), termination=b"")) == payload
+    assert_drained(gpib, instrument)
+
+
+def test_numpy_array(make_gpib: GpibFactory) -> None:
+    numpy = pytest.importorskip("numpy")
+    values = numpy.arange(100, dtype=">f4")
+    gpib = make_gpib(EmulatedUGPlus(instruments={9: block_instrument(values.tobytes())}))
+    gpib.write(9, b"CURV?\n")
+
+    assert numpy.array_equal(gpib.read_binary_block(9, ">f4"), values)
+
+
+def test_invalid_header(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    gpib = make_gpib(adapter)
+    gpib.write(9, b"1.0,2.0\n")
+
+    with pytest.raises(ValueError):
+        gpib.read_binary_block(9, out=bytearray(10))
@@ -0,0 +1,71 @@
+"""
+Tests of recording the USB transfers of a session and replaying them without the adapter.
+"""
+
+# pylint: disable=missing-function-docstring,redefined-outer-name
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from ug_gpib import ReplayDevice, TransferRecorder, UGPlusGpib
+from ug_gpib.capture import Direction, read_recording
+from ug_gpib.emulator import EmulatedUGPlus
+
+GpibFactory = Callable[..., UGPlusGpib]
+
+QUERIES = [b"*IDN?\n", b"MEAS?\n", b"A" * 200 + b"\n"]
+
+
+def session(gpib: UGPlusGpib) -> list[object]:
+    """Talk to the adapter and return everything, that was read back."""
+    results: list[object] = [gpib.version(), gpib.get_gpib_devices()]
+    results += [gpib.query(9, query) for query in QUERIES]
+    return results
+
+
+@pytest.fixture
+def recording(tmp_path: Path, make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> tuple[Path, list[object]]:
+    """A recording of a session with the emulated adapter and the results of that session."""
+    path = tmp_path / "session.ugcap"
+    with TransferRecorder(path) as recorder:
+        gpib = make_gpib(adapter, recorder=recorder)
+        results = session(gpib)
+        gpib.close()
+    return path, results
+
+
+def test_round_trip(make_gpib: GpibFactory, recording: tuple[Path, list[object]]) -> None:
+    path, results = recording
+    records = list(read_recording(path))
+    assert {record.direction for record in records} == {Direction.IN, Direction.OUT}
+    device = ReplayDevice(path, speed=float("inf"), strict=True)
+    assert session(make_gpib(device)) == results
+    assert results[2:] == QUERIES
+    assert device.finished
+
+
+def test_mismatch(make_gpib: GpibFactory, recording: tuple[Path, list[object]]) -> None:
+    path, _ = recording
+    gpib = make_gpib(ReplayDevice(path, speed=float("inf"), strict=True))
+    assert gpib.get_gpib_devices() == (9,)
+    with pytest.raises(ValueError, match="does not match recording"):
+        gpib.query(9, b"OTHER?\n")
+
+
+def test_end_of_recording(make_gpib: GpibFactory, recording: tuple[Path, list[object]]) -> None:
+    path, _ = recording
+    gpib = make_gpib(ReplayDevice(path, speed=float("inf"), strict=True))
+    session(gpib)
+    with pytest.raises(ValueError, match="recording has ended"):
+        gpib.query(9, b"MEAS?\n")
+
+
+def test_not_a_recording(tmp_path: Path) -> None:
+    path = tmp_path / "session.ugcap"
+    path.write_bytes(b"NOT A RECORDING")
+    with pytest.raises(ValueError, match="not a USB transfer recording"):
+        ReplayDevice(path)
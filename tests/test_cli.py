@@ -0,0 +1,98 @@
+"""
+Tests of the ug-gpib command line tool against the emulated adapter.
+"""
+
+# pylint: disable=missing-function-docstring
+
+from __future__ import annotations
+
+import errno
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from ug_gpib import UGPlusGpib
+from ug_gpib.cli import main
+from ug_gpib.codec import MAX_WRITE_DATA
+from ug_gpib.emulator import EmulatedInstrument, EmulatedUGPlus
+
+
+def test_discover(capsys: pytest.CaptureFixture[str], adapter: EmulatedUGPlus) -> None:
+    assert main(["discover"], devices=[adapter]) == 0
+    assert "GPIB devices: 9" in capsys.readouterr().out
+
+
+def test_query(capsysbinary: pytest.CaptureFixture[bytes], adapter: EmulatedUGPlus) -> None:
+    assert main(["query", "9", "A?", "B?"], devices=[adapter]) == 0
+    captured = capsysbinary.readouterr()
+    assert captured.out == b"A?\nB?\n"
+    assert b"2 commands (0 writes, 2 queries, 0 errors)" in captured.err
+
+
+def test_stream(
+    capsysbinary: pytest.CaptureFixture[bytes],
+    tmp_path: Path,
+    adapter: EmulatedUGPlus,
+    instrument: EmulatedInstrument,
+) -> None:
+    long_write = b"W" * (MAX_WRITE_DATA + 50)
+    long_query = b"Q?" * MAX_WRITE_DATA
+    path = tmp_path / "commands.txt"
+    path.write_bytes(b"\n".join((b"*RST", long_write, b"A?", long_query, b"B?", b"")))
+    assert main(["stream", "9", str(path), "--quiet"], devices=[adapter]) == 0
+    out = capsysbinary.readouterr().out
+    # The echo of the long query does not fit into a single reply, only its first part is read back
+    assert out.startswith(b"A?\n" + long_query[:MAX_WRITE_DATA])
+    assert out.endswith(b"\nB?\n")
+    assert instrument.received[:2] == [b"*RST\n", long_write + b"\n"]
+
+
+def test_errors_per_line(
+    monkeypatch: pytest.MonkeyPatch,
+    capsysbinary: pytest.CaptureFixture[bytes],
+    tmp_path: Path,
+    adapter: EmulatedUGPlus,
+    instrument: EmulatedInstrument,
+) -> None:
+    write = UGPlusGpib.write
+
+    def failing_write(self: UGPlusGpib, pad: int, data: bytes, **kwargs: Any) -> None:
+        if data == b"FAIL\n":
+            raise OSError(errno.EIO, "Write failed")
+        write(self, pad, data, **kwargs)
+
+    monkeypatch.setattr(UGPlusGpib, "write", failing_write)
+    path = tmp_path / "commands.txt"
+    path.write_bytes(b"FAIL\nOK\nA?\n")
+    assert main(["stream", "9", str(path)], devices=[adapter]) == 1
+    captured = capsysbinary.readouterr()
+    assert captured.out == b"A?\n"
+    assert b"Cannot write ([Errno 5] Write failed): b'FAIL\\n'" in captured.err
+    assert b"1 errors" in captured.err
+    assert instrument.received == [b"OK\n", b"A?\n"]
+
+
+def test_no_reply(capsysbinary: pytest.CaptureFixture[bytes], adapter: EmulatedUGPlus) -> None:
+    assert main(["query", "8", "A?", "--quiet"], devices=[adapter]) == 1
+    assert b"No reply to b'A?\\n'" in capsysbinary.readouterr().err
+
+
+def test_bench(capsys: pytest.CaptureFixture[str], adapter: EmulatedUGPlus) -> None:
+    assert main(["bench", "9", "--count", "5", "--batch-size", "2"], devices=[adapter]) == 0
+    out = capsys.readouterr().out
+    assert "sequential: 5 queries" in out
+    assert "batched (batch size 2): 5 queries" in out
+
+
+@pytest.mark.parametrize("argv", [["bench", "9", "--count", "0"], ["query", "9", "A?", "--batch-size", "0"]])
+def test_invalid_count(capsys: pytest.CaptureFixture[str], adapter: EmulatedUGPlus, argv: list[str]) -> None:
+    with pytest.raises(SystemExit) as exc_info:
+        main(argv, devices=[adapter])
+    assert exc_info.value.code == 2
+    assert "must be at least 1" in capsys.readouterr().err
+
+
+def test_bench_long_query(capsys: pytest.CaptureFixture[str], adapter: EmulatedUGPlus) -> None:
+    assert main(["bench", "9", "--count", "1", "--command", "X" * 300], devices=[adapter]) == 2
+    assert "must not be longer" in capsys.readouterr().err
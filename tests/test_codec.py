@@ -0,0 +1,169 @@
+"""
+Tests of the frame encoder and decoder in `ug_gpib.codec`.
+"""
+
+# pylint: disable=missing-function-docstring
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from ug_gpib.codec import (
+    DEFAULT_PROFILE,
+    FIRMWARE_1_0,
+    PROFILES,
+    Frame,
+    FrameCodec,
+    FramingError,
+    QuirkProfile,
+    UgPlusCommands,
+    select_profile,
+)
+
+ALL_PROFILES = [DEFAULT_PROFILE, *PROFILES.values()]
+
+
+def random_frame(rng: random.Random, codec: FrameCodec) -> bytes:
+    """Create a plausible reply frame as sent by the adapter, including all extra bytes of the profile."""
+    while True:
+        command = rng.choice(list(UgPlusCommands))
+        length = rng.randrange(2, 256)
+        size = codec.frame_length(command, length)
+        if size and codec.check_frames(bytes((command, length)) + bytes(size - 2), 0, size):
+            return bytes((command, length)) + rng.randbytes(size - 2)
+
+
+def test_select_profile() -> None:
+    assert select_profile(None) is DEFAULT_PROFILE
+    assert select_profile((1, 0)) is FIRMWARE_1_0
+    assert select_profile((1, 1)) is DEFAULT_PROFILE
+
+
+def test_encode() -> None:
+    codec = FrameCodec()
+    assert codec.encode(UgPlusCommands.GET_FIRMWARE_VERSION) == b"\x00\x02"
+    assert codec.encode(UgPlusCommands.WRITE, b"\x09\x0f*IDN?\n") == b"\x32\x0a\x09\x0f*IDN?\n"
+    with pytest.raises(ValueError):
+        codec.encode(UgPlusCommands.WRITE, bytes(254))
+
+
+def test_encode_into() -> None:
+    codec = FrameCodec(packet_size=64)
+    buffer = bytearray()
+    codec.encode_into(buffer, UgPlusCommands.READ, b"\x09\x0f", aligned=True)
+    codec.encode_into(buffer, UgPlusCommands.READ, b"\x0a\x0f")
+    assert len(buffer) == 68
+    assert buffer[:4] == b"\x33\x04\x09\x0f" and not any(buffer[4:64])
+    assert buffer[64:] == b"\x33\x04\x0a\x0f"
+
+
+@pytest.mark.parametrize(
+    "profile, data, frame",
+    [
+        # A READ reply with data
+        (DEFAULT_PROFILE, b"\x33\x07\x09\x01abc", Frame(0x33, b"\x09\x01abc", 7)),
+        (FIRMWARE_1_0, b"\x33\x07\x09\x01abc", Frame(0x33, b"\x09\x01abc", 7)),
+        # An empty READ reply. Firmware 1.0 pads it to 5 bytes.
+        (DEFAULT_PROFILE, b"\x33\x04\x09\x0a", Frame(0x33, b"\x09\x0a", 4)),
+        (FIRMWARE_1_0, b"\x33\x04\x09\x0a\x42", Frame(0x33, b"\x09\x0a\x42", 5)),
+        (FIRMWARE_1_0, b"\x33\x03\x09\x0a\x42", Frame(0x33, b"\x09\x0a\x42", 5)),
+        # Firmware 1.0 sends an extra byte after the manufacturer id
+        (DEFAULT_PROFILE, b"\xfe\x04LQ", Frame(0xFE, b"LQ", 4)),
+        (FIRMWARE_1_0, b"\xfe\x04LQ\x00", Frame(0xFE, b"LQ", 5)),
+        # The last byte of the device list is not an address
+        (DEFAULT_PROFILE, b"\x34\x05\x09\x0a\x99", Frame(0x34, b"\x09\x0a", 5)),
+        (FIRMWARE_1_0, b"\x34\x05\x09\x0a\x99\x00", Frame(0x34, b"\x09\x0a", 6)),
+        (DEFAULT_PROFILE, b"\x00\x04\x01\x00", Frame(0x00, b"\x01\x00", 4)),
+    ],
+)
+def test_decode(profile: QuirkProfile, data: bytes, frame: Frame) -> None:
+    codec = FrameCodec(profile)
+    assert codec.decode(data) == frame
+    # The frame is decoded at any position
+    assert codec.decode(b"xx" + data + b"yy", 2) == frame._replace(end=frame.end + 2)
+    # Incomplete frames are not decoded
+    for end in range(frame.end):
+        assert codec.decode(data, 0, end) is None
+
+
+@pytest.mark.parametrize("profile", ALL_PROFILES, ids=lambda profile: profile.name)
+@pytest.mark.parametrize("data", [b"\x99\x04abcd", b"\xfe\x01", b"\x00\x00"])
+def test_decode_invalid_header(profile: QuirkProfile, data: bytes) -> None:
+    with pytest.raises(FramingError):
+        FrameCodec(profile).decode(data)
+
+
+def test_decode_padded_length() -> None:
+    # Firmware 1.0 sends at least 5 bytes for every READ reply regardless of the length field
+    assert FrameCodec(FIRMWARE_1_0).decode(b"\x33\x01\x09\x0a\x00") == Frame(0x33, b"\x09\x0a\x00", 5)
+    with pytest.raises(FramingError):
+        FrameCodec(DEFAULT_PROFILE).decode(b"\x33\x01\x09\x0a\x00")
+
+
+@pytest.mark.parametrize("profile", ALL_PROFILES, ids=lambda profile: profile.name)
+@pytest.mark.parametrize("seed", range(5))
+def test_iter_frames(profile: QuirkProfile, seed: int) -> None:
+    codec = FrameCodec(profile)
+    rng = random.Random(seed)
+    frames = [random_frame(rng, codec) for _ in range(50)]
+    stream = b"".join(frames)
+
+    decoded = list(codec.iter_frames(stream))
+    assert [frame.end for frame in decoded] == [sum(map(len, frames[: i + 1])) for i in range(len(frames))]
+    assert codec.check_frames(stream, 0, len(stream)) is True
+
+    # A stream cut at any position yields the complete frames only
+    for cut in rng.sample(range(len(stream)), 50):
+        decoded = list(codec.iter_frames(stream, 0, cut))
+        assert all(frame.end <= cut for frame in decoded)
+        remaining = decoded[-1].end if decoded else 0
+        assert remaining == cut or codec.decode(stream, remaining, cut) is None
+
+
+@pytest.mark.parametrize("profile", ALL_PROFILES, ids=lambda profile: profile.name)
+@pytest.mark.parametrize("seed", range(5))
+def test_find_frame(profile: QuirkProfile, seed: int) -> None:
+    codec = FrameCodec(profile)
+    rng = random.Random(seed)
+    frames = b"".join(random_frame(rng, codec) for _ in range(5))
+    command = frames[0]
+    # The garbage does not contain the command, so the first frame is the only candidate
+    garbage = bytes(byte for byte in rng.randbytes(200) if byte != command)
+    data = garbage + frames
+
+    assert codec.find_frame(data, command, 0, len(data)) == (len(garbage), True)
+    # Without the end of the last frame, the candidate cannot be validated yet
+    assert codec.find_frame(data, command, 0, len(data) - 1) == (len(garbage), False)
+    assert codec.find_frame(garbage, command, 0, len(garbage)) is None
+
+
+@pytest.mark.parametrize("profile", ALL_PROFILES, ids=lambda profile: profile.name)
+def test_fuzz_random_data(profile: QuirkProfile) -> None:
+    # Arbitrary data must either decode or raise a FramingError
+    codec = FrameCodec(profile)
+    rng = random.Random(0)
+    for _ in range(2000):
+        data = rng.randbytes(rng.randrange(0, 300))
+        try:
+            for frame in codec.iter_frames(data):
+                assert frame.end <= len(data)
+        except FramingError:
+            pass
+        assert codec.check_frames(data, 0, len(data)) in (True, False, None)
+        command = rng.choice(list(UgPlusCommands))
+        candidate = codec.find_frame(data, command, 0, len(data))
+        assert candidate is None or data[candidate[0]] == command
+
+
+@pytest.mark.parametrize("profile", ALL_PROFILES, ids=lambda profile: profile.name)
+def test_round_trip(profile: QuirkProfile) -> None:
+    codec = FrameCodec(profile)
+    rng = random.Random(0)
+    for _ in range(1000):
+        # Firmware 1.0 pads shorter READ replies
+        payload = rng.randbytes(rng.randrange(3, 254))
+        assert codec.decode(codec.encode(UgPlusCommands.READ, payload)) == Frame(
+            UgPlusCommands.READ, payload, len(payload) + 2
+        )
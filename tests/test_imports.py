@@ -0,0 +1,53 @@
+"""
+Tests of the lazy imports of the package.
+"""
+
+# pylint: disable=missing-function-docstring
+
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+HEAVY_MODULES = ("usb", "usb.core", "numpy")
+
+
+def loaded_modules(code: str) -> list[str]:
+    """Run the code in a new interpreter and return the heavy modules loaded afterward."""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import json, sys\n{code}\nprint(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))",
+        ],
+        # The package might not be installed
+        cwd=Path(__file__).parents[1],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return json.loads(result.stdout)
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import ug_gpib",
+        "from ug_gpib import UGPlusGpib, ResponseLatencyScheduler, Metrics",
+        "import ug_gpib.codec",
+    ],
+)
+def test_no_heavy_imports(code: str) -> None:
+    assert not loaded_modules(code)
+
+
+def test_unknown_attribute() -> None:
+    import ug_gpib  # pylint: disable=import-outside-toplevel
+
+    with pytest.raises(AttributeError, match="NotAName"):
+        getattr(ug_gpib, "NotAName")
+    assert "UGPlusGpib" in dir(ug_gpib)
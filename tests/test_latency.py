@@ -0,0 +1,72 @@
+"""
+Tests of the response latency scheduler and the adaptive reads of the driver.
+"""
+
+# pylint: disable=missing-function-docstring
+
+from __future__ import annotations
+
+from typing import Callable
+
+import pytest
+
+from ug_gpib import ResponseLatencyScheduler, UGPlusGpib
+from ug_gpib.emulator import EmulatedInstrument, EmulatedUGPlus
+
+GpibFactory = Callable[..., UGPlusGpib]
+
+
+def test_statistics() -> None:
+    scheduler = ResponseLatencyScheduler(window=4, percentile=25)
+    assert scheduler.stats(9) is None
+    assert scheduler.initial_delay(9) == 0
+    for latency in (0.5, 0.1, 0.4, 0.2, 0.3):
+        scheduler.record(9, latency)
+    # The oldest latency has left the window
+    stats = scheduler.stats(9)
+    assert stats is not None
+    assert stats.samples == 4
+    assert (stats.minimum, stats.median, stats.percentile, stats.maximum) == (0.1, 0.2, 0.1, 0.4)
+    assert stats.mean == pytest.approx(0.25)
+    assert scheduler.initial_delay(9) == 0.1
+    scheduler.record(7, 1.0)
+    assert set(scheduler.all_stats()) == {7, 9}
+    scheduler.reset(9)
+    assert set(scheduler.all_stats()) == {7}
+    scheduler.reset()
+    assert not scheduler.all_stats()
+
+
+def test_adaptive_read_converges(make_gpib: GpibFactory) -> None:
+    instrument = EmulatedInstrument(reply=lambda data: data, delay=0.02)
+    adapter = EmulatedUGPlus(instruments={9: instrument})
+    # Reads fail immediately, if the instrument has not answered yet, so every poll is a separate transfer
+    adapter.gpib_timeout = 0
+    gpib = make_gpib(adapter, latency_scheduler=ResponseLatencyScheduler(poll_interval=0.002))
+    polls = []
+    for _ in range(5):
+        transfers = gpib.metrics.transfers_out
+        assert gpib.query(9, b"MEAS?\n", adaptive=True) == b"MEAS?\n"
+        polls.append(gpib.metrics.transfers_out - transfers - 1)
+    stats = gpib.latency_scheduler.stats(9)
+    assert stats is not None
+    assert stats.samples == 5
+    assert stats.minimum >= 0.02
+    assert gpib.latency_scheduler.initial_delay(9) >= 0.02
+    # The first read has to poll until the reply arrives, the later ones wait for the learned delay first
+    assert polls[0] > 3
+    assert max(polls[1:]) <= 2
+
+
+def test_adaptive_read_reset_on_error(
+    make_gpib: GpibFactory, adapter: EmulatedUGPlus, instrument: EmulatedInstrument
+) -> None:
+    gpib = make_gpib(adapter, latency_scheduler=ResponseLatencyScheduler(max_wait=0.05))
+    assert gpib.query(9, b"MEAS?\n", adaptive=True) == b"MEAS?\n"
+    assert gpib.latency_scheduler.stats(9) is not None
+    # The instrument stops answering
+    instrument.reply = None
+    with pytest.raises(OSError):
+        gpib.query(9, b"MEAS?\n", adaptive=True)
+    assert gpib.latency_scheduler.stats(9) is None
+    assert gpib.latency_scheduler.initial_delay(9) == 0
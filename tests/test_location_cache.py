@@ -0,0 +1,92 @@
+"""
+Tests of the persistent cache of adapter locations.
+"""
+
+# pylint: disable=missing-function-docstring
+
+from __future__ import annotations
+
+import errno
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from ug_gpib import AdapterLocationCache
+
+
+def test_round_trip(tmp_path: Path) -> None:
+    cache = AdapterLocationCache(tmp_path / "cache" / "locations.json")
+    assert cache.get(7) is None
+    cache.set(7, 1, (3, 2))
+    cache.set(8, 2, (1,))
+    assert AdapterLocationCache(cache.path).get(7) == (1, (3, 2))
+    # Another adapter at the same location replaces the old one
+    cache.set(9, 1, (3, 2))
+    assert cache.get(7) is None
+    assert cache.get(9) == (1, (3, 2))
+    cache.invalidate(9)
+    assert cache.get(9) is None
+    assert cache.get(8) == (2, (1,))
+    cache.clear()
+    assert cache.get(8) is None
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "{not json",
+        "[]",
+        json.dumps({"version": 0, "adapters": {"7": {"bus": 1, "port_numbers": [3]}}}),
+        json.dumps({"version": 1, "adapters": []}),
+        json.dumps({"version": 1, "adapters": {"7": 5, "8": [1, 2], "9": None}}),
+        json.dumps({"version": 1, "adapters": {"7": {"bus": "1", "port_numbers": [3]}}}),
+        json.dumps({"version": 1, "adapters": {"7": {"bus": 1, "port_numbers": ["x"]}}}),
+    ],
+)
+def test_corrupt_file(tmp_path: Path, content: str) -> None:
+    path = tmp_path / "locations.json"
+    path.write_text(content, encoding="utf-8")
+    cache = AdapterLocationCache(path)
+    assert cache.get(7) is None
+    # The corrupt entries are ignored and replaced by a valid file
+    cache.set(7, 1, (3,))
+    cache.invalidate(8)
+    assert cache.get(7) == (1, (3,))
+    assert json.loads(path.read_text(encoding="utf-8"))["version"] == AdapterLocationCache.FILE_FORMAT_VERSION
+
+
+def test_corrupt_entries_keep_valid_ones(tmp_path: Path) -> None:
+    path = tmp_path / "locations.json"
+    path.write_text(
+        json.dumps({"version": 1, "adapters": {"7": 5, "8": {"bus": 2, "port_numbers": [1]}}}), encoding="utf-8"
+    )
+    cache = AdapterLocationCache(path)
+    cache.set(9, 1, (3,))
+    assert cache.get(8) == (2, (1,))
+    assert cache.get(9) == (1, (3,))
+
+
+@pytest.mark.parametrize("failing", ["json.dump", "os.replace"])
+def test_failed_write(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture, tmp_path: Path, failing: str
+) -> None:
+    path = tmp_path / "locations.json"
+    cache = AdapterLocationCache(path)
+    cache.set(7, 1, (3,))
+
+    def fail(*args: Any, **kwargs: Any) -> None:
+        del args, kwargs
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    module, name = failing.split(".")
+    monkeypatch.setattr({"json": json, "os": os}[module], name, fail)
+    cache.set(8, 2, (1,))
+    monkeypatch.undo()
+    assert "Cannot write adapter location cache" in caplog.text
+    # The old file is kept and the temporary file is removed
+    assert os.listdir(tmp_path) == [path.name]
+    assert cache.get(7) == (1, (3,))
+    assert cache.get(8) is None
@@ -0,0 +1,63 @@
+"""
+Tests of the transfer and error counters of the driver.
+"""
+
+# pylint: disable=missing-function-docstring
+
+from __future__ import annotations
+
+from typing import Callable
+
+from ug_gpib import Metrics, MetricsSnapshot, UGPlusGpib
+from ug_gpib.emulator import EmulatedInstrument, EmulatedUGPlus
+
+GpibFactory = Callable[..., UGPlusGpib]
+
+
+def test_transfer_counters(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    gpib = make_gpib(adapter)
+    gpib.connect()
+    gpib.metrics.reset()
+    assert gpib.query(9, b"MEAS?\n") == b"MEAS?\n"
+    metrics = gpib.metrics
+    # A write and a read request
+    assert metrics.transfers_out == 2
+    assert metrics.bytes_out > len(b"MEAS?\n")
+    assert metrics.transfers_in >= 1
+    assert metrics.bytes_in > len(b"MEAS?\n")
+    assert metrics.timeouts == 0
+    assert {command.name for command in metrics.command_latency} >= {"WRITE", "READ"}
+    assert metrics.pad_latency[9].count == 1
+    metrics.reset()
+    assert metrics.snapshot().transfers_out == 0
+    assert not metrics.command_latency
+
+
+def test_read_timeout(make_gpib: GpibFactory) -> None:
+    adapter = EmulatedUGPlus(instruments={9: EmulatedInstrument(reply=lambda data: data, delay=0.5)})
+    gpib = make_gpib(adapter, timeout=0.05)
+    gpib.connect()
+    assert gpib.metrics.timeouts == 0
+    assert gpib.query(9, b"MEAS?\n") is None
+    assert gpib.metrics.timeouts == 1
+
+
+def test_retries(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    gpib = make_gpib(adapter)
+    assert gpib.get_gpib_devices() == (9,)
+    adapter.unplug(duration=0.1)
+    assert gpib.get_gpib_devices() == (9,)
+    stats = gpib.recovery.stats()
+    assert stats.errors == 1
+    assert stats.reconnects == 1
+    assert stats.retries == 1
+    assert stats.downtime > 0
+
+
+def test_export_hook(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    snapshots: list[MetricsSnapshot] = []
+    gpib = make_gpib(adapter, metrics=Metrics(export_hook=snapshots.append, export_interval=0))
+    gpib.query(9, b"MEAS?\n")
+    assert snapshots
+    assert snapshots[-1].transfers_out == gpib.metrics.transfers_out
+    assert "WRITE" in snapshots[-1].command_latency
@@ -0,0 +1,82 @@
+"""
+Tests of `AdapterPool`, which drives several adapters in parallel.
+"""
+
+# pylint: disable=missing-function-docstring
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from ug_gpib import AdapterPool, UGPlusGpib, gpib_helper
+from ug_gpib.emulator import EmulatedInstrument, EmulatedUGPlus
+
+
+def make_adapters(count: int) -> list[EmulatedUGPlus]:
+    return [
+        EmulatedUGPlus(
+            series=series,
+            port_numbers=(series,),
+            instruments={9: EmulatedInstrument(reply=f"{series}\n".encode())},
+        )
+        for series in range(1, count + 1)
+    ]
+
+
+def test_query_all() -> None:
+    with AdapterPool(make_adapters(3), timeout=1) as pool:
+        assert pool.series == (1, 2, 3)
+        assert pool.query_all(9, b"ID?\n") == {1: b"1\n", 2: b"2\n", 3: b"3\n"}
+        assert pool.query((2, 9), b"ID?\n").result(5) == b"2\n"
+        assert pool.get_gpib_devices() == {1: (9,), 2: (9,), 3: (9,)}
+
+
+def test_same_location() -> None:
+    # Adapters without a unique location are pinned by the device object
+    adapters = [EmulatedUGPlus(series=series) for series in (1, 2)]
+    with AdapterPool(adapters, timeout=1) as pool:
+        assert pool.series == (1, 2)
+
+
+def test_skip_duplicate_series() -> None:
+    adapters = make_adapters(2) + [EmulatedUGPlus(series=1, port_numbers=(5,))]
+    with AdapterPool(adapters, timeout=1) as pool:
+        assert pool.series == (1, 2)
+
+
+def test_gather_waits_for_all_adapters() -> None:
+    finished = threading.Event()
+
+    def func(gpib: UGPlusGpib) -> int:
+        series = gpib.get_series_number()[1]
+        if series == 1:
+            raise ValueError("test")
+        time.sleep(0.2)
+        finished.set()
+        return series
+
+    with AdapterPool(make_adapters(2), timeout=1) as pool:
+        with pytest.raises(ValueError):
+            pool.gather(func)
+        assert finished.is_set()
+
+
+def test_reconnect_after_replug(monkeypatch: pytest.MonkeyPatch) -> None:
+    # After a replug, the adapter is a new USB device object at the same location
+    plugged = {(1, (3,)): EmulatedUGPlus(series=7, port_numbers=(3,), instruments={9: EmulatedInstrument(b"A\n")})}
+    monkeypatch.setattr(gpib_helper, "get_usb_devices", lambda *args: iter(plugged.values()))
+    monkeypatch.setattr(
+        gpib_helper, "get_usb_device_at", lambda bus, port_numbers, *args: plugged.get((bus, port_numbers))
+    )
+
+    with AdapterPool(timeout=1) as pool:
+        assert pool.query((7, 9), b"ID?\n").result(5) == b"A\n"
+        plugged[(1, (3,))].unplug()
+        plugged[(1, (3,))] = EmulatedUGPlus(series=7, port_numbers=(3,), instruments={9: EmulatedInstrument(b"B\n")})
+
+        # Discovering the devices is idempotent, so it is retried after reconnecting
+        assert pool.get_gpib_devices() == {7: (9,)}
+        assert pool.query((7, 9), b"ID?\n").result(5) == b"B\n"
@@ -0,0 +1,105 @@
+"""
+Tests of the pipelined queries `UGPlusGpib.query_many()` and `UGPlusGpib.query_batch()`.
+"""
+
+# pylint: disable=missing-function-docstring
+
+from __future__ import annotations
+
+from typing import Callable
+
+import pytest
+
+from ug_gpib import UGPlusGpib
+from ug_gpib.codec import MAX_WRITE_DATA
+from ug_gpib.emulator import EmulatedInstrument, EmulatedUGPlus
+
+GpibFactory = Callable[..., UGPlusGpib]
+
+
+@pytest.mark.parametrize("firmware_version", [(1, 0), (1, 1)])
+@pytest.mark.parametrize("batch_size", [1, 3, 16, 64])
+def test_query_many(make_gpib: GpibFactory, firmware_version: tuple[int, int], batch_size: int) -> None:
+    instrument = EmulatedInstrument(reply=lambda data: data.upper())
+    gpib = make_gpib(EmulatedUGPlus(instruments={9: instrument}, firmware_version=firmware_version))
+    commands = [f"meas{i}?\n".encode() for i in range(40)]
+
+    assert gpib.query_many(9, commands, batch_size=batch_size) == [command.upper() for command in commands]
+    assert instrument.received == commands
+
+
+def test_query_many_empty(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    assert not make_gpib(adapter).query_many(9, [])
+
+
+@pytest.mark.parametrize("reply_size", [1, 58, 59, 60, 62, 63, 64, 122, 241, 251])
+def test_query_many_reply_sizes(make_gpib: GpibFactory, reply_size: int) -> None:
+    # Replies around the USB packet size and up to the maximum READ payload
+    instrument = EmulatedInstrument(reply=lambda data: data[:1] * (reply_size - 1) + b"\n")
+    gpib = make_gpib(EmulatedUGPlus(instruments={9: instrument}, firmware_version=(1, 1)))
+    commands = [bytes((0x41 + i,)) for i in range(20)]
+
+    assert gpib.query_many(9, commands, batch_size=8) == [command * (reply_size - 1) + b"\n" for command in commands]
+
+
+def test_query_batch_several_devices(make_gpib: GpibFactory) -> None:
+    instruments = {pad: EmulatedInstrument(reply=f"{pad}\n".encode()) for pad in (1, 5, 9, 30)}
+    gpib = make_gpib(EmulatedUGPlus(instruments=instruments))
+    queries = [(pad, b"ID?\n") for pad in (9, 1, 30, 5, 9, 1)]
+
+    assert gpib.query_batch(queries, batch_size=4) == [f"{pad}\n".encode() for pad, _ in queries]
+    assert [len(instrument.received) for instrument in instruments.values()] == [2, 1, 2, 1]
+
+
+def test_query_batch_missing_device(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    adapter.gpib_timeout = 0.01
+    gpib = make_gpib(adapter)
+    queries = [(9, b"A\n"), (4, b"B\n"), (9, b"C\n")]
+
+    assert gpib.query_batch(queries, raise_errors=False) == [b"A\n", None, b"C\n"]
+    with pytest.raises(OSError):
+        gpib.query_batch(queries)
+    # All replies were read, before the error was raised
+    assert gpib.query(9, b"D\n") == b"D\n"
+
+
+def test_query_many_after_query(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    gpib = make_gpib(adapter)
+
+    assert gpib.query(9, b"X\n") == b"X\n"
+    assert gpib.query_many(9, [b"Y\n", b"Z\n"]) == [b"Y\n", b"Z\n"]
+    assert gpib.query(9, b"W\n") == b"W\n"
+
+
+def test_query_batch_long_query(
+    make_gpib: GpibFactory, adapter: EmulatedUGPlus, instrument: EmulatedInstrument
+) -> None:
+    gpib = make_gpib(adapter)
+    queries = [(9, b"A\n")] * 20 + [(9, b"B" * (MAX_WRITE_DATA + 1))]
+
+    with pytest.raises(ValueError, match="must not be longer"):
+        gpib.query_batch(queries, batch_size=4)
+    # Nothing was sent, not even the queries of the batches before the long query
+    assert not instrument.received
+    assert gpib.query_batch([(9, b"B" * MAX_WRITE_DATA)]) == [b"B" * MAX_WRITE_DATA]
+
+
+def test_query_batch_clears_stale_bytes(
+    monkeypatch: pytest.MonkeyPatch, make_gpib: GpibFactory, adapter: EmulatedUGPlus
+) -> None:
+    gpib = make_gpib(adapter)
+    gpib.connect()
+    read_transfer = adapter.read_transfer
+
+    def stale_read_transfer(size: int, timeout: int) -> bytes:
+        """Append stale bytes to the transfer containing the reply to the last query."""
+        data = read_transfer(size, timeout)
+        return data + b"\x00\x00" if data.endswith(b"B\n") else data
+
+    monkeypatch.setattr(adapter, "read_transfer", stale_read_transfer)
+    discarded = gpib.metrics.discarded_bytes
+    assert gpib.query_batch([(9, b"A\n"), (9, b"B\n")], batch_size=1) == [b"A\n", b"B\n"]
+    # The stale bytes after the last reply are discarded by the batch and not left for the next call
+    assert gpib.metrics.discarded_bytes == discarded + 2
+    assert gpib.query(9, b"C\n") == b"C\n"
+    assert gpib.metrics.discarded_bytes == discarded + 2
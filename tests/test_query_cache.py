@@ -0,0 +1,122 @@
+"""
+Tests of the query cache and its use by the driver.
+"""
+
+# pylint: disable=missing-function-docstring
+
+from __future__ import annotations
+
+import time
+from typing import Callable
+
+from ug_gpib import CacheStats, QueryCache, UGPlusGpib
+from ug_gpib.emulator import EmulatedInstrument, EmulatedUGPlus
+
+GpibFactory = Callable[..., UGPlusGpib]
+
+
+def test_ttl_expiry() -> None:
+    cache = QueryCache(default_ttl=0.05)
+    cache.put("default", 1)
+    cache.put("long", 2, ttl=10)
+    assert cache.get("default") == 1
+    time.sleep(0.06)
+    assert cache.get("default") is None
+    assert cache.get("long") == 2
+    assert cache.stats() == CacheStats(hits=2, misses=1, evictions=0, entries=1)
+
+
+def test_registered_ttl() -> None:
+    cache = QueryCache()
+    cache.register(9, b"*IDN?\n", ttl=0.05)
+    cache.put((9, b"*IDN?\n"), b"ID")
+    cache.put((9, b"OTHER?\n"), b"OTHER")
+    time.sleep(0.06)
+    assert cache.get((9, b"*IDN?\n")) is None
+    assert cache.get((9, b"OTHER?\n")) == b"OTHER"
+
+
+def test_lru_eviction() -> None:
+    cache = QueryCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    # Using "a" makes "b" the least recently used entry
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+    assert len(cache) == 2
+
+
+def test_disabled() -> None:
+    cache = QueryCache(max_entries=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_none_is_not_cached() -> None:
+    cache = QueryCache()
+    cache.put("a", None)
+    assert len(cache) == 0
+
+
+def test_cached_query(make_gpib: GpibFactory, adapter: EmulatedUGPlus, instrument: EmulatedInstrument) -> None:
+    gpib = make_gpib(adapter)
+    gpib.query_cache.register(9, b"*IDN?\n")
+    assert gpib.query(9, b"*IDN?\n") == b"*IDN?\n"
+    # Any bytes-like object is a valid query and hits the same entry
+    assert gpib.query(9, bytearray(b"*IDN?\n")) == b"*IDN?\n"
+    assert gpib.query(9, memoryview(b"*IDN?\n")) == b"*IDN?\n"
+    assert instrument.received == [b"*IDN?\n"]
+    # Queries, that are not registered, always go to the instrument
+    assert gpib.query(9, bytearray(b"MEAS?\n")) == b"MEAS?\n"
+    assert gpib.query(9, b"MEAS?\n") == b"MEAS?\n"
+    assert instrument.received == [b"*IDN?\n", b"MEAS?\n", b"MEAS?\n"]
+
+
+def test_unregister(make_gpib: GpibFactory, adapter: EmulatedUGPlus, instrument: EmulatedInstrument) -> None:
+    gpib = make_gpib(adapter)
+    gpib.query_cache.register(9, bytearray(b"*IDN?\n"))
+    gpib.query(9, b"*IDN?\n")
+    gpib.query(9, b"*IDN?\n")
+    gpib.query_cache.unregister(9, memoryview(b"*IDN?\n"))
+    gpib.query(9, b"*IDN?\n")
+    assert len(instrument.received) == 2
+
+
+def test_invalidated_by_reset(make_gpib: GpibFactory, adapter: EmulatedUGPlus, instrument: EmulatedInstrument) -> None:
+    gpib = make_gpib(adapter)
+    gpib.query_cache.register(9, b"*IDN?\n")
+    gpib.query(9, b"*IDN?\n")
+    gpib.reset()
+    gpib.query(9, b"*IDN?\n")
+    assert len(instrument.received) == 2
+
+
+def test_invalidated_by_reconnect(
+    make_gpib: GpibFactory, adapter: EmulatedUGPlus, instrument: EmulatedInstrument
+) -> None:
+    gpib = make_gpib(adapter)
+    gpib.query_cache.register(9, b"*IDN?\n")
+    gpib.query(9, b"*IDN?\n")
+    misses = gpib.query_cache.misses
+    gpib.close()
+    gpib.connect()
+    # The metadata is read from the new device
+    assert gpib.query_cache.misses > misses
+    gpib.query(9, b"*IDN?\n")
+    assert len(instrument.received) == 2
+
+
+def test_metadata(make_gpib: GpibFactory) -> None:
+    adapter = EmulatedUGPlus(instruments={9: EmulatedInstrument()})
+    gpib = make_gpib(adapter)
+    gpib.connect()
+    hits = gpib.query_cache.hits
+    assert gpib.get_series_number() == gpib.get_series_number()
+    assert gpib.version() == gpib.version()
+    assert gpib.get_manufacturer_id() == gpib.get_manufacturer_id()
+    assert gpib.query_cache.hits >= hits + 3
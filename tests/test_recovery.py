@@ -0,0 +1,65 @@
+"""
+Tests of reconnecting to an adapter, that was unplugged, within the limits of the call.
+"""
+
+# pylint: disable=missing-function-docstring
+
+from __future__ import annotations
+
+import errno
+import threading
+import time
+from typing import Callable
+
+import pytest
+
+from ug_gpib import CancellationToken, OperationCancelled, UGPlusGpib
+from ug_gpib.emulator import EmulatedUGPlus
+
+GpibFactory = Callable[..., UGPlusGpib]
+
+
+def test_reconnects_after_replug(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    gpib = make_gpib(adapter)
+    assert gpib.get_gpib_devices() == (9,)
+    adapter.unplug(duration=0.1)
+    assert gpib.get_gpib_devices() == (9,)
+    assert gpib.recovery.errors == 1
+
+
+def test_recovery_ends_at_deadline(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    gpib = make_gpib(adapter)
+    assert gpib.get_gpib_devices() == (9,)
+    adapter.unplug()
+    start = time.monotonic()
+    with pytest.raises(TimeoutError) as exc_info:
+        gpib.get_gpib_devices(timeout=0.05)
+    assert time.monotonic() - start < 0.5
+    assert exc_info.value.errno == errno.ETIMEDOUT
+    # The driver reconnects with the next call
+    adapter.replug()
+    assert gpib.get_gpib_devices(timeout=1) == (9,)
+
+
+def test_recovery_cancelled(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    gpib = make_gpib(adapter)
+    gpib.write(9, b"A\n")
+    adapter.unplug()
+    token = CancellationToken()
+    threading.Timer(0.05, token.cancel).start()
+    start = time.monotonic()
+    with pytest.raises(OperationCancelled):
+        gpib.write(9, b"B\n", cancel=token)
+    assert time.monotonic() - start < 0.5
+
+
+def test_recovery_ends_at_reconnect_timeout(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    gpib = make_gpib(adapter)
+    gpib.recovery.reconnect_timeout = 0.1
+    assert gpib.get_gpib_devices() == (9,)
+    adapter.unplug()
+    start = time.monotonic()
+    with pytest.raises(OSError) as exc_info:
+        gpib.get_gpib_devices(timeout=5)
+    assert time.monotonic() - start < 0.5
+    assert exc_info.value.errno == errno.ENODEV
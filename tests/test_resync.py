@@ -0,0 +1,94 @@
+"""
+Fuzz tests of the resynchronization to the reply stream after the adapter sent garbage.
+"""
+
+# pylint: disable=missing-function-docstring,protected-access
+
+from __future__ import annotations
+
+import errno
+import random
+from typing import Callable
+
+import pytest
+
+from ug_gpib import UGPlusGpib
+from ug_gpib.codec import UgPlusCommands
+from ug_gpib.emulator import EmulatedInstrument, EmulatedUGPlus
+
+GpibFactory = Callable[..., UGPlusGpib]
+
+
+def random_garbage(rng: random.Random, max_length: int) -> bytes:
+    return rng.randbytes(rng.randrange(1, max_length))
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("firmware_version", [(1, 0), (1, 1)])
+def test_garbage_before_query(make_gpib: GpibFactory, firmware_version: tuple[int, int]) -> None:
+    adapter = EmulatedUGPlus(
+        instruments={9: EmulatedInstrument(reply=lambda data: b"R:" + data)}, firmware_version=firmware_version
+    )
+    gpib = make_gpib(adapter, timeout=0.2)
+    rng = random.Random(1)
+    answered = 0
+    for i in range(200):
+        adapter.inject(random_garbage(rng, 300))
+        command = f"Q{i}\n".encode()
+        try:
+            answered += gpib.query(9, command) == b"R:" + command
+        except OSError:
+            pass
+        # A reply must never be left behind for the next query
+        command = f"C{i}\n".encode()
+        assert gpib.query(9, command) == b"R:" + command
+    # Garbage may contain a plausible frame, that is taken for the reply, but this is rare
+    assert answered >= 190
+    assert gpib.metrics.framing_errors > 0
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("firmware_version", [(1, 0), (1, 1)])
+@pytest.mark.parametrize("reply_size", [60, 241, 251])
+def test_garbage_before_pipelined_replies(
+    make_gpib: GpibFactory, firmware_version: tuple[int, int], reply_size: int, seed: int
+) -> None:
+    # The replies of a batch arrive back to back and exceed the receive buffer by far
+    instrument = EmulatedInstrument(reply=lambda data: data[:1] * (reply_size - 1) + b"\n")
+    adapter = EmulatedUGPlus(instruments={9: instrument}, firmware_version=firmware_version)
+    gpib = make_gpib(adapter)
+    adapter.inject(random_garbage(random.Random(seed), 200))
+
+    results = gpib.query_batch([(9, b"Q?\n")] * 32, batch_size=32)
+
+    assert results == [b"Q" * (reply_size - 1) + b"\n"] * 32
+    assert gpib.query(9, b"X\n") == b"X" * (reply_size - 1) + b"\n"
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_repeated_garbage_before_batches(make_gpib: GpibFactory, seed: int) -> None:
+    rng = random.Random(seed)
+    adapter = EmulatedUGPlus(instruments={9: EmulatedInstrument(reply=lambda data: data * 60)})
+    gpib = make_gpib(adapter, timeout=0.2)
+    queries = [(9, bytes((0x41 + i,))) for i in range(16)]
+    for _ in range(20):
+        adapter.inject(random_garbage(rng, 100))
+        try:
+            gpib.query_batch(queries, raise_errors=False)
+        except OSError as exc:
+            assert exc.errno == errno.EPROTO
+        assert gpib.query(9, b"X") == b"X" * 60
+
+
+def test_too_much_garbage(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    gpib = make_gpib(adapter)
+    rng = random.Random(0)
+    # The garbage does not contain the header of a READ reply
+    garbage = bytes(byte for byte in rng.randbytes(3 * UGPlusGpib._RESYNC_MAX_DISCARD) if byte != UgPlusCommands.READ)
+    adapter.inject(garbage)
+
+    with pytest.raises(OSError) as exc_info:
+        gpib.query(9, b"X\n")
+    assert exc_info.value.errno == errno.EPROTO
+    # The endpoint was drained
+    assert gpib.query(9, b"Y\n") == b"Y\n"
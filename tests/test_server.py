@@ -0,0 +1,169 @@
+"""
+End to end tests of the adapter server and its client, using a Unix domain socket and the emulated adapter.
+"""
+
+# pylint: disable=missing-function-docstring,redefined-outer-name
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import errno
+import io
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import pytest
+
+from ug_gpib import AsyncUGPlusGpib, RecoveryPolicy, UGPlusGpibClient
+from ug_gpib.emulator import EmulatedInstrument, EmulatedUGPlus
+from ug_gpib.server import REQUEST_HEADER, RESPONSE_HEADER, GpibServer, Opcode, Status
+
+ServerFactory = Callable[..., GpibServer]
+
+
+@pytest.fixture
+def start_server() -> Iterator[ServerFactory]:
+    """A factory starting a server on a temporary socket in a background thread. The servers are stopped afterward."""
+    stops: list[Callable[[], None]] = []
+
+    def factory(adapter: EmulatedUGPlus, **kwargs: Any) -> GpibServer:
+        # The path of a Unix domain socket is limited to about 100 characters
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        path = Path(directory.name) / "gpib.sock"
+        started = threading.Event()
+        servers: list[GpibServer] = []
+        loop = asyncio.new_event_loop()
+
+        async def serve() -> None:
+            async with AsyncUGPlusGpib(devices=[adapter], timeout=1, **kwargs) as gpib:
+                server = GpibServer(gpib, path)
+                await server.start()
+                servers.append(server)
+                started.set()
+                await server.serve_forever()
+
+        task = loop.create_task(serve())
+
+        def run() -> None:
+            with contextlib.suppress(asyncio.CancelledError):
+                loop.run_until_complete(task)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+
+        def stop() -> None:
+            loop.call_soon_threadsafe(task.cancel)
+            thread.join()
+            loop.close()
+            directory.cleanup()
+
+        stops.append(stop)
+        assert started.wait(5)
+        return servers[0]
+
+    yield factory
+    for stop in stops:
+        stop()
+
+
+def test_request_reply(start_server: ServerFactory, adapter: EmulatedUGPlus, instrument: EmulatedInstrument) -> None:
+    server = start_server(adapter)
+    with UGPlusGpibClient(server.path) as client:
+        assert client.get_gpib_devices() == (9,)
+        assert client.version() == adapter.firmware_version
+        assert client.get_series_number()[1] == adapter.series
+        assert client.get_manufacturer_id() == adapter.manufacturer_id
+        assert client.query(9, b"MEAS?\n") == b"MEAS?\n"
+        client.write(9, b"A\n")
+        assert client.read(9) == b"A\n"
+        assert client.query(9, b"B\n", adaptive=True, timeout=1) == b"B\n"
+        assert client.query_many(9, [b"C\n", b"D\n"]) == [b"C\n", b"D\n"]
+        client.reset()
+    assert instrument.received[:2] == [b"MEAS?\n", b"A\n"]
+
+
+def test_long_messages(start_server: ServerFactory, adapter: EmulatedUGPlus, instrument: EmulatedInstrument) -> None:
+    server = start_server(adapter)
+    data = bytes(range(256)) * 10
+    with UGPlusGpibClient(server.path) as client:
+        client.write(9, data)
+        assert client.write_stream(9, io.BytesIO(data)) == len(data)
+        assert client.write_stream(9, [data[:100], data[100:]]) == len(data)
+    assert instrument.received == [data] * 3
+
+
+def test_query_batch(start_server: ServerFactory) -> None:
+    adapter = EmulatedUGPlus(
+        instruments={
+            7: EmulatedInstrument(reply=lambda data: b"7:" + data),
+            9: EmulatedInstrument(reply=lambda data: b"9:" + data),
+        }
+    )
+    server = start_server(adapter)
+    with UGPlusGpibClient(server.path) as client:
+        assert client.query_batch([(7, b"A\n"), (9, b"B\n"), (7, b"C\n")]) == [b"7:A\n", b"9:B\n", b"7:C\n"]
+        assert client.query_batch([(7, b"A\n"), (8, b"B\n")], raise_errors=False) == [b"7:A\n", None]
+        with pytest.raises(OSError) as exc_info:
+            client.query_batch([(8, b"B\n"), (9, b"C\n")])
+        assert exc_info.value.errno == errno.EIO
+
+
+def test_per_call_timeout(start_server: ServerFactory) -> None:
+    adapter = EmulatedUGPlus(instruments={9: EmulatedInstrument(reply=lambda data: data, delay=0.5)})
+    server = start_server(adapter)
+    with UGPlusGpibClient(server.path) as client:
+        start = time.monotonic()
+        assert client.query(9, b"A\n", timeout=0.05) is None
+        assert time.monotonic() - start < 0.4
+
+
+def exchange(path: Path, requests: list[tuple[int, int]]) -> dict[int, tuple[int, bytes]]:
+    """Send pipelined requests of an opcode and a pad without payload in a single write and collect the responses."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(str(path))
+        connection.sendall(b"".join(REQUEST_HEADER.pack(i, *request, 0) for i, request in enumerate(requests)))
+        responses: dict[int, tuple[int, bytes]] = {}
+        buffer = b""
+        while len(responses) < len(requests):
+            buffer += connection.recv(4096)
+            while len(buffer) >= RESPONSE_HEADER.size:
+                request_id, status, length = RESPONSE_HEADER.unpack_from(buffer)
+                if len(buffer) < RESPONSE_HEADER.size + length:
+                    break
+                responses[request_id] = status, buffer[RESPONSE_HEADER.size : RESPONSE_HEADER.size + length]
+                buffer = buffer[RESPONSE_HEADER.size + length :]
+    return responses
+
+
+def test_coalescing(start_server: ServerFactory, adapter: EmulatedUGPlus) -> None:
+    server = start_server(adapter)
+    # Identical requests, that arrive together, are in flight at the same time
+    responses = exchange(server.path, [(Opcode.DISCOVER, 0)] * 5)
+    assert responses == {i: (Status.OK, bytes((9,))) for i in range(5)}
+    assert server.requests_coalesced == 4
+    assert server.requests_served == 5
+
+
+def test_error_propagation(start_server: ServerFactory, adapter: EmulatedUGPlus) -> None:
+    server = start_server(adapter, recovery=RecoveryPolicy(enabled=False))
+    status, message = exchange(server.path, [(0xEE, 0)])[0]
+    assert status == Status.VALUE_ERROR
+    assert b"238" in message
+    with UGPlusGpibClient(server.path) as client:
+        # A device, that does not answer
+        with pytest.raises(OSError) as exc_info:
+            client.query(8, b"A\n")
+        assert exc_info.value.errno == errno.EIO
+        # The connection is still usable after an error
+        assert client.query(9, b"A\n") == b"A\n"
+        with pytest.raises(NotImplementedError):
+            client.query_values(9, b"A\n")
+        adapter.unplug()
+        with pytest.raises(OSError) as exc_info:
+            client.get_gpib_devices()
+        assert exc_info.value.errno == errno.ENODEV
@@ -0,0 +1,123 @@
+"""
+Tests of the thread-safe front end `SharedUGPlusGpib`.
+"""
+
+# pylint: disable=missing-function-docstring
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from typing import Callable
+
+import pytest
+
+from ug_gpib import Priority, SharedUGPlusGpib, UGPlusGpib
+from ug_gpib.emulator import EmulatedInstrument, EmulatedUGPlus
+
+GpibFactory = Callable[..., UGPlusGpib]
+
+
+def block_worker(shared: SharedUGPlusGpib) -> threading.Event:
+    """Occupy the worker thread until the returned event is set."""
+    started, release = threading.Event(), threading.Event()
+
+    def blocker(_gpib: UGPlusGpib) -> None:
+        started.set()
+        release.wait(5)
+
+    shared.submit(blocker)
+    assert started.wait(5)
+    return release
+
+
+def test_requests(make_gpib: GpibFactory, adapter: EmulatedUGPlus, instrument: EmulatedInstrument) -> None:
+    with SharedUGPlusGpib(make_gpib(adapter)) as shared:
+        assert shared.query(9, b"*IDN?\n").result(5) == b"*IDN?\n"
+        shared.write(9, b"A\n").result(5)
+        assert shared.read(9).result(5) == b"A\n"
+        assert shared.query_many(9, [b"B\n", b"C\n"]).result(5) == [b"B\n", b"C\n"]
+        assert shared.version().result(5) == (1, 0)
+        assert shared.get_gpib_devices().result(5) == (9,)
+    assert instrument.received[:4] == [b"*IDN?\n", b"A\n", b"B\n", b"C\n"]
+
+
+def test_priority(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    order: list[str] = []
+    with SharedUGPlusGpib(make_gpib(adapter)) as shared:
+        release = block_worker(shared)
+        futures = [
+            shared.submit(lambda _gpib, name=name: order.append(name), priority)  # type: ignore[misc]
+            for name, priority in (
+                ("low", Priority.LOW),
+                ("normal 1", Priority.NORMAL),
+                ("high", Priority.HIGH),
+                ("normal 2", Priority.NORMAL),
+            )
+        ]
+        assert shared.pending == 4
+        release.set()
+        for future in futures:
+            future.result(5)
+    # Ordered by priority, then in the order of submission
+    assert order == ["high", "normal 1", "normal 2", "low"]
+
+
+def test_concurrent_queries(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    with SharedUGPlusGpib(make_gpib(adapter)) as shared:
+
+        def worker(thread: int) -> list[bytes | None]:
+            return [shared.query(9, f"{thread}:{i}\n".encode()).result(5) for i in range(20)]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(worker, range(8)))
+
+    assert results == [[f"{thread}:{i}\n".encode() for i in range(20)] for thread in range(8)]
+
+
+def test_exception_is_returned_in_future(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    def fail(_gpib: UGPlusGpib) -> None:
+        raise ValueError("test")
+
+    with SharedUGPlusGpib(make_gpib(adapter)) as shared:
+        with pytest.raises(ValueError):
+            shared.submit(fail).result(5)
+        # The worker is still alive
+        assert shared.query(9, b"X\n").result(5) == b"X\n"
+
+
+def test_close_waits_for_pending(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    shared = SharedUGPlusGpib(make_gpib(adapter))
+    release = block_worker(shared)
+    future = shared.query(9, b"X\n")
+    threading.Timer(0.05, release.set).start()
+    shared.close()
+    assert future.result(0) == b"X\n"
+
+
+def test_close_cancel_pending(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    shared = SharedUGPlusGpib(make_gpib(adapter))
+    release = block_worker(shared)
+    futures = [shared.query(9, b"X\n") for _ in range(3)]
+    threading.Timer(0.05, release.set).start()
+    shared.close(cancel_pending=True)
+    for future in futures:
+        assert future.cancelled()
+        with pytest.raises(CancelledError):
+            future.result(0)
+
+
+def test_closed(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    shared = SharedUGPlusGpib(make_gpib(adapter))
+    shared.close()
+    shared.close()  # Closing twice is harmless
+    with pytest.raises(RuntimeError):
+        shared.query(9, b"X\n")
+
+
+def test_close_from_worker(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    shared = SharedUGPlusGpib(make_gpib(adapter))
+    # Must not deadlock by joining the worker from within
+    shared.submit(lambda _gpib: shared.close()).result(5)
+    with pytest.raises(RuntimeError):
+        shared.query(9, b"X\n")
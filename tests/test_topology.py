@@ -0,0 +1,94 @@
+"""
+Tests of the bus topology tracker `BusTopology`.
+"""
+
+# pylint: disable=missing-function-docstring,redefined-outer-name
+
+from __future__ import annotations
+
+import time
+from typing import Callable, Iterator
+
+import pytest
+
+from ug_gpib import BusTopology, ResponseLatencyScheduler, SharedUGPlusGpib, UGPlusGpib
+from ug_gpib.emulator import EmulatedInstrument, EmulatedUGPlus
+
+GpibFactory = Callable[..., UGPlusGpib]
+
+
+def wait_for_scans(tracker: BusTopology, scans: int, timeout: float = 2) -> bool:
+    end = time.monotonic() + timeout
+    while tracker.scans < scans:
+        if time.monotonic() > end:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+@pytest.fixture
+def shared(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> Iterator[SharedUGPlusGpib]:
+    adapter.gpib_timeout = 0.01
+    with SharedUGPlusGpib(make_gpib(adapter, latency_scheduler=ResponseLatencyScheduler(max_wait=0.1))) as shared:
+        yield shared
+
+
+def failed_read(shared: SharedUGPlusGpib, adaptive: bool = False) -> None:
+    # The instrument has no output pending, so the read fails
+    with pytest.raises(OSError):
+        shared.submit(lambda gpib: gpib.read(9, adaptive=adaptive)).result(5)
+
+
+def test_initial_scan(shared: SharedUGPlusGpib) -> None:
+    with BusTopology(shared, interval=60, min_interval=0) as tracker:
+        assert tracker.wait_for_scan(2)
+        assert tracker.devices == frozenset((9,))
+
+
+def test_rescan_after_consecutive_failures(shared: SharedUGPlusGpib) -> None:
+    with BusTopology(shared, interval=60, min_interval=0, failure_threshold=3) as tracker:
+        assert wait_for_scans(tracker, 1)
+        failed_read(shared)
+        failed_read(shared)
+        assert not wait_for_scans(tracker, 2, timeout=0.1)
+        failed_read(shared)
+        assert wait_for_scans(tracker, 2)
+
+
+def test_success_resets_failures(shared: SharedUGPlusGpib) -> None:
+    with BusTopology(shared, interval=60, min_interval=0, failure_threshold=2) as tracker:
+        assert wait_for_scans(tracker, 1)
+        failed_read(shared)
+        assert shared.query(9, b"X\n").result(5) == b"X\n"
+        failed_read(shared)
+        assert not wait_for_scans(tracker, 2, timeout=0.1)
+
+
+def test_adaptive_polls_do_not_trigger_scans(make_gpib: GpibFactory) -> None:
+    # The device needs several polls to answer
+    adapter = EmulatedUGPlus(instruments={9: EmulatedInstrument(reply=b"1.0\n", delay=0.05)}, gpib_timeout=0.005)
+    scheduler = ResponseLatencyScheduler(poll_interval=0.002)
+    with SharedUGPlusGpib(make_gpib(adapter, latency_scheduler=scheduler)) as shared:
+        with BusTopology(shared, interval=60, min_interval=0, failure_threshold=1) as tracker:
+            assert wait_for_scans(tracker, 1)
+            for _ in range(3):
+                assert shared.submit(lambda gpib: gpib.query(9, b"MEAS?\n", adaptive=True)).result(5) == b"1.0\n"
+            assert not wait_for_scans(tracker, 2, timeout=0.1)
+
+
+def test_unanswered_adaptive_read_counts_once(shared: SharedUGPlusGpib) -> None:
+    with BusTopology(shared, interval=60, min_interval=0, failure_threshold=2) as tracker:
+        assert wait_for_scans(tracker, 1)
+        failed_read(shared, adaptive=True)
+        assert not wait_for_scans(tracker, 2, timeout=0.1)
+        failed_read(shared, adaptive=True)
+        assert wait_for_scans(tracker, 2)
+
+
+def test_removed_device(shared: SharedUGPlusGpib, adapter: EmulatedUGPlus) -> None:
+    with BusTopology(shared, interval=60, min_interval=0, failure_threshold=1) as tracker:
+        assert wait_for_scans(tracker, 1)
+        del adapter.instruments[9]
+        failed_read(shared)
+        assert wait_for_scans(tracker, 2)
+        assert tracker.devices == frozenset()
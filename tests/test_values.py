@@ -0,0 +1,75 @@
+"""
+Tests of reading lists of ASCII encoded numbers.
+"""
+
+# pylint: disable=missing-function-docstring
+
+from __future__ import annotations
+
+from typing import Callable
+
+import pytest
+
+from ug_gpib import UGPlusGpib
+from ug_gpib.emulator import EmulatedUGPlus
+
+np = pytest.importorskip("numpy")
+
+GpibFactory = Callable[..., UGPlusGpib]
+
+
+@pytest.mark.parametrize(
+    "reply, separator, expected",
+    [
+        (b"1.5,2.5,3.5\n", ",", [1.5, 2.5, 3.5]),
+        (b"1.5 , 2.5,  3.5 \n", ",", [1.5, 2.5, 3.5]),
+        (b"1.5  2.5 3.5\n", " ", [1.5, 2.5, 3.5]),
+        (b"  1.5\t2.5 3.5 \n", " ", [1.5, 2.5, 3.5]),
+        (b"-1E+03\n", ",", [-1000.0]),
+        (b"\n", ",", []),
+    ],
+)
+def test_query_values(
+    make_gpib: GpibFactory, adapter: EmulatedUGPlus, reply: bytes, separator: str, expected: list[float]
+) -> None:
+    gpib = make_gpib(adapter)
+    values = gpib.query_values(9, reply, separator)
+    np.testing.assert_array_equal(values, np.array(expected))
+
+
+@pytest.mark.parametrize(
+    "reply, separator",
+    [
+        (b"1.5,2.5,3.5,\n", ","),
+        (b"1.5,2.5,3.5, \n", ","),
+        (b"1.5,,3.5\n", ","),
+        (b"1.5,x,3.5\n", ","),
+        (b"1.5,2.5;3.5\n", ","),
+        (b"1.5 2.5\n", ","),
+    ],
+)
+def test_query_values_invalid(make_gpib: GpibFactory, adapter: EmulatedUGPlus, reply: bytes, separator: str) -> None:
+    gpib = make_gpib(adapter)
+    with pytest.raises(ValueError):
+        gpib.query_values(9, reply, separator)
+
+
+def test_query_values_dtype(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    gpib = make_gpib(adapter)
+    values = gpib.query_values(9, b"1,2,3\n", dtype=np.int32)
+    assert values.dtype == np.int32
+    np.testing.assert_array_equal(values, [1, 2, 3])
+    with pytest.raises(ValueError):
+        gpib.query_values(9, b"1,2.5,3\n", dtype=np.int32)
+
+
+def test_query_values_termination(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    gpib = make_gpib(adapter)
+    np.testing.assert_array_equal(gpib.query_values(9, b"1;2;3\r\n", ";", termination=b"\r\n"), [1, 2, 3])
+
+
+def test_read_values_spanning_replies(make_gpib: GpibFactory, adapter: EmulatedUGPlus) -> None:
+    gpib = make_gpib(adapter)
+    expected = np.arange(200) / 4
+    gpib.write_stream(9, ",".join(str(value) for value in expected).encode() + b"\n")
+    np.testing.assert_array_equal(gpib.read_values(9), expected)
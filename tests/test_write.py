@@ -0,0 +1,116 @@
+"""
+Tests of the frames sent by `write()` and `write_stream()`.
+"""
+
+# pylint: disable=missing-function-docstring
+
+from __future__ import annotations
+
+import errno
+import io
+import time
+from typing import Callable
+
+import pytest
+from usb.core import USBError
+
+from ug_gpib import UGPlusGpib
+from ug_gpib.codec import FLAGS_EOI, FLAGS_NO_EOI, MAX_WRITE_DATA, UgPlusCommands
+from ug_gpib.emulator import EmulatedInstrument, EmulatedUGPlus
+
+GpibFactory = Callable[..., UGPlusGpib]
+
+
+def record_transfers(monkeypatch: pytest.MonkeyPatch, adapter: EmulatedUGPlus) -> list[bytes]:
+    """Record the OUT transfers sent to the adapter."""
+    transfers: list[bytes] = []
+    write_transfer = adapter.write_transfer
+
+    def recorder(data: bytes) -> int:
+        transfers.append(data)
+        return write_transfer(data)
+
+    monkeypatch.setattr(adapter, "write_transfer", recorder)
+    return transfers
+
+
+def test_write_sends_unpadded_frame(
+    monkeypatch: pytest.MonkeyPatch, make_gpib: GpibFactory, adapter: EmulatedUGPlus, instrument: EmulatedInstrument
+) -> None:
+    gpib = make_gpib(adapter)
+    gpib.connect()
+    transfers = record_transfers(monkeypatch, adapter)
+    gpib.write(9, b"*IDN?\n")
+    assert transfers == [bytes((UgPlusCommands.WRITE, 10, 9, FLAGS_EOI)) + b"*IDN?\n"]
+    assert instrument.received == [b"*IDN?\n"]
+
+
+def test_write_long_data(
+    monkeypatch: pytest.MonkeyPatch, make_gpib: GpibFactory, adapter: EmulatedUGPlus, instrument: EmulatedInstrument
+) -> None:
+    gpib = make_gpib(adapter)
+    gpib.connect()
+    transfers = record_transfers(monkeypatch, adapter)
+    data = bytes(i % 256 for i in range(3 * MAX_WRITE_DATA + 10))
+    gpib.write(9, data)
+    assert b"".join(instrument.received) == data
+    gpib.write_stream(9, data)
+    assert transfers[0] == transfers[1]
+
+
+def test_write_stream_single_frame_like_write(
+    monkeypatch: pytest.MonkeyPatch, make_gpib: GpibFactory, adapter: EmulatedUGPlus
+) -> None:
+    gpib = make_gpib(adapter)
+    gpib.connect()
+    transfers = record_transfers(monkeypatch, adapter)
+    gpib.write_stream(9, [b"*ID", b"N?\n"])
+    gpib.write(9, b"*IDN?\n")
+    assert transfers[0] == transfers[1]
+
+
+@pytest.mark.parametrize("length", [MAX_WRITE_DATA, MAX_WRITE_DATA + 1, 10 * MAX_WRITE_DATA + 7, 100_000])
+def test_write_stream_long_message(
+    monkeypatch: pytest.MonkeyPatch,
+    make_gpib: GpibFactory,
+    adapter: EmulatedUGPlus,
+    instrument: EmulatedInstrument,
+    length: int,
+) -> None:
+    gpib = make_gpib(adapter)
+    gpib.connect()
+    transfers = record_transfers(monkeypatch, adapter)
+    data = bytes(i % 251 for i in range(length))
+    assert gpib.write_stream(9, io.BytesIO(data)) == length
+    assert b"".join(instrument.received) == data
+    # Only the last frame asserts EOI and it is not padded
+    last = transfers[-1]
+    frame_start = len(last) - (length - 1) % MAX_WRITE_DATA - 5
+    assert last[frame_start : frame_start + 4] == bytes((UgPlusCommands.WRITE, len(last) - frame_start, 9, FLAGS_EOI))
+    if length > MAX_WRITE_DATA:
+        assert transfers[0][3] == FLAGS_NO_EOI
+
+
+def test_write_timeout_limits_transfer(
+    monkeypatch: pytest.MonkeyPatch, make_gpib: GpibFactory, adapter: EmulatedUGPlus
+) -> None:
+    gpib = make_gpib(adapter, timeout=5)
+    gpib.connect()
+    timeouts: list[int] = []
+
+    def stall(data: bytes, timeout: int | None = None) -> int:
+        """A write, that is never acknowledged by the adapter."""
+        del data
+        assert timeout is not None
+        timeouts.append(timeout)
+        time.sleep(timeout / 1000)
+        raise USBError("Operation timed out", errno=errno.ETIMEDOUT)
+
+    monkeypatch.setattr(adapter.write_ep, "write", stall)
+    start = time.monotonic()
+    with pytest.raises(OSError) as exc_info:
+        gpib.write(9, b"A\n", timeout=0.05)
+    assert exc_info.value.errno == errno.ETIMEDOUT
+    assert time.monotonic() - start < 0.5
+    assert 1 <= timeouts[0] <= 50
+    assert gpib.metrics.timeouts >= 1
@@ -1,6 +1,78 @@
 """
 A python library for the LQ Electronics Corp. UGPlus USB to GPIB Controller.
+
+The classes are imported on first access, so that importing the package does not import pyUSB or other dependencies
+not needed by the application.
 """
 
+from __future__ import annotations
+
+import importlib
+
 from ._version import __version__
-from .ug_gpib import UGPlusGpib
+
+# Do not import typing, it is slow to import. Type checkers treat this name like typing.TYPE_CHECKING.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any
+
+    from .acquisition import AcquisitionEngine, AcquisitionRun, Channel
+    from .async_ug_gpib import AsyncUGPlusGpib
+    from .cancellation import CancellationToken, OperationCancelled
+    from .capture import ReplayDevice, TransferRecorder
+    from .client import UGPlusGpibClient
+    from .latency import LatencyStats, ResponseLatencyScheduler
+    from .location_cache import AdapterLocationCache
+    from .metrics import HistogramSnapshot, Metrics, MetricsSnapshot
+    from .pool import AdapterPool
+    from .query_cache import CacheStats, QueryCache
+    from .recovery import RecoveryPolicy, RecoveryStats
+    from .shared import Priority, SharedUGPlusGpib
+    from .topology import BusTopology, TopologyChange, TopologyEvent
+    from .ug_gpib import UGPlusGpib
+
+# Maps the public names to the modules defining them
+_LAZY_IMPORTS = {
+    "AcquisitionEngine": ".acquisition",
+    "AcquisitionRun": ".acquisition",
+    "Channel": ".acquisition",
+    "AsyncUGPlusGpib": ".async_ug_gpib",
+    "CancellationToken": ".cancellation",
+    "OperationCancelled": ".cancellation",
+    "ReplayDevice": ".capture",
+    "TransferRecorder": ".capture",
+    "UGPlusGpibClient": ".client",
+    "LatencyStats": ".latency",
+    "ResponseLatencyScheduler": ".latency",
+    "AdapterLocationCache": ".location_cache",
+    "HistogramSnapshot": ".metrics",
+    "Metrics": ".metrics",
+    "MetricsSnapshot": ".metrics",
+    "AdapterPool": ".pool",
+    "CacheStats": ".query_cache",
+    "QueryCache": ".query_cache",
+    "RecoveryPolicy": ".recovery",
+    "RecoveryStats": ".recovery",
+    "Priority": ".shared",
+    "SharedUGPlusGpib": ".shared",
+    "BusTopology": ".topology",
+    "TopologyChange": ".topology",
+    "TopologyEvent": ".topology",
+    "UGPlusGpib": ".ug_gpib",
+}
+
+__all__ = ["__version__", *_LAZY_IMPORTS]
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    # Cache the value, so that __getattr__ is only called once per name
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
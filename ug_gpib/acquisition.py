@@ -0,0 +1,454 @@
+"""
+Continuous acquisition of values from GPIB devices into memory-mapped files. The `AcquisitionEngine` polls a set of
+channels at fixed intervals and appends a timestamp and a value per sample to one file per channel. Only a window of
+each file is mapped at a time, so the memory used stays constant during runs of any length. `AcquisitionRun` opens the
+files as numpy arrays without copying the data, also while the run is still in progress.
+
+File format
+-----------
+A run is a directory containing the file "run.json", which describes the channels, and one file per channel named
+"<channel>.ugacq". A channel file starts with a 32 byte header: the magic bytes b"UGACQ", a format version byte, two
+padding bytes, the number of records (uint64) and eight padding bytes. It is followed by the records, each consisting
+of a timestamp (float64), the monotonic time in seconds when the query was sent, and the value (float64). All numbers
+are little-endian. Failed queries are stored as NaN values. The number of records is updated on every flush, records
+beyond it are not valid.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import TracebackType
+from typing import Any, BinaryIO, Callable, Iterable
+
+from .ug_gpib import UGPlusGpib
+
+if sys.version_info < (3, 11):
+    from typing_extensions import Self
+else:
+    from typing import Self
+
+MAGIC = b"UGACQ"
+FORMAT_VERSION = 1
+FILE_HEADER = struct.Struct("<5sB2xQ8x")
+RECORD = struct.Struct("<dd")
+# The numpy dtype of a record
+RECORD_DTYPE = [("timestamp", "<f8"), ("value", "<f8")]
+RUN_FILE = "run.json"
+CHANNEL_SUFFIX = ".ugacq"
+
+_CHANNEL_NAME = re.compile(r"[A-Za-z0-9_.-]+")
+
+
+@dataclass(frozen=True)
+class Channel:
+    """A query polled at a fixed interval. The reply is converted to a float by the parser."""
+
+    name: str
+    pad: int
+    query: bytes
+    interval: float
+    parser: Callable[[bytes], float] = float
+
+    def __post_init__(self) -> None:
+        if not _CHANNEL_NAME.fullmatch(self.name):
+            raise ValueError(f"Invalid channel name {self.name!r}. Use letters, digits, '_', '.' and '-' only.")
+        if self.interval < 0:
+            raise ValueError(f"Invalid interval {self.interval} of channel {self.name!r}.")
+
+
+class ChannelWriter:
+    """
+    Appends records to a channel file. The file is mapped in windows of `window_records` records. The file is extended
+    by a window at a time, when the current window is full.
+    """
+
+    def __init__(self, path: str | os.PathLike[str], window_records: int = 2**16) -> None:
+        """
+        Create a new channel file. An existing file is overwritten.
+        Parameters
+        ----------
+        path: str or os.PathLike
+            The file to write to
+        window_records: int, default=65536
+            The number of records mapped at a time
+        """
+        assert window_records > 0
+        self.__file: BinaryIO = open(path, "w+b")  # pylint: disable=consider-using-with
+        self.__window_records = window_records
+        self.__mmap: mmap.mmap | None = None
+        self.__window_offset = 0  # The position of the window in the mapping
+        self.__window_start = 0  # The index of the first record of the window
+        self.records = 0
+        self.__write_header()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.close()
+
+    def __write_header(self) -> None:
+        self.__file.seek(0)
+        self.__file.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION, self.records))
+        self.__file.flush()
+
+    def __map_window(self) -> None:
+        """Extend the file and map the window starting at the next record."""
+        if self.__mmap is not None:
+            self.__mmap.close()
+        start = FILE_HEADER.size + self.records * RECORD.size
+        end = start + self.__window_records * RECORD.size
+        # Mappings must start at a multiple of the allocation granularity
+        aligned_start = start - start % mmap.ALLOCATIONGRANULARITY
+        self.__file.truncate(end)
+        self.__mmap = mmap.mmap(self.__file.fileno(), end - aligned_start, offset=aligned_start)
+        self.__window_offset = start - aligned_start
+        self.__window_start = self.records
+
+    def append(self, timestamp: float, value: float) -> None:
+        """
+        Append a record.
+        Parameters
+        ----------
+        timestamp: float
+            The time of the sample
+        value: float
+            The value of the sample
+        """
+        index = self.records - self.__window_start
+        if self.__mmap is None or index == self.__window_records:
+            self.__map_window()
+            index = 0
+        assert self.__mmap is not None
+        RECORD.pack_into(self.__mmap, self.__window_offset + index * RECORD.size, timestamp, value)
+        self.records += 1
+
+    def flush(self) -> None:
+        """Write the records to the disk and update the number of records in the header."""
+        if self.__mmap is not None:
+            self.__mmap.flush()
+        self.__write_header()
+
+    def close(self) -> None:
+        """Flush the records and truncate the unused part of the last window."""
+        if self.__file.closed:
+            return
+        self.flush()
+        if self.__mmap is not None:
+            self.__mmap.close()
+            self.__mmap = None
+        self.__file.truncate(FILE_HEADER.size + self.records * RECORD.size)
+        self.__file.close()
+
+
+class AcquisitionEngine:  # pylint: disable=too-many-instance-attributes
+    """
+    Polls channels at fixed intervals and records the values. Channels due at the same time are sent as a single
+    batch, see `UGPlusGpib.query_batch()`. If the bus cannot keep up, samples are skipped and counted as overruns, so
+    that the schedule does not drift. Failed queries and replies, that cannot be parsed, are recorded as NaN and
+    counted as errors of the channel.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        gpib: UGPlusGpib,
+        channels: Iterable[Channel],
+        directory: str | os.PathLike[str],
+        *,
+        window_records: int = 2**16,
+        flush_interval: float = 1.0,
+    ) -> None:
+        """
+        Create an acquisition run. The directory is created if needed and the channel files are created immediately.
+        Parameters
+        ----------
+        gpib: UGPlusGpib
+            The driver. It must not be used by others while the engine is running.
+        channels: Iterable of Channel
+            The channels to poll
+        directory: str or os.PathLike
+            The directory of the run
+        window_records: int, default=65536
+            The number of records per channel mapped at a time
+        flush_interval: float, default=1.0
+            The time in seconds between flushes of the files. A reader sees the records written up to the last flush.
+        """
+        self.__gpib = gpib
+        self.channels = tuple(channels)
+        if len({channel.name for channel in self.channels}) != len(self.channels):
+            raise ValueError("The channel names must be unique.")
+        self.directory = Path(directory)
+        self.flush_interval = flush_interval
+        self.__logger = logging.getLogger(__name__)
+        self.__stop = threading.Event()
+        self.__thread: threading.Thread | None = None
+        # The error, that stopped the background thread
+        self.__error: BaseException | None = None
+        self.samples = 0
+        self.errors = 0
+        # The number of errors per channel name
+        self.channel_errors = {channel.name: 0 for channel in self.channels}
+        self.overruns = 0
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.__writers = [
+            ChannelWriter(self.directory / (channel.name + CHANNEL_SUFFIX), window_records) for channel in self.channels
+        ]
+        description = {
+            "format_version": FORMAT_VERSION,
+            "start_time": time.time(),
+            "start_monotonic": time.monotonic(),
+            "channels": [
+                {
+                    "name": channel.name,
+                    "pad": channel.pad,
+                    "query": channel.query.decode("latin-1"),
+                    "interval": channel.interval,
+                }
+                for channel in self.channels
+            ],
+        }
+        with open(self.directory / RUN_FILE, "w", encoding="utf-8") as file:
+            json.dump(description, file, indent=2)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.close()
+
+    def __acquire(self, batch: list[int], timestamp: float) -> None:
+        """Query the channels of a batch and record the values."""
+        channels = [self.channels[index] for index in batch]
+        try:
+            replies = self.__gpib.query_batch(
+                [(channel.pad, channel.query) for channel in channels], raise_errors=False
+            )
+        except OSError as exc:
+            self.__logger.error("Cannot query the GPIB devices: %(error)s.", {"error": exc})
+            replies = [None] * len(batch)
+        for index, channel, reply in zip(batch, channels, replies):
+            value = math.nan
+            if reply is not None:
+                try:
+                    value = float(channel.parser(reply))
+                except Exception as exc:  # pylint: disable=broad-exception-caught
+                    # A parser may fail in many ways on unexpected replies. This must not stop the acquisition.
+                    self.__logger.debug(
+                        "Invalid reply on channel %(channel)s: %(reply)r (%(error)r).",
+                        {"channel": channel.name, "reply": reply, "error": exc},
+                    )
+                    value = math.nan
+            if math.isnan(value):
+                self.errors += 1
+                self.channel_errors[channel.name] += 1
+            self.__writers[index].append(timestamp, value)
+        self.samples += len(batch)
+
+    def run(self, duration: float | None = None) -> None:
+        """
+        Poll the channels in the calling thread until the duration has passed or `stop()` is called.
+        Parameters
+        ----------
+        duration: float, optional
+            The time in seconds to run. By default, run until stopped.
+        """
+        now = time.monotonic()
+        end = now + duration if duration is not None else math.inf
+        next_flush = now + self.flush_interval
+        # A heap of the time each channel is due next
+        schedule = [(now, index) for index in range(len(self.channels))]
+        while schedule and not self.__stop.is_set():
+            now = time.monotonic()
+            if now >= end:
+                break
+            wakeup = min(schedule[0][0], next_flush, end)
+            if wakeup > now:
+                self.__stop.wait(wakeup - now)
+                continue
+            due_channels = []
+            while schedule and schedule[0][0] <= now:
+                due_channels.append(heapq.heappop(schedule))
+            for due, index in due_channels:
+                interval = self.channels[index].interval
+                due += interval
+                if due <= now and interval > 0:
+                    # Skip the samples, that can no longer be taken in time
+                    missed = math.floor((now - due) / interval) + 1
+                    self.overruns += missed
+                    due += missed * interval
+                # Channels with an interval of 0 are polled as fast as possible
+                heapq.heappush(schedule, (max(due, now), index))
+            if due_channels:
+                self.__acquire([index for _, index in due_channels], now)
+            if now >= next_flush:
+                self.flush()
+                next_flush = now + self.flush_interval
+        self.flush()
+
+    def start(self) -> None:
+        """
+        Poll the channels in a background thread until `stop()` is called. If the thread fails, the error is raised by
+        `stop()`.
+        """
+        assert self.__thread is None
+        self.__stop.clear()
+        self.__error = None
+        self.__thread = threading.Thread(target=self.__run_thread, name="ug_gpib-acquisition", daemon=True)
+        self.__thread.start()
+
+    def __run_thread(self) -> None:
+        try:
+            self.run()
+        except BaseException as exc:  # pylint: disable=broad-exception-caught
+            self.__logger.exception("The acquisition stopped because of an error.")
+            self.__error = exc
+
+    @property
+    def running(self) -> bool:
+        """
+        Returns
+        -------
+        bool
+            True while the background thread started using `start()` is polling
+        """
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def stop(self) -> None:
+        """
+        Stop polling. Waits for the background thread, if it was started using `start()`.
+        Raises
+        ------
+        Exception
+            The error, that stopped the background thread
+        """
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        error, self.__error = self.__error, None
+        if error is not None:
+            raise error
+
+    def flush(self) -> None:
+        """Write the records to the disk, so that readers can see them."""
+        for writer in self.__writers:
+            writer.flush()
+
+    def close(self) -> None:
+        """
+        Stop polling and close the channel files. The driver is not closed.
+        Raises
+        ------
+        Exception
+            The error, that stopped the background thread. The files are closed anyway.
+        """
+        try:
+            self.stop()
+        finally:
+            for writer in self.__writers:
+                writer.close()
+
+
+class AcquisitionRun:
+    """
+    A recorded run. The channels are opened as read-only numpy memory maps with the fields "timestamp" and "value".
+    Requires numpy.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str]) -> None:
+        """
+        Open a run.
+        Parameters
+        ----------
+        directory: str or os.PathLike
+            The directory of the run
+        Raises
+        ------
+        ValueError
+            If the format version is not supported
+        """
+        self.directory = Path(directory)
+        with open(self.directory / RUN_FILE, encoding="utf-8") as file:
+            description = json.load(file)
+        if description["format_version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported acquisition format version {description['format_version']}.")
+        self.start_time: float = description["start_time"]
+        self.start_monotonic: float = description["start_monotonic"]
+        self.channels: tuple[str, ...] = tuple(channel["name"] for channel in description["channels"])
+
+    def __getitem__(self, channel: str) -> Any:
+        """
+        Map the records of a channel.
+        Parameters
+        ----------
+        channel: str
+            The name of the channel
+        Returns
+        -------
+        numpy.memmap
+            The records flushed so far
+        Raises
+        ------
+        KeyError
+            If there is no channel with this name
+        ValueError
+            If the channel file is invalid
+        """
+        import numpy  # pylint: disable=import-outside-toplevel
+
+        if channel not in self.channels:
+            raise KeyError(channel)
+        path = self.directory / (channel + CHANNEL_SUFFIX)
+        with open(path, "rb") as file:
+            header = file.read(FILE_HEADER.size)
+        if len(header) != FILE_HEADER.size or header[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"'{path}' is not an acquisition channel file.")
+        _, version, records = FILE_HEADER.unpack(header)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported acquisition format version {version}.")
+        if records == 0:
+            return numpy.empty(0, dtype=RECORD_DTYPE)
+        return numpy.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=FILE_HEADER.size, shape=(records,))
+
+    def timestamps(self, channel: str) -> Any:
+        """
+        Parameters
+        ----------
+        channel: str
+            The name of the channel
+        Returns
+        -------
+        numpy.ndarray
+            A view of the timestamps of the channel
+        """
+        return self[channel]["timestamp"]
+
+    def values(self, channel: str) -> Any:
+        """
+        Parameters
+        ----------
+        channel: str
+            The name of the channel
+        Returns
+        -------
+        numpy.ndarray
+            A view of the values of the channel
+        """
+        return self[channel]["value"]
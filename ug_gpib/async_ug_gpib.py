@@ -0,0 +1,318 @@
+"""
+An asyncio front end for the LQ Electronics Corp UGPlus USB to GPIB Controller. The blocking USB transfers are run on a
+dedicated I/O thread, so that the event loop stays responsive.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from types import TracebackType
+from typing import Any, BinaryIO, Callable, Iterable, TypeVar
+
+from .cancellation import CancellationToken
+from .ug_gpib import UGPlusGpib
+
+if sys.version_info < (3, 11):
+    from typing_extensions import Self
+else:
+    from typing import Self
+
+T = TypeVar("T")
+
+
+class AsyncUGPlusGpib:
+    """
+    An asyncio device driver for the LQ Electronics Corp UGPlus USB to GPIB Controller. Access to the adapter is
+    serialized internally, so the driver can be shared by any number of coroutines.
+    """
+
+    def __init__(self, device_series: int = 2654079, timeout: float | None = None, **kwargs: Any) -> None:
+        """
+        Create an asyncio UGPlus device driver object. Call `connect()` or use the object as an async context manager
+        to connect to the adapter.
+        Parameters
+        ----------
+        device_series: int, optional
+            The device series number to connect to
+        timeout: float, optional
+            The timeout for running commands in seconds
+        **kwargs
+            Additional keyword arguments passed to `UGPlusGpib`
+        """
+        self.__device_series = device_series
+        self.__timeout = timeout
+        self.__kwargs = kwargs
+        self.__gpib: UGPlusGpib | None = None
+        self.__executor: ThreadPoolExecutor | None = None
+        self.__lock: asyncio.Lock | None = None
+
+    async def __aenter__(self) -> Self:
+        await self.connect()
+        return self
+
+    async def __aexit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        await self.disconnect()
+
+    @property
+    def is_connected(self) -> bool:
+        """
+        Returns
+        -------
+        bool
+            True if the driver is connected to the adapter
+        """
+        return self.__gpib is not None
+
+    async def connect(self) -> None:
+        """
+        Search for the adapter and connect to it. The USB enumeration is done on the I/O thread.
+        """
+        if self.__gpib is not None:
+            return
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ug_gpib")
+        self.__lock = asyncio.Lock()
+        try:
+            self.__gpib = await self.__run(
+                functools.partial(UGPlusGpib, self.__device_series, self.__timeout, **self.__kwargs)
+            )
+        except BaseException:
+            self.__executor.shutdown(wait=False)
+            self.__executor = None
+            raise
+
+    async def disconnect(self) -> None:
+        """
+        Disconnect from the adapter and stop the I/O thread. Pending operations are completed first.
+        """
+        if self.__executor is None:
+            return
+        executor, self.__executor = self.__executor, None
+        if self.__gpib is not None:
+            # Queued behind the pending operations
+            executor.submit(self.__gpib.close)
+        self.__gpib = None
+        await asyncio.get_running_loop().run_in_executor(None, functools.partial(executor.shutdown, wait=True))
+
+    async def __run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a blocking function on the I/O thread. The call is shielded from cancellation, because an interrupted
+        transfer would leave the adapter in an undefined state.
+        """
+        assert self.__executor is not None
+        loop = asyncio.get_running_loop()
+        return await asyncio.shield(loop.run_in_executor(self.__executor, functools.partial(func, *args, **kwargs)))
+
+    async def __run_cancellable(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a driver call, that takes a cancellation token, on the I/O thread. If the coroutine is cancelled, the call
+        is aborted using the token, so that the driver skips the reply, when it arrives.
+        """
+        token = CancellationToken()
+        try:
+            return await self.__run(func, *args, cancel=token, **kwargs)
+        except asyncio.CancelledError:
+            token.cancel()
+            raise
+
+    def __get_gpib(self) -> tuple[UGPlusGpib, asyncio.Lock]:
+        if self.__gpib is None or self.__lock is None:
+            raise ConnectionError("Not connected to the GPIB adapter.")
+        return self.__gpib, self.__lock
+
+    async def get_manufacturer_id(self) -> str:
+        """
+        Get the manufacturer id of the GPIB adapter.
+        Returns
+        -------
+        str
+            The manufacturer id
+        """
+        gpib, lock = self.__get_gpib()
+        async with lock:
+            return await self.__run(gpib.get_manufacturer_id)
+
+    async def get_series_number(self) -> tuple[int, int]:
+        """
+        Query the GPIB controller series number.
+        Returns
+        -------
+        tuple of int
+            An integer that is the model number and an integer for the series number
+        """
+        gpib, lock = self.__get_gpib()
+        async with lock:
+            return await self.__run(gpib.get_series_number)
+
+    async def version(self) -> tuple[int, int]:
+        """
+        Get the GPIB adapter firmware version
+        Returns
+        -------
+        tuple of int
+            The major and minor firmware revision
+        """
+        gpib, lock = self.__get_gpib()
+        async with lock:
+            return await self.__run(gpib.version)
+
+    async def get_gpib_devices(self, *, timeout: float | None = None, deadline: float | None = None) -> tuple[int, ...]:
+        """
+        Try to identify all addresses, that have a GPIB device connected to it
+        Parameters
+        ----------
+        timeout: float, optional
+            The time in seconds the call may take. See `UGPlusGpib.get_gpib_devices()`.
+        deadline: float, optional
+            The time of `time.monotonic()`, when the call must be finished
+        Returns
+        -------
+        tuple of int
+            The primary addresses of the GPIB devices discovered
+        """
+        gpib, lock = self.__get_gpib()
+        async with lock:
+            return await self.__run_cancellable(gpib.get_gpib_devices, timeout=timeout, deadline=deadline)
+
+    async def reset(self) -> None:
+        """Reset the controller."""
+        gpib, lock = self.__get_gpib()
+        async with lock:
+            await self.__run(gpib.reset)
+
+    async def write(
+        self, pad: int, data: bytes, *, timeout: float | None = None, deadline: float | None = None
+    ) -> None:
+        """
+        Write data to the device at pad.
+        Parameters
+        ----------
+        pad: int
+            The primary address of the device
+        data: bytes
+            The data to send to the device.
+        timeout: float, optional
+            The time in seconds the call may take. See `UGPlusGpib.write()`.
+        deadline: float, optional
+            The time of `time.monotonic()`, when the call must be finished
+        """
+        gpib, lock = self.__get_gpib()
+        async with lock:
+            await self.__run_cancellable(gpib.write, pad, data, timeout=timeout, deadline=deadline)
+
+    async def write_stream(
+        self, pad: int, data: Iterable[bytes | bytearray | memoryview] | BinaryIO | bytes | bytearray | memoryview
+    ) -> int:
+        """
+        Write a message, that is produced piecewise, to the device at pad. See `UGPlusGpib.write_stream()`. The data
+        is consumed on the worker thread.
+        Parameters
+        ----------
+        pad: int
+            The primary address of the device
+        data: Iterable of bytes-like objects or binary file or bytes-like object
+            The parts of the message or a file opened in binary mode, that is read until the end
+        Returns
+        -------
+        int
+            The number of bytes sent to the device
+        """
+        gpib, lock = self.__get_gpib()
+        async with lock:
+            return await self.__run(gpib.write_stream, pad, data)
+
+    async def read(
+        self,
+        pad: int,
+        delay: float = 0,
+        adaptive: bool = False,
+        *,
+        timeout: float | None = None,
+        deadline: float | None = None,
+    ) -> bytes | None:
+        """
+        Read from the device at pad (primary gpib address). If the coroutine is cancelled, the read is aborted and the
+        reply is skipped by the driver, when it arrives.
+        Parameters
+        ----------
+        pad: int
+            The device pad
+        delay: float
+            The time in seconds to wait after issuing the read request for the device before attempting to read back
+            the answer.
+        adaptive: bool, default=False
+            Wait for the typical response time of the device instead of the delay, see `UGPlusGpib.read()`.
+        timeout: float, optional
+            The time in seconds the call may take. See `UGPlusGpib.read()`.
+        deadline: float, optional
+            The time of `time.monotonic()`, when the call must be finished
+        Returns
+        -------
+        bytes or None
+            The data read or None if there was an error.
+        """
+        gpib, lock = self.__get_gpib()
+        async with lock:
+            return await self.__run_cancellable(gpib.read, pad, delay, adaptive, timeout=timeout, deadline=deadline)
+
+    async def query(  # pylint: disable=too-many-arguments
+        self,
+        pad: int,
+        data: bytes,
+        delay: float = 0,
+        adaptive: bool = False,
+        *,
+        timeout: float | None = None,
+        deadline: float | None = None,
+    ) -> bytes | None:
+        """
+        Write data to the device at pad and read back the answer. No other command is sent to the adapter in between.
+        Queries registered with the query cache of the driver are answered from the cache, see `UGPlusGpib.query()`.
+        Parameters
+        ----------
+        pad: int
+            The primary address of the device
+        data: bytes
+            The data to send to the device.
+        delay: float
+            The time in seconds to wait after issuing the read request for the device before attempting to read back
+            the answer.
+        adaptive: bool, default=False
+            Wait for the typical response time of the device instead of the delay, see `UGPlusGpib.read()`.
+        timeout: float, optional
+            The time in seconds the call may take. See `UGPlusGpib.query()`.
+        deadline: float, optional
+            The time of `time.monotonic()`, when the call must be finished
+        Returns
+        -------
+        bytes or None
+            The data read or None if there was an error.
+        """
+        gpib, lock = self.__get_gpib()
+        async with lock:
+            return await self.__run_cancellable(
+                gpib.query, pad, data, delay, adaptive, timeout=timeout, deadline=deadline
+            )
+
+    async def query_many(self, pad: int, commands: Iterable[bytes]) -> list[bytes | None]:
+        """
+        Send several queries to the device at pad using as few USB transfers as possible. See
+        `UGPlusGpib.query_many()`.
+        Parameters
+        ----------
+        pad: int
+            The primary address of the device
+        commands: Iterable of bytes
+            The queries to send to the device.
+        Returns
+        -------
+        list of bytes or None
+            The answers in the same order as the commands. An answer is None, if there was an error.
+        """
+        gpib, lock = self.__get_gpib()
+        async with lock:
+            return await self.__run(gpib.query_many, pad, list(commands))
@@ -0,0 +1,62 @@
+"""
+Cancellation of driver calls from another thread.
+"""
+
+from __future__ import annotations
+
+import errno
+import threading
+
+
+class OperationCancelled(OSError):
+    """A call was aborted using a `CancellationToken`."""
+
+
+class CancellationToken:
+    """
+    Aborts calls of the driver from another thread. The token is passed to a call using the `cancel` parameter and
+    checked while waiting for the adapter. USB reads are split into short transfers, so a cancelled call returns
+    within a few milliseconds. Replies, that are still on their way, are skipped by the next call. Once cancelled, the
+    token stays cancelled.
+    """
+
+    def __init__(self) -> None:
+        self.__event = threading.Event()
+
+    def cancel(self) -> None:
+        """Cancel all calls using this token. This method is thread-safe."""
+        self.__event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """
+        Returns
+        -------
+        bool
+            True if the token was cancelled
+        """
+        return self.__event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        """
+        Raises
+        ------
+        OperationCancelled
+            If the token was cancelled
+        """
+        if self.__event.is_set():
+            raise OperationCancelled(errno.ECANCELED, "The operation was cancelled.")
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Wait until the token is cancelled or the timeout has passed.
+        Parameters
+        ----------
+        timeout: float
+            The maximum time to wait in seconds
+        Returns
+        -------
+        bool
+            True if the token was cancelled
+        """
+        return self.__event.wait(timeout)
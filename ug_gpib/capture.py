@@ -0,0 +1,296 @@
+"""
+Capture USB transfers between the driver and the adapter and replay them later. A recording can be fed back into the
+driver using `ReplayDevice`, for example to reproduce a problem seen in production without the instrument.
+
+File format
+-----------
+The file starts with the magic bytes b"UGCAP" and a format version byte. It is followed by the records. Every record
+is a header (timestamp: float64, direction: uint8, status: uint8, length: uint32, little-endian) followed by the data
+of the transfer. The timestamp is the monotonic time in seconds since the recording was started.
+"""
+
+from __future__ import annotations
+
+import errno
+import os
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from enum import IntEnum
+from types import TracebackType
+from typing import TYPE_CHECKING, BinaryIO, Iterator
+
+if sys.version_info < (3, 11):
+    from typing_extensions import Self
+else:
+    from typing import Self
+
+if TYPE_CHECKING:
+    from .emulator import EmulatedConfiguration
+
+MAGIC = b"UGCAP"
+FORMAT_VERSION = 1
+RECORD_HEADER = struct.Struct("<dBBI")
+
+
+class Direction(IntEnum):
+    """The direction of a transfer as seen from the host."""
+
+    OUT = 0
+    IN = 1
+
+
+class TransferStatus(IntEnum):
+    """The outcome of a transfer."""
+
+    OK = 0
+    TIMEOUT = 1
+    ERROR = 2
+
+
+@dataclass(frozen=True)
+class TransferRecord:
+    """A single recorded transfer."""
+
+    timestamp: float
+    direction: Direction
+    status: TransferStatus
+    data: bytes
+
+
+class TransferRecorder:
+    """
+    Records USB transfers into an append-only binary file. The file is buffered, so recording a transfer only costs a
+    struct.pack() and a buffered write.
+    """
+
+    def __init__(self, path: str | os.PathLike[str], buffer_size: int = 2**16) -> None:
+        """
+        Create a new recording. An existing file is overwritten.
+        Parameters
+        ----------
+        path: str or os.PathLike
+            The file to record to
+        buffer_size: int, default=65536
+            The size of the write buffer in bytes
+        """
+        self.__file: BinaryIO = open(path, "wb", buffering=buffer_size)  # pylint: disable=consider-using-with
+        self.__file.write(MAGIC + bytes((FORMAT_VERSION,)))
+        self.__start = time.monotonic()
+        self.records = 0
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.close()
+
+    def record(
+        self, direction: Direction, data: bytes | bytearray | memoryview, status: TransferStatus = TransferStatus.OK
+    ) -> None:
+        """
+        Append a transfer to the recording.
+        Parameters
+        ----------
+        direction: Direction
+            The direction of the transfer
+        data: bytes or bytearray or memoryview
+            The data transferred. Empty for failed transfers.
+        status: TransferStatus, default=TransferStatus.OK
+            The outcome of the transfer
+        """
+        self.__file.write(RECORD_HEADER.pack(time.monotonic() - self.__start, direction, status, len(data)))
+        self.__file.write(data)
+        self.records += 1
+
+    def flush(self) -> None:
+        """Write all buffered records to the file."""
+        self.__file.flush()
+
+    def close(self) -> None:
+        """Flush and close the file."""
+        self.__file.close()
+
+
+def read_recording(path: str | os.PathLike[str]) -> Iterator[TransferRecord]:
+    """
+    Read the transfers from a recording.
+    Parameters
+    ----------
+    path: str or os.PathLike
+        The recording
+    Yields
+    ------
+    TransferRecord
+        The transfers in the order they were recorded. An incomplete record at the end of the file is ignored.
+    Raises
+    ------
+    ValueError
+        If the file is not a recording or the format version is not supported
+    """
+    with open(path, "rb") as file:
+        header = file.read(len(MAGIC) + 1)
+        if header[: len(MAGIC)] != MAGIC or len(header) != len(MAGIC) + 1:
+            raise ValueError(f"'{path}' is not a USB transfer recording.")
+        if header[-1] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported recording format version {header[-1]}.")
+        while len(record_header := file.read(RECORD_HEADER.size)) == RECORD_HEADER.size:
+            timestamp, direction, status, length = RECORD_HEADER.unpack(record_header)
+            data = file.read(length)
+            if len(data) != length:
+                break
+            yield TransferRecord(timestamp, Direction(direction), TransferStatus(status), data)
+
+
+def _usb_error(message: str, error_number: int) -> OSError:
+    """Create a usb.core.USBError. pyUSB is only imported when needed, because the driver imports this module."""
+    from usb.core import USBError  # pylint: disable=import-outside-toplevel
+
+    return USBError(message, errno=error_number)
+
+
+class ReplayDevice:  # pylint: disable=too-many-instance-attributes
+    """
+    A USB device, that replays a recording. It can be passed to `UGPlusGpib(devices=...)` instead of a real adapter.
+    Reads return the recorded IN transfers in order and writes consume the recorded OUT transfers. A read, while the
+    next recorded transfer is an OUT transfer, times out, just like a real adapter without pending data.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        speed: float = 1.0,
+        strict: bool = False,
+        bus: int = 1,
+        port_numbers: tuple[int, ...] = (1,),
+    ) -> None:
+        """
+        Load a recording.
+        Parameters
+        ----------
+        path: str or os.PathLike
+            The recording
+        speed: float, default=1.0
+            The replay speed relative to the recording. IN transfers are not returned before their recorded time
+            divided by the speed. Use `float("inf")` to replay as fast as possible.
+        strict: bool, default=False
+            Raise a ValueError, if the data written by the driver differs from the recording
+        bus: int, default=1
+            The USB bus number reported by the device
+        port_numbers: tuple of int, default=(1,)
+            The USB port path reported by the device
+        """
+        # Imported here, because the emulator imports pyUSB, which the driver only imports when needed
+        from .emulator import (  # pylint: disable=import-outside-toplevel
+            EmulatedConfiguration,
+            EmulatedInEndpoint,
+            EmulatedInterface,
+            EmulatedOutEndpoint,
+        )
+
+        self.records = list(read_recording(path))
+        self.speed = speed
+        self.strict = strict
+        self.bus = bus
+        self.port_numbers = port_numbers
+        self.position = 0
+        self.__start: float | None = None
+        self.read_ep = EmulatedInEndpoint(self, 0x81, 64)
+        self.write_ep = EmulatedOutEndpoint(self, 0x02, 64)
+        self.__configuration = EmulatedConfiguration(EmulatedInterface((self.read_ep, self.write_ep)))
+
+    def __iter__(self) -> Iterator[EmulatedConfiguration]:
+        return iter((self.__configuration,))
+
+    def get_active_configuration(self) -> EmulatedConfiguration:
+        """
+        Returns
+        -------
+        EmulatedConfiguration
+            The configuration of the device
+        """
+        return self.__configuration
+
+    def set_configuration(self) -> None:
+        """Configure the device. This is a no-op."""
+
+    @property
+    def finished(self) -> bool:
+        """
+        Returns
+        -------
+        bool
+            True if all records have been replayed
+        """
+        return self.position >= len(self.records)
+
+    def __wait_for(self, record: TransferRecord) -> None:
+        """Wait until the replay time of a record, relative to the first record replayed."""
+        now = time.monotonic()
+        if self.__start is None:
+            self.__start = now - record.timestamp / self.speed
+        delay = self.__start + record.timestamp / self.speed - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def read_transfer(self, size: int, timeout: int) -> bytes:
+        """
+        Return the next recorded IN transfer.
+        Parameters
+        ----------
+        size: int
+            The maximum number of bytes to read
+        timeout: int
+            The timeout in ms. It is ignored, the recorded outcome is replayed.
+        Returns
+        -------
+        bytes
+            The data read
+        Raises
+        ------
+        usb.core.USBError
+            If the recorded transfer failed or the next record is not an IN transfer
+        """
+        del timeout
+        if self.finished or self.records[self.position].direction != Direction.IN:
+            raise _usb_error("Operation timed out", errno.ETIMEDOUT)
+        record = self.records[self.position]
+        self.position += 1
+        self.__wait_for(record)
+        if record.status == TransferStatus.TIMEOUT:
+            raise _usb_error("Operation timed out", errno.ETIMEDOUT)
+        if record.status == TransferStatus.ERROR:
+            raise _usb_error("Recorded transfer error", errno.EIO)
+        return record.data[:size]
+
+    def write_transfer(self, data: bytes) -> int:
+        """
+        Consume the next recorded OUT transfer. Unread IN transfers before it are skipped.
+        Parameters
+        ----------
+        data: bytes
+            The data written by the driver
+        Returns
+        -------
+        int
+            The number of bytes written
+        Raises
+        ------
+        ValueError
+            If `strict` is set and the data does not match the recording
+        """
+        while not self.finished and self.records[self.position].direction != Direction.OUT:
+            self.position += 1
+        if self.finished:
+            if self.strict:
+                raise ValueError("The recording has ended.")
+            return len(data)
+        record = self.records[self.position]
+        self.position += 1
+        if self.strict and record.data != data:
+            raise ValueError(f"Write {data!r} does not match recording {record.data!r} at record {self.position - 1}.")
+        self.__wait_for(record)
+        return len(data)
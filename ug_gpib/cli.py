@@ -0,0 +1,354 @@
+"""
+The ug-gpib command line tool. It sends commands to GPIB devices and prints the replies. All commands of a run share a
+single connection to the adapter and consecutive queries are pipelined using `UGPlusGpib.query_batch()`.
+
+Usage:
+    ug-gpib discover
+    ug-gpib write 9 "*RST"
+    ug-gpib query 9 "*IDN?"
+    ug-gpib stream 9 commands.txt > replies.txt
+    ug-gpib bench 9 --count 1000
+
+Commands are read from the command line or, if none are given, line by line from a file or stdin. In stream mode, lines
+containing a "?" are queries, all others are writes. Replies are written to stdout in the order of the commands, timing
+information and the summary are written to stderr.
+"""
+
+from __future__ import annotations
+
+import argparse
+import codecs
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterable, Iterator, Sequence, TextIO
+
+from .codec import MAX_WRITE_DATA
+from .location_cache import AdapterLocationCache
+from .ug_gpib import UGPlusGpib
+
+
+@dataclass
+class RunStatistics:
+    """Counters of a command line run. The byte counters only count the GPIB payload."""
+
+    writes: int = 0
+    queries: int = 0
+    errors: int = 0
+    bytes_out: int = 0
+    bytes_in: int = 0
+    start: float = field(default_factory=time.perf_counter)
+
+    def summary(self) -> str:
+        """
+        Returns
+        -------
+        str
+            A human-readable summary of the throughput since the start of the run
+        """
+        elapsed = time.perf_counter() - self.start
+        commands = self.writes + self.queries
+        return (
+            f"{commands} commands ({self.writes} writes, {self.queries} queries, {self.errors} errors) in "
+            f"{elapsed:.3f} s: "
+            f"{commands / elapsed:.1f} commands/s, {self.bytes_out / elapsed:.0f} bytes/s out, "
+            f"{self.bytes_in / elapsed:.0f} bytes/s in"
+        )
+
+
+class CommandRunner:  # pylint: disable=too-many-instance-attributes
+    """
+    Executes writes and queries in order. Consecutive queries are collected and sent as a single batch, when the batch
+    is full, when a write follows or when `flush()` is called.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        gpib: UGPlusGpib,
+        pad: int,
+        output: BinaryIO,
+        *,
+        binary: bool = False,
+        timing: TextIO | None = None,
+        batch_size: int = 16,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        gpib: UGPlusGpib
+            The connected driver
+        pad: int
+            The primary address of the device
+        output: BinaryIO
+            The stream the replies are written to
+        binary: bool, default=False
+            Write the replies unchanged. Otherwise, each reply is terminated by a line feed.
+        timing: TextIO, optional
+            If given, the time taken by each command is written to this stream. The time of a batched query is the
+            time of the batch divided by the number of queries in it.
+        batch_size: int, default=16
+            The maximum number of queries per batch
+        """
+        self.__gpib = gpib
+        self.__pad = pad
+        self.__output = output
+        self.__binary = binary
+        self.__timing = timing
+        self.__batch_size = batch_size
+        self.__pending: list[bytes] = []
+        self.statistics = RunStatistics()
+
+    def __report(self, command: bytes, elapsed: float) -> None:
+        if self.__timing is not None:
+            self.__timing.write(f"{elapsed * 1000:.3f} ms\t{command!r}\n")
+
+    def __error(self, command: bytes, message: str) -> None:
+        self.statistics.errors += 1
+        sys.stderr.write(f"{message} {command[:40]!r} (device at address {self.__pad}).\n")
+
+    def write(self, command: bytes) -> None:
+        """
+        Write a command to the device. Pending queries are executed first. A failed write is reported to stderr and
+        counted as an error.
+        Parameters
+        ----------
+        command: bytes
+            The command including its termination
+        """
+        self.flush()
+        start = time.perf_counter()
+        self.statistics.writes += 1
+        try:
+            self.__gpib.write(self.__pad, command)
+        except (OSError, ValueError) as exc:
+            self.__error(command, f"Cannot write ({exc}):")
+            return
+        self.__report(command, time.perf_counter() - start)
+        self.statistics.bytes_out += len(command)
+
+    def query(self, command: bytes) -> None:
+        """
+        Queue a query. The reply is written to the output, when the batch is executed. Queries longer than a single
+        frame cannot be batched, they are executed on their own after the pending queries.
+        Parameters
+        ----------
+        command: bytes
+            The query including its termination
+        """
+        if len(command) > MAX_WRITE_DATA:
+            self.flush()
+            start = time.perf_counter()
+            try:
+                reply = self.__gpib.query(self.__pad, command)
+            except (OSError, ValueError):
+                reply = None
+            self.__collect(command, reply, time.perf_counter() - start)
+            self.__output.flush()
+            return
+        self.__pending.append(command)
+        if len(self.__pending) >= self.__batch_size:
+            self.flush()
+
+    def __collect(self, command: bytes, reply: bytes | None, elapsed: float) -> None:
+        """Count a query and write its reply to the output."""
+        self.__report(command, elapsed)
+        self.statistics.queries += 1
+        self.statistics.bytes_out += len(command)
+        if reply is None:
+            self.__error(command, "No reply to")
+            return
+        self.statistics.bytes_in += len(reply)
+        self.__output.write(reply)
+        if not self.__binary and not reply.endswith(b"\n"):
+            self.__output.write(b"\n")
+
+    def flush(self) -> None:
+        """Execute all pending queries and write the replies to the output."""
+        if not self.__pending:
+            return
+        batch, self.__pending = self.__pending, []
+        start = time.perf_counter()
+        replies = self.__gpib.query_batch(
+            [(self.__pad, command) for command in batch], self.__batch_size, raise_errors=False
+        )
+        elapsed = (time.perf_counter() - start) / len(batch)
+        for command, reply in zip(batch, replies):
+            self.__collect(command, reply, elapsed)
+        self.__output.flush()
+
+
+def _read_commands(commands: Sequence[str], file: BinaryIO, terminator: bytes) -> Iterator[bytes]:
+    """Yield the commands given on the command line or, if there are none, the non-empty lines of the file."""
+    if commands:
+        yield from (command.encode() + terminator for command in commands)
+        return
+    for line in file:
+        line = line.rstrip(b"\r\n")
+        if line:
+            yield line + terminator
+
+
+def _run_commands(runner: CommandRunner, commands: Iterable[bytes], mode: str) -> None:
+    for command in commands:
+        if mode == "query" or (mode == "stream" and b"?" in command):
+            runner.query(command)
+        else:
+            runner.write(command)
+    runner.flush()
+
+
+def _discover(gpib: UGPlusGpib) -> int:
+    model, series = gpib.get_series_number()
+    print(f"Manufacturer: {gpib.get_manufacturer_id()}")
+    print(f"Model: {model}, series number: {series}")
+    print("Firmware version: {}.{}".format(*gpib.version()))  # pylint: disable=consider-using-f-string
+    devices = gpib.get_gpib_devices()
+    print(f"GPIB devices: {', '.join(str(pad) for pad in devices) if devices else 'none'}")
+    return 0
+
+
+def _bench(gpib: UGPlusGpib, arguments: argparse.Namespace) -> int:
+    command = arguments.command.encode() + arguments.terminator
+    if len(command) > MAX_WRITE_DATA:
+        sys.stderr.write(f"The query must not be longer than {MAX_WRITE_DATA} bytes to be batched.\n")
+        return 2
+    errors = 0
+    latencies = []
+    bytes_in = 0
+    start = time.perf_counter()
+    for _ in range(arguments.count):
+        query_start = time.perf_counter()
+        try:
+            reply = gpib.query(arguments.pad, command)
+        except OSError:
+            reply = None
+        latencies.append(time.perf_counter() - query_start)
+        if reply is None:
+            errors += 1
+        else:
+            bytes_in += len(reply)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(
+        f"sequential: {arguments.count} queries in {elapsed:.3f} s, {arguments.count / elapsed:.1f} queries/s, "
+        f"{bytes_in / elapsed:.0f} bytes/s in, median latency {statistics.median(latencies) * 1000:.3f} ms, "
+        f"p99 latency {latencies[int(len(latencies) * 0.99)] * 1000:.3f} ms, {errors} errors"
+    )
+
+    start = time.perf_counter()
+    replies = gpib.query_batch([(arguments.pad, command)] * arguments.count, arguments.batch_size, raise_errors=False)
+    elapsed = time.perf_counter() - start
+    batch_errors = replies.count(None)
+    bytes_in = sum(len(reply) for reply in replies if reply is not None)
+    print(
+        f"batched (batch size {arguments.batch_size}): {arguments.count} queries in {elapsed:.3f} s, "
+        f"{arguments.count / elapsed:.1f} queries/s, {bytes_in / elapsed:.0f} bytes/s in, {batch_errors} errors"
+    )
+    return 0 if errors == batch_errors == 0 else 1
+
+
+def _positive_int(value: str) -> int:
+    """Parse an integer, that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def _terminator(value: str) -> bytes:
+    """Parse a terminator given with backslash escapes like "\\r\\n"."""
+    return codecs.decode(value, "unicode_escape").encode("latin-1")
+
+
+def _parse_arguments(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="ug-gpib",
+        description=__doc__.split("\n\n", 1)[0].strip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--series", type=int, default=2654079, help="The series number of the adapter")
+    parser.add_argument("--timeout", type=float, default=1.0, help="The USB timeout in seconds")
+    parser.add_argument("--cache", action="store_true", help="Cache the location of the adapter to speed up startup")
+    subparsers = parser.add_subparsers(dest="mode", required=True)
+
+    subparsers.add_parser("discover", help="Show the adapter information and the devices on the bus")
+
+    for mode, help_text in (
+        ("write", "Write commands to a device"),
+        ("query", "Send queries to a device and print the replies"),
+        ("stream", "Execute a command file, lines containing a '?' are queries"),
+    ):
+        subparser = subparsers.add_parser(mode, help=help_text)
+        subparser.add_argument("pad", type=int, help="The primary address of the device")
+        if mode == "stream":
+            subparser.add_argument(
+                "file", nargs="?", type=argparse.FileType("rb"), default="-", help="The command file, defaults to stdin"
+            )
+        else:
+            subparser.add_argument("commands", nargs="*", help="The commands, read from stdin if not given")
+        subparser.add_argument("--binary", action="store_true", help="Write the replies without adding line feeds")
+        subparser.add_argument("--timing", action="store_true", help="Print the time taken by each command to stderr")
+        subparser.add_argument("--quiet", action="store_true", help="Do not print the summary to stderr")
+
+    bench = subparsers.add_parser("bench", help="Measure the query throughput of a device")
+    bench.add_argument("pad", type=int, help="The primary address of the device")
+    bench.add_argument("--command", default="*IDN?", help="The query to send")
+    bench.add_argument("--count", type=_positive_int, default=1000, help="The number of queries")
+
+    for subparser in (subparsers.choices[mode] for mode in ("write", "query", "stream", "bench")):
+        subparser.add_argument(
+            "--terminator", type=_terminator, default=b"\n", help="Appended to each command, defaults to '\\n'"
+        )
+        subparser.add_argument(
+            "--batch-size",
+            type=_positive_int,
+            default=16,
+            help="The maximum number of queries sent in a single USB transfer",
+        )
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None, *, devices: Iterable | None = None) -> int:
+    """
+    Run the command line tool.
+    Parameters
+    ----------
+    argv: Sequence of str, optional
+        The command line arguments. Defaults to `sys.argv`.
+    devices: Iterable of usb.core.Device, optional
+        The USB devices to search for the adapter, see `UGPlusGpib`. This can be used to run the tool against an
+        emulated adapter.
+    Returns
+    -------
+    int
+        The exit code. Non-zero if a device did not answer.
+    """
+    arguments = _parse_arguments(argv)
+    location_cache = AdapterLocationCache() if arguments.cache else None
+    with UGPlusGpib(arguments.series, arguments.timeout, location_cache=location_cache, devices=devices) as gpib:
+        if arguments.mode == "discover":
+            return _discover(gpib)
+        if arguments.mode == "bench":
+            return _bench(gpib, arguments)
+
+        runner = CommandRunner(
+            gpib,
+            arguments.pad,
+            sys.stdout.buffer,
+            binary=arguments.binary,
+            timing=sys.stderr if arguments.timing else None,
+            batch_size=arguments.batch_size,
+        )
+        if arguments.mode == "stream":
+            commands = _read_commands((), arguments.file, arguments.terminator)
+        else:
+            commands = _read_commands(arguments.commands, sys.stdin.buffer, arguments.terminator)
+        _run_commands(runner, commands, arguments.mode)
+        if not arguments.quiet:
+            sys.stderr.write(runner.statistics.summary() + "\n")
+        return 1 if runner.statistics.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
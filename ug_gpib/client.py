@@ -0,0 +1,376 @@
+"""
+A client for the UGPlus adapter server in `ug_gpib.server`. The client supports the command API of `UGPlusGpib`:
+reading, writing and querying devices, discovering devices and the adapter metadata. Reading binary blocks and ASCII
+values is not supported by the server protocol and raises a `NotImplementedError`.
+"""
+
+from __future__ import annotations
+
+import errno
+import itertools
+import math
+import os
+import socket
+import sys
+from pathlib import Path
+from types import TracebackType
+from typing import Any, BinaryIO, Iterable, NoReturn, Sequence, cast
+
+from .server import (
+    ERROR_NUMBER,
+    READ_ARGUMENTS,
+    REQUEST_HEADER,
+    RESPONSE_HEADER,
+    SERIES,
+    TIMEOUT,
+    Opcode,
+    Status,
+    default_socket_path,
+)
+
+if sys.version_info < (3, 11):
+    from typing_extensions import Self
+else:
+    from typing import Self
+
+
+class UGPlusGpibClient:
+    """
+    Connects to a UGPlus adapter shared by `python -m ug_gpib.server`. The methods block until the server has
+    answered. `query_many()` and `query_batch()` send all their requests before waiting for the first answer.
+    """
+
+    def __init__(self, path: str | os.PathLike[str] | None = None, device_series: int = 2654079) -> None:
+        """
+        Connect to the server.
+        Parameters
+        ----------
+        path: str or os.PathLike, optional
+            The location of the server socket. Defaults to the default socket of the given adapter.
+        device_series: int, optional
+            The series number of the adapter. Only used to determine the default socket path.
+        """
+        self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.__socket.connect(str(path if path is not None else default_socket_path(device_series)))
+        self.__buffer = bytearray()
+        self.__request_ids = itertools.count()
+        # Responses received while waiting for another request
+        self.__responses: dict[int, tuple[int, bytes]] = {}
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.close()
+
+    @property
+    def path(self) -> Path:
+        """
+        Returns
+        -------
+        Path
+            The location of the server socket
+        """
+        return Path(self.__socket.getpeername())
+
+    def close(self) -> None:
+        """Close the connection to the server."""
+        self.__socket.close()
+
+    def __send(self, opcode: Opcode, pad: int = 0, payload: bytes = b"") -> int:
+        request_id = next(self.__request_ids) & 0xFFFFFFFF
+        self.__socket.sendall(REQUEST_HEADER.pack(request_id, opcode, pad, len(payload)) + payload)
+        return request_id
+
+    def __receive_exactly(self, length: int) -> None:
+        while len(self.__buffer) < length:
+            data = self.__socket.recv(max(length - len(self.__buffer), 2**16))
+            if not data:
+                raise ConnectionError("Connection closed by the server.")
+            self.__buffer += data
+
+    def __receive(self, request_id: int) -> bytes | None:
+        """Wait for the response to a request and decode its status."""
+        while request_id not in self.__responses:
+            self.__receive_exactly(RESPONSE_HEADER.size)
+            response_id, status, length = RESPONSE_HEADER.unpack_from(self.__buffer)
+            self.__receive_exactly(RESPONSE_HEADER.size + length)
+            self.__responses[response_id] = status, bytes(
+                self.__buffer[RESPONSE_HEADER.size : RESPONSE_HEADER.size + length]
+            )
+            del self.__buffer[: RESPONSE_HEADER.size + length]
+        status, payload = self.__responses.pop(request_id)
+
+        if status == Status.OK:
+            return payload
+        if status == Status.NO_DATA:
+            return None
+        if status == Status.OS_ERROR:
+            (error_number,) = ERROR_NUMBER.unpack_from(payload)
+            raise OSError(error_number, payload[ERROR_NUMBER.size :].decode())
+        if status == Status.VALUE_ERROR:
+            raise ValueError(payload.decode())
+        raise RuntimeError(payload.decode())
+
+    def __request(self, opcode: Opcode, pad: int = 0, payload: bytes = b"") -> bytes:
+        result = self.__receive(self.__send(opcode, pad, payload))
+        assert result is not None
+        return result
+
+    def get_manufacturer_id(self) -> str:
+        """
+        Get the manufacturer id of the GPIB adapter.
+        Returns
+        -------
+        str
+            The manufacturer id
+        """
+        return self.__request(Opcode.MANUFACTURER_ID).decode("latin-1")
+
+    def get_series_number(self) -> tuple[int, int]:
+        """
+        Query the GPIB controller series number.
+        Returns
+        -------
+        tuple of int
+            An integer that is the model number and an integer for the series number
+        """
+        model, series = SERIES.unpack(self.__request(Opcode.SERIES))
+        return model, series
+
+    def version(self) -> tuple[int, int]:
+        """
+        Get the GPIB adapter firmware version
+        Returns
+        -------
+        tuple of int
+            The major and minor firmware revision
+        """
+        major, minor = self.__request(Opcode.VERSION)
+        return major, minor
+
+    def get_gpib_devices(self) -> tuple[int, ...]:
+        """
+        Try to identify all addresses, that have a GPIB device connected to it
+        Returns
+        -------
+        tuple of int
+            The primary addresses of the GPIB devices discovered
+        """
+        return tuple(self.__request(Opcode.DISCOVER))
+
+    def reset(self) -> None:
+        """Reset the controller."""
+        self.__request(Opcode.RESET)
+
+    def write(self, pad: int, data: bytes, *, timeout: float | None = None) -> None:
+        """
+        Write data to the device at pad.
+        Parameters
+        ----------
+        pad: int
+            The primary address of the device
+        data: bytes
+            The data to send to the device.
+        timeout: float, optional
+            The time in seconds the call may take on the server. See `UGPlusGpib.write()`.
+        """
+        self.__request(Opcode.WRITE, pad, TIMEOUT.pack(_encode_timeout(timeout)) + data)
+
+    def write_stream(
+        self,
+        pad: int,
+        data: Iterable[bytes | bytearray | memoryview] | BinaryIO | bytes | bytearray | memoryview,
+        *,
+        timeout: float | None = None,
+    ) -> int:
+        """
+        Write a message, that is produced piecewise, to the device at pad. See `UGPlusGpib.write_stream()`. The server
+        receives a message in a single request, so the message is collected in memory before it is sent.
+        Parameters
+        ----------
+        pad: int
+            The primary address of the device
+        data: Iterable of bytes-like objects or binary file or bytes-like object
+            The parts of the message or a file opened in binary mode, that is read until the end
+        timeout: float, optional
+            The time in seconds the call may take on the server
+        Returns
+        -------
+        int
+            The number of bytes sent to the device
+        """
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            message = bytes(data)
+        elif hasattr(data, "read"):
+            message = cast(BinaryIO, data).read()
+        else:
+            message = b"".join(cast("Iterable[bytes | bytearray | memoryview]", data))
+        self.write(pad, message, timeout=timeout)
+        return len(message)
+
+    def read(self, pad: int, delay: float = 0, adaptive: bool = False, *, timeout: float | None = None) -> bytes | None:
+        """
+        Read from the device at pad (primary gpib address)
+        Parameters
+        ----------
+        pad: int
+            The device pad
+        delay: float
+            The time in seconds to wait after issuing the read request for the device before attempting to read back
+            the answer.
+        adaptive: bool, default=False
+            Wait for the typical response time of the device instead of the delay, see `UGPlusGpib.read()`.
+        timeout: float, optional
+            The time in seconds the call may take on the server
+        Returns
+        -------
+        bytes or None
+            The data read or None if there was an error.
+        """
+        return self.__receive(self.__send(Opcode.READ, pad, _read_arguments(delay, adaptive, timeout)))
+
+    def query(  # pylint: disable=too-many-arguments
+        self, pad: int, data: bytes, delay: float = 0, adaptive: bool = False, *, timeout: float | None = None
+    ) -> bytes | None:
+        """
+        Write data to the device at pad and read back the answer. No other command is sent to the adapter in between.
+        Parameters
+        ----------
+        pad: int
+            The primary address of the device
+        data: bytes
+            The data to send to the device.
+        delay: float
+            The time in seconds to wait after issuing the read request for the device before attempting to read back
+            the answer.
+        adaptive: bool, default=False
+            Wait for the typical response time of the device instead of the delay, see `UGPlusGpib.read()`.
+        timeout: float, optional
+            The time in seconds the call may take on the server
+        Returns
+        -------
+        bytes or None
+            The data read or None if there was an error.
+        """
+        return self.__receive(self.__send(Opcode.QUERY, pad, _read_arguments(delay, adaptive, timeout) + data))
+
+    def query_many(self, pad: int, commands: Iterable[bytes], delay: float = 0) -> list[bytes | None]:
+        """
+        Send several queries to the device at pad. All requests are sent before waiting for the first answer.
+        Parameters
+        ----------
+        pad: int
+            The primary address of the device
+        commands: Iterable of bytes
+            The queries to send to the device.
+        delay: float
+            The time in seconds to wait after issuing each read request for the device before attempting to read back
+            the answer.
+        Returns
+        -------
+        list of bytes or None
+            The answers in the same order as the commands. An answer is None, if there was an error.
+        Raises
+        ------
+        OSError
+            If one of the queries failed. The error is raised after all responses have been received.
+        """
+        results, error = self.__pipeline([(pad, command) for command in commands], delay)
+        if error is not None:
+            raise error
+        return results
+
+    def query_batch(
+        self, queries: Sequence[tuple[int, bytes]], batch_size: int = 16, *, raise_errors: bool = True
+    ) -> list[bytes | None]:
+        """
+        Send several queries to one or more devices and read back the answers. All requests are sent before waiting
+        for the first answer, the server batches them by itself. See `UGPlusGpib.query_batch()`.
+        Parameters
+        ----------
+        queries: Sequence of tuple of int and bytes
+            The primary address and the query for each device
+        batch_size: int, default=16
+            Ignored, the requests are pipelined instead
+        raise_errors: bool, default=True
+            Raise an error, if a device did not answer. Otherwise, the answer of that device is None.
+        Returns
+        -------
+        list of bytes or None
+            The answers in the same order as the queries. An answer is None, if there was an error.
+        Raises
+        ------
+        OSError
+            If one of the devices did not answer and `raise_errors` is set. The error is raised after all responses
+            have been received.
+        """
+        del batch_size
+        results, error = self.__pipeline(queries, 0)
+        if error is None:
+            for (pad, _), result in zip(queries, results):
+                if result is None:
+                    error = OSError(
+                        errno.EIO, f"I/O error: Cannot read from GPIB device at address {pad}. Is the device attached?"
+                    )
+                    break
+        if error is not None and raise_errors:
+            raise error
+        return results
+
+    def __pipeline(
+        self, queries: Iterable[tuple[int, bytes]], delay: float
+    ) -> tuple[list[bytes | None], Exception | None]:
+        """Send all queries, then collect the answers and the first error."""
+        request_ids = [
+            self.__send(Opcode.QUERY, pad, _read_arguments(delay, False, None) + command) for pad, command in queries
+        ]
+        results: list[bytes | None] = []
+        error: Exception | None = None
+        # Collect all responses, even if there is an error, so that none are left behind
+        for request_id in request_ids:
+            try:
+                results.append(self.__receive(request_id))
+            except (OSError, ValueError, RuntimeError) as exc:
+                results.append(None)
+                error = error or exc
+        return results, error
+
+    def read_binary_block(self, *args: Any, **kwargs: Any) -> NoReturn:
+        """Not supported by the server, see `UGPlusGpib.read_binary_block()`."""
+        del args, kwargs
+        _unsupported("read_binary_block")
+
+    def iter_binary_block(self, *args: Any, **kwargs: Any) -> NoReturn:
+        """Not supported by the server, see `UGPlusGpib.iter_binary_block()`."""
+        del args, kwargs
+        _unsupported("iter_binary_block")
+
+    def read_values(self, *args: Any, **kwargs: Any) -> NoReturn:
+        """Not supported by the server, see `UGPlusGpib.read_values()`."""
+        del args, kwargs
+        _unsupported("read_values")
+
+    def query_values(self, *args: Any, **kwargs: Any) -> NoReturn:
+        """Not supported by the server, see `UGPlusGpib.query_values()`."""
+        del args, kwargs
+        _unsupported("query_values")
+
+
+def _encode_timeout(timeout: float | None) -> float:
+    """Encode a timeout argument, NaN selects the timeout of the driver on the server."""
+    return math.nan if timeout is None else timeout
+
+
+def _read_arguments(delay: float, adaptive: bool, timeout: float | None) -> bytes:
+    """Encode the arguments of a READ or QUERY request."""
+    return READ_ARGUMENTS.pack(delay, _encode_timeout(timeout), adaptive)
+
+
+def _unsupported(method: str) -> NoReturn:
+    """Raise the error for a method, that the server protocol does not support."""
+    raise NotImplementedError(
+        f"{method}() is not supported by the GPIB server. Use read() and parse the replies in the client instead."
+    )
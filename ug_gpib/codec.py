@@ -0,0 +1,401 @@
+"""
+A pure encoder and decoder for the packets exchanged with the UGPlus adapter. It works on buffers only and does not
+depend on pyUSB, so it can be used and tested without an adapter.
+
+Every packet is a frame consisting of the command byte, the length of the frame including the two header bytes and
+the payload. Some firmware versions deviate from this, for example by sending bytes not included in the length field.
+These deviations are described by a `QuirkProfile`, which is selected once, when the firmware version is known. The
+codec turns the profile into lookup tables indexed by the command byte and the length field, so decoding a frame does
+not branch on the firmware version.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Iterator, Mapping, NamedTuple
+
+
+class UgPlusCommands(IntEnum):
+    """Internal commands used by the UGPlus"""
+
+    GET_FIRMWARE_VERSION = 0x00
+    GET_SERIES = 0x0E
+    RESET = 0x0F
+    WRITE = 0x32
+    READ = 0x33
+    DISCOVER_GPIB_DEVICES = 0x34
+    GET_MANUFACTURER_ID = 0xFE
+
+
+HEADER_SIZE = 2
+# The largest frame, that can be described by the length field
+MAX_FRAME_SIZE = 255
+# The flags following the primary address in WRITE and READ frames. 0x0F asserts EOI with the last byte and is the
+# value sent by the manufacturer software. The flags are not documented. 0x0E is experimental: it is only assumed to
+# differ in the EOI bit and is used by `write_stream()` for all but the last frame of a message, that does not fit into
+# a single frame.
+FLAGS_EOI = 0x0F
+FLAGS_NO_EOI = 0x0E
+# The largest number of data bytes in a WRITE frame. The frame also contains the header, the address and the flags.
+MAX_WRITE_DATA = MAX_FRAME_SIZE - HEADER_SIZE - 2
+# The shortest plausible reply frame to each command, as sent by the adapter, but without the extra bytes. Used to
+# reject false frame headers while searching for the next frame. The default is 3.
+MIN_REPLY_LENGTH = {
+    UgPlusCommands.GET_FIRMWARE_VERSION: 4,
+    UgPlusCommands.READ: 4,
+}
+
+
+class FramingError(ValueError):
+    """The data does not start with a valid frame header."""
+
+
+class Frame(NamedTuple):
+    """A decoded frame."""
+
+    command: int
+    payload: bytes
+    end: int  # The position in the buffer after the frame including all extra bytes
+
+
+@dataclass(frozen=True)
+class QuirkProfile:
+    """
+    The framing of the replies sent by a firmware version. All tables are keyed by the command.
+    """
+
+    name: str
+    # The number of bytes sent after the frame, that are not included in the length field. They are skipped.
+    extra_bytes: Mapping[int, int] = field(default_factory=dict)
+    # Shorter frames are actually sent with this length. The additional bytes are part of the payload.
+    padded_length: Mapping[int, int] = field(default_factory=dict)
+    # The number of bytes at the end of the payload, that do not contain data
+    trailer: Mapping[int, int] = field(default_factory=dict)
+
+
+# The last byte of the reply to DISCOVER_GPIB_DEVICES is unknown. It depends on the number of devices found.
+DEFAULT_PROFILE = QuirkProfile("default", trailer={UgPlusCommands.DISCOVER_GPIB_DEVICES: 1})
+FIRMWARE_1_0 = QuirkProfile(
+    "firmware 1.0",
+    # BUG: The GET_MANUFACTURER_ID and DISCOVER_GPIB_DEVICES commands return an extra byte, possibly an out-of-bounds
+    # read.
+    extra_bytes={UgPlusCommands.GET_MANUFACTURER_ID: 1, UgPlusCommands.DISCOVER_GPIB_DEVICES: 1},
+    # BUG: The READ command returns 2 more bytes if the read returns an empty string. This is an error code (1st byte
+    # is either 0x01 or 0x0A) and likely an out-of-bounds read. The last byte is the third byte of the previous
+    # payload. The length is 3, if there is no device connected and 4, if there is nothing to read.
+    padded_length={UgPlusCommands.READ: 5},
+    trailer={UgPlusCommands.DISCOVER_GPIB_DEVICES: 1},
+)
+# The profiles of firmware versions with known bugs
+PROFILES = {(1, 0): FIRMWARE_1_0}
+
+
+def select_profile(firmware_version: tuple[int, int] | None) -> QuirkProfile:
+    """
+    Parameters
+    ----------
+    firmware_version: tuple of int or None
+        The major and minor firmware version or None if it is not known yet
+    Returns
+    -------
+    QuirkProfile
+        The profile of the firmware version
+    """
+    return PROFILES.get(firmware_version, DEFAULT_PROFILE) if firmware_version is not None else DEFAULT_PROFILE
+
+
+class FrameCodec:
+    """
+    Encodes command frames and decodes reply frames according to a quirk profile.
+    """
+
+    def __init__(self, profile: QuirkProfile = DEFAULT_PROFILE, packet_size: int = 64) -> None:
+        """
+        Create a codec.
+        Parameters
+        ----------
+        profile: QuirkProfile, default=DEFAULT_PROFILE
+            The framing of the replies
+        packet_size: int, default=64
+            The USB packet size of the adapter. Aligned frames are padded to a multiple of it.
+        """
+        self.profile = profile
+        self.packet_size = packet_size
+        self.__padding = bytes(packet_size)
+        # The actual length of a frame indexed by the command and the length field. 0 marks invalid frames.
+        self.__lengths: list[tuple[int, ...] | None] = [None] * 256
+        # The number of bytes at the end of a frame, that are not part of the data, indexed by the command
+        self.__skip = [0] * 256
+        # The shortest plausible value of the length field indexed by the command
+        self.__min_length = [256] * 256
+        for command in UgPlusCommands:
+            padded = profile.padded_length.get(command, 0)
+            extra = profile.extra_bytes.get(command, 0)
+            self.__lengths[command] = tuple(
+                max(length, padded) + extra if max(length, padded) >= HEADER_SIZE else 0 for length in range(256)
+            )
+            self.__skip[command] = extra + profile.trailer.get(command, 0)
+            self.__min_length[command] = min(
+                (length for length in range(256) if max(length, padded) >= MIN_REPLY_LENGTH.get(command, 3)),
+                default=256,
+            )
+
+    def encode(self, command: int, data: bytes = b"") -> bytes:
+        """
+        Encode a frame.
+        Parameters
+        ----------
+        command: int
+            The command
+        data: bytes, default=b""
+            The payload
+        Returns
+        -------
+        bytes
+            The frame
+        Raises
+        ------
+        ValueError
+            If the payload does not fit into a single frame
+        """
+        if len(data) > MAX_FRAME_SIZE - HEADER_SIZE:
+            raise ValueError(f"The payload of {len(data)} bytes does not fit into a frame.")
+        return bytes((command, len(data) + HEADER_SIZE)) + data
+
+    def encode_into(self, buffer: bytearray, command: int, data: bytes = b"", aligned: bool = False) -> None:
+        """
+        Append a frame to a buffer.
+        Parameters
+        ----------
+        buffer: bytearray
+            The buffer to append to
+        command: int
+            The command
+        data: bytes, default=b""
+            The payload
+        aligned: bool, default=False
+            Pad the frame to a multiple of the USB packet size, so that the next frame starts a new USB packet. The
+            adapter only expects a command header at the start of a USB packet.
+        Raises
+        ------
+        ValueError
+            If the payload does not fit into a single frame
+        """
+        if len(data) > MAX_FRAME_SIZE - HEADER_SIZE:
+            raise ValueError(f"The payload of {len(data)} bytes does not fit into a frame.")
+        buffer.append(command)
+        buffer.append(len(data) + HEADER_SIZE)
+        buffer += data
+        if aligned:
+            buffer += bytes(-len(buffer) % self.packet_size)
+
+    def aligned_size(self, length: int) -> int:
+        """
+        Parameters
+        ----------
+        length: int
+            The length of a frame
+        Returns
+        -------
+        int
+            The length of the frame padded to a multiple of the USB packet size
+        """
+        return length + -length % self.packet_size
+
+    def pack_write(  # pylint: disable=too-many-arguments
+        self,
+        buffer: bytearray,
+        offset: int,
+        pad: int,
+        data: bytes | bytearray | memoryview,
+        *,
+        eoi: bool = True,
+        aligned: bool = True,
+    ) -> int:
+        """
+        Write a WRITE frame into a preallocated buffer. The frame is padded to a multiple of the USB packet size, so
+        that the next frame starts a new USB packet. The last frame of a transfer does not need to be padded.
+        Parameters
+        ----------
+        buffer: bytearray
+            The buffer. It must be large enough to hold the padded frame.
+        offset: int
+            The position of the frame in the buffer. It must be a multiple of the USB packet size.
+        pad: int
+            The primary address of the device
+        data: bytes or bytearray or memoryview
+            The data to send to the device
+        eoi: bool, default=True
+            Assert EOI with the last byte of the data. Frames without EOI use the experimental `FLAGS_NO_EOI`.
+        aligned: bool, default=True
+            Pad the frame to a multiple of the USB packet size
+        Returns
+        -------
+        int
+            The position after the frame
+        Raises
+        ------
+        ValueError
+            If the data does not fit into a single frame
+        """
+        length = len(data)
+        if length > MAX_WRITE_DATA:
+            raise ValueError(f"The data of {length} bytes does not fit into a frame.")
+        start = offset + HEADER_SIZE + 2
+        end = start + length
+        aligned_end = offset + self.aligned_size(end - offset) if aligned else end
+        if aligned_end > len(buffer):
+            raise ValueError("The frame does not fit into the buffer.")
+        buffer[offset] = UgPlusCommands.WRITE
+        buffer[offset + 1] = end - offset
+        buffer[offset + 2] = pad
+        buffer[offset + 3] = FLAGS_EOI if eoi else FLAGS_NO_EOI
+        buffer[start:end] = data
+        # The padding must not be mistaken for a frame header
+        buffer[end:aligned_end] = self.__padding[: aligned_end - end]
+        return aligned_end
+
+    def frame_length(self, command: int, length: int) -> int:
+        """
+        Parameters
+        ----------
+        command: int
+            The command byte of a reply
+        length: int
+            The length field of the reply
+        Returns
+        -------
+        int
+            The number of bytes sent by the adapter including the header and all extra bytes or 0 if the header is
+            invalid
+        """
+        lengths = self.__lengths[command]
+        return lengths[length] if lengths is not None else 0
+
+    def decode(self, buffer: bytes | bytearray | memoryview, position: int = 0, end: int | None = None) -> Frame | None:
+        """
+        Decode the frame at a position of a buffer.
+        Parameters
+        ----------
+        buffer: bytes or bytearray or memoryview
+            The data received
+        position: int, default=0
+            The position of the frame header
+        end: int, optional
+            The end of the valid data in the buffer. Defaults to the length of the buffer.
+        Returns
+        -------
+        Frame or None
+            The frame or None if the frame is incomplete
+        Raises
+        ------
+        FramingError
+            If the data does not start with a valid frame header
+        """
+        if end is None:
+            end = len(buffer)
+        if end - position < HEADER_SIZE:
+            return None
+        command = buffer[position]
+        lengths = self.__lengths[command]
+        length = lengths[buffer[position + 1]] if lengths is not None else 0
+        if not length:
+            raise FramingError(f"Invalid frame header {bytes(buffer[position : position + HEADER_SIZE])!r}.")
+        frame_end = position + length
+        if frame_end > end:
+            return None
+        return Frame(command, bytes(buffer[position + HEADER_SIZE : frame_end - self.__skip[command]]), frame_end)
+
+    def iter_frames(
+        self, buffer: bytes | bytearray | memoryview, position: int = 0, end: int | None = None
+    ) -> Iterator[Frame]:
+        """
+        Decode back-to-back frames. Stops at the first incomplete frame.
+        Parameters
+        ----------
+        buffer: bytes or bytearray or memoryview
+            The data received
+        position: int, default=0
+            The position of the first frame header
+        end: int, optional
+            The end of the valid data in the buffer. Defaults to the length of the buffer.
+        Yields
+        ------
+        Frame
+            The frames. The end of the last frame is the position of the remaining data.
+        Raises
+        ------
+        FramingError
+            If one of the frames does not start with a valid frame header
+        """
+        if end is None:
+            end = len(buffer)
+        while (frame := self.decode(buffer, position, end)) is not None:
+            yield frame
+            position = frame.end
+
+    def check_frames(self, buffer: bytes | bytearray | memoryview, position: int, end: int) -> bool | None:
+        """
+        Check, that a buffer contains a sequence of plausible reply frames from a position to the end of the data.
+        Parameters
+        ----------
+        buffer: bytes or bytearray or memoryview
+            The data received
+        position: int
+            The position of the first frame header
+        end: int
+            The end of the valid data in the buffer
+        Returns
+        -------
+        bool or None
+            True if the frames end exactly at the end of the data, None if the last frame is incomplete and False if
+            one of the frames is invalid
+        """
+        lengths = self.__lengths
+        min_length = self.__min_length
+        while position < end:
+            command = buffer[position]
+            command_lengths = lengths[command]
+            if command_lengths is None:
+                return False
+            if position + 1 == end:
+                return None
+            length = buffer[position + 1]
+            if length < min_length[command]:
+                return False
+            position += command_lengths[length]
+        return position == end or None
+
+    def find_frame(
+        self, buffer: bytes | bytearray | memoryview, command: int, start: int, end: int
+    ) -> tuple[int, bool] | None:
+        """
+        Search a buffer for the start of a plausible reply frame. A candidate must start with the command and be
+        followed by plausible frames up to the end of the data.
+        Parameters
+        ----------
+        buffer: bytes or bytearray
+            The data received
+        command: int
+            The command of the reply
+        start: int
+            The position to start searching at
+        end: int
+            The end of the valid data in the buffer
+        Returns
+        -------
+        tuple of int and bool or None
+            The position of the candidate and whether the candidate is complete, or None if there is no candidate.
+            Incomplete candidates need more data to be validated.
+        """
+        data = buffer if isinstance(buffer, (bytes, bytearray)) else bytes(buffer)
+        position = data.find(command, start, end)
+        while position != -1:
+            valid = self.check_frames(data, position, end)
+            if valid is None:
+                return position, False
+            if valid:
+                return position, True
+            position = data.find(command, position + 1, end)
+        return None
@@ -0,0 +1,489 @@
+"""
+A pure Python emulation of the LQ Electronics Corp UGPlus USB to GPIB Controller and the GPIB devices attached to it.
+The emulated adapter mimics the pyUSB device and endpoint objects used by the driver, so it can be passed to
+`UGPlusGpib(devices=...)` to test or benchmark the driver without hardware.
+
+The emulation speaks the UgPlusCommands framing and reproduces the known bugs of firmware version 1.0.
+"""
+
+from __future__ import annotations
+
+import errno
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Protocol, Union
+
+from usb.core import USBError
+
+from .codec import FLAGS_EOI, UgPlusCommands
+
+# The reply of an instrument. Either a fixed byte string, a function called with the data written to the instrument or
+# None if the instrument does not answer.
+Reply = Union[bytes, Callable[[bytes], Union[bytes, None]], None]
+
+# pyUSB uses a timeout of 1000 ms if None is given
+_DEFAULT_TIMEOUT = 1000
+
+# The status byte following the address in a READ reply
+_READ_SUCCESS = 0x00
+_READ_FAILED = 0x0A
+
+
+@dataclass
+class EmulatedInstrument:
+    """
+    A GPIB device attached to the emulated adapter. Every write to the device replaces its output buffer with the
+    reply to that write.
+    """
+
+    reply: Reply = None
+    delay: float = 0.0  # The time in seconds after a write, before the reply is available
+    received: list[bytes] = field(default_factory=list)  # All data written to the device
+    _output: bytes = field(default=b"", repr=False)
+    _output_position: int = field(default=0, repr=False)  # The number of output bytes already taken
+    _partial: bytearray = field(default_factory=bytearray, repr=False)
+    _ready_time: float = field(default=0.0, repr=False)
+
+    def handle_write(self, data: bytes, eoi: bool = True) -> None:
+        """
+        Process data written to the instrument. The data is collected until EOI is asserted.
+        Parameters
+        ----------
+        data: bytes
+            The data written
+        eoi: bool, default=True
+            True, if EOI was asserted with the last byte, which ends the message
+        """
+        if not eoi:
+            self._partial += data
+            return
+        if self._partial:
+            self._partial += data
+            data = bytes(self._partial)
+            self._partial.clear()
+        self.received.append(data)
+        reply = self.reply(data) if callable(self.reply) else self.reply
+        self._output = reply or b""
+        self._output_position = 0
+        self._ready_time = time.monotonic() + self.delay
+
+    def clear(self) -> None:
+        """Discard the output buffer and an incomplete message."""
+        self._output = b""
+        self._output_position = 0
+        self._partial.clear()
+
+    @property
+    def output_ready_time(self) -> float | None:
+        """
+        Returns
+        -------
+        float or None
+            The monotonic time when the output becomes available or None if there is no output pending
+        """
+        return self._ready_time if self._output_position < len(self._output) else None
+
+    def take_output(self, size: int) -> bytes:
+        """
+        Remove data from the output buffer.
+        Parameters
+        ----------
+        size: int
+            The maximum number of bytes to take
+        Returns
+        -------
+        bytes
+            The data taken
+        """
+        # Long outputs are not copied on every call
+        data = self._output[self._output_position : self._output_position + size]
+        self._output_position += len(data)
+        return data
+
+
+class TransferHandler(Protocol):
+    """Processes the transfers of emulated endpoints."""
+
+    def read_transfer(self, size: int, timeout: int) -> bytes:
+        """Return the data of an IN transfer of at most `size` bytes. Raise a USBError on timeout."""
+
+    def write_transfer(self, data: bytes) -> int:
+        """Process an OUT transfer and return the number of bytes written."""
+
+
+class EmulatedEndpoint:  # pylint: disable=too-few-public-methods
+    """The attributes of a pyUSB endpoint, that are used by the driver."""
+
+    bmAttributes = 0x02  # Bulk endpoint
+
+    def __init__(self, adapter: TransferHandler, address: int, max_packet_size: int) -> None:
+        self.adapter = adapter
+        self.bEndpointAddress = address  # pylint: disable=invalid-name
+        self.wMaxPacketSize = max_packet_size  # pylint: disable=invalid-name
+
+
+class EmulatedInEndpoint(EmulatedEndpoint):  # pylint: disable=too-few-public-methods
+    """The IN endpoint of the emulated adapter."""
+
+    def read(self, size_or_buffer: int | bytearray | memoryview, timeout: int | None = None) -> bytes | int:
+        """
+        Read a single transfer from the adapter, like `usb.core.Endpoint.read()`.
+        Parameters
+        ----------
+        size_or_buffer: int or buffer
+            The number of bytes to read or a buffer to read into
+        timeout: int, optional
+            The timeout in ms
+        Returns
+        -------
+        bytes or int
+            The data read or the number of bytes written to the buffer
+        """
+        size = size_or_buffer if isinstance(size_or_buffer, int) else len(size_or_buffer)
+        data = self.adapter.read_transfer(size, _DEFAULT_TIMEOUT if timeout is None else timeout)
+        if isinstance(size_or_buffer, int):
+            return data
+        memoryview(size_or_buffer).cast("B")[: len(data)] = data
+        return len(data)
+
+
+class EmulatedOutEndpoint(EmulatedEndpoint):  # pylint: disable=too-few-public-methods
+    """The OUT endpoint of the emulated adapter."""
+
+    def write(self, data: bytes | bytearray | list[int], timeout: int | None = None) -> int:
+        """
+        Send a single transfer to the adapter, like `usb.core.Endpoint.write()`.
+        Parameters
+        ----------
+        data: bytes or bytearray or list of int
+            The data to send
+        timeout: int, optional
+            The timeout in ms. Writes never time out.
+        Returns
+        -------
+        int
+            The number of bytes written
+        """
+        del timeout
+        return self.adapter.write_transfer(bytes(data))
+
+
+class EmulatedInterface:  # pylint: disable=too-few-public-methods
+    """A USB interface, that contains the endpoints of the emulated adapter."""
+
+    bInterfaceClass = 0xFF  # pylint: disable=invalid-name
+    bInterfaceSubClass = 0xFF  # pylint: disable=invalid-name
+    bInterfaceProtocol = 0xFF  # pylint: disable=invalid-name
+    bInterfaceNumber = 0  # pylint: disable=invalid-name
+    bAlternateSetting = 0  # pylint: disable=invalid-name
+
+    def __init__(self, endpoints: tuple[EmulatedEndpoint, ...]) -> None:
+        self.__endpoints = endpoints
+
+    def __iter__(self) -> Iterator[EmulatedEndpoint]:
+        return iter(self.__endpoints)
+
+
+class EmulatedConfiguration:
+    """A USB configuration with a single interface."""
+
+    bConfigurationValue = 1  # pylint: disable=invalid-name
+
+    def __init__(self, interface: EmulatedInterface) -> None:
+        self.__interface = interface
+
+    def __getitem__(self, index: tuple[int, int]) -> EmulatedInterface:
+        if index != (0, 0):
+            raise KeyError(index)
+        return self.__interface
+
+    def __iter__(self) -> Iterator[EmulatedInterface]:
+        return iter((self.__interface,))
+
+
+class EmulatedUGPlus:  # pylint: disable=too-many-instance-attributes
+    """
+    An emulated UGPlus adapter. It can be used in place of the `usb.core.Device` of a real adapter.
+
+    The adapter answers a READ request as soon as the instrument has data available. If the instrument has no data
+    pending or the data is not available within `gpib_timeout` seconds, an empty reply is sent immediately. Long
+    instrument replies are split into chunks of `max_read_payload` bytes, one per READ request. Replies are queued as
+    individual USB transfers and are available `usb_latency` seconds after the request.
+    """
+
+    idVendor = 0x04D8  # pylint: disable=invalid-name
+    idProduct = 0x000C  # pylint: disable=invalid-name
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        series: int = 2654079,
+        firmware_version: tuple[int, int] = (1, 0),
+        instruments: dict[int, EmulatedInstrument] | None = None,
+        *,
+        model: int = 1,
+        manufacturer_id: str = "LQElectronics",
+        bus: int = 1,
+        port_numbers: tuple[int, ...] = (1,),
+        max_read_payload: int = 251,
+        gpib_timeout: float = 1.0,
+        usb_latency: float = 0.0,
+        max_packet_size: int = 64,
+    ) -> None:
+        """
+        Create an emulated adapter.
+        Parameters
+        ----------
+        series: int, default=2654079
+            The series number of the adapter
+        firmware_version: tuple of int, default=(1, 0)
+            The firmware version. Version 1.0 reproduces the known firmware bugs.
+        instruments: dict of int and EmulatedInstrument, optional
+            The instruments attached to the bus, keyed by their primary address
+        model: int, default=1
+            The model number reported with the series number
+        manufacturer_id: str, default="LQElectronics"
+            The manufacturer id of the adapter
+        bus: int, default=1
+            The emulated USB bus number
+        port_numbers: tuple of int, default=(1,)
+            The emulated USB port path
+        max_read_payload: int, default=251
+            The maximum number of bytes returned by a single READ request
+        gpib_timeout: float, default=1.0
+            The time in seconds the adapter waits for an instrument to answer a READ request
+        usb_latency: float, default=0.0
+            The time in seconds between a request and the reply becoming available
+        max_packet_size: int, default=64
+            The USB packet size of the endpoints
+        """
+        self.series = series
+        self.firmware_version = firmware_version
+        self.instruments = instruments if instruments is not None else {}
+        self.model = model
+        self.manufacturer_id = manufacturer_id
+        self.bus = bus
+        self.port_numbers = port_numbers
+        self.max_read_payload = max_read_payload
+        self.gpib_timeout = gpib_timeout
+        self.usb_latency = usb_latency
+        self.read_ep = EmulatedInEndpoint(self, 0x81, max_packet_size)
+        self.write_ep = EmulatedOutEndpoint(self, 0x02, max_packet_size)
+        self.__configuration = EmulatedConfiguration(EmulatedInterface((self.read_ep, self.write_ep)))
+        self.__configured = False
+        self.__attached = True
+        # Pending IN transfers: (time available, data)
+        self.__transfers: deque[tuple[float, bytearray]] = deque()
+        self.__condition = threading.Condition()
+        # Firmware 1.0 leaks a byte of the previous READ reply into empty READ replies
+        self.__last_read_byte = 0x00
+
+    # pyUSB device API
+    # ****************
+    def __iter__(self) -> Iterator[EmulatedConfiguration]:
+        return iter((self.__configuration,))
+
+    def get_active_configuration(self) -> EmulatedConfiguration | None:
+        """
+        Returns
+        -------
+        EmulatedConfiguration or None
+            The configuration or None if the device is not configured
+        """
+        self.__check_attached()
+        return self.__configuration if self.__configured else None
+
+    def set_configuration(self) -> None:
+        """Configure the device."""
+        self.__check_attached()
+        self.__configured = True
+
+    # Test helpers
+    # ************
+    def inject(self, data: bytes) -> None:
+        """
+        Queue raw bytes as an IN transfer, for example to emulate garbage sent by the adapter.
+        Parameters
+        ----------
+        data: bytes
+            The data to send to the host
+        """
+        self.__queue_transfer(bytearray(data))
+
+    def unplug(self, duration: float | None = None) -> None:
+        """
+        Disconnect the adapter from the USB bus. Pending transfers are lost and all transfers fail with ENODEV, like
+        those of an unplugged pyUSB device, until the adapter is plugged in again.
+        Parameters
+        ----------
+        duration: float, optional
+            If given, the adapter is plugged in again after this time in seconds. Otherwise, call `replug()`.
+        """
+        with self.__condition:
+            self.__attached = False
+            self.__configured = False
+            self.__transfers.clear()
+            # Wake up pending reads
+            self.__condition.notify_all()
+        if duration is not None:
+            timer = threading.Timer(duration, self.replug)
+            timer.daemon = True
+            timer.start()
+
+    def replug(self) -> None:
+        """
+        Connect the adapter to the USB bus again at the same location. The adapter starts unconfigured and the output
+        buffers of the instruments are cleared, like after a power cycle.
+        """
+        with self.__condition:
+            for instrument in self.instruments.values():
+                instrument.clear()
+            self.__last_read_byte = 0x00
+            self.__attached = True
+
+    @property
+    def attached(self) -> bool:
+        """
+        Returns
+        -------
+        bool
+            False while the adapter is unplugged
+        """
+        return self.__attached
+
+    def __check_attached(self) -> None:
+        if not self.__attached:
+            raise USBError("No such device (it may have been disconnected)", errno=errno.ENODEV)
+
+    @property
+    def pending_transfers(self) -> int:
+        """
+        Returns
+        -------
+        int
+            The number of IN transfers, that have not been read by the host
+        """
+        with self.__condition:
+            return len(self.__transfers)
+
+    # Transfers
+    # *********
+    def __queue_transfer(self, data: bytearray, not_before: float = 0.0) -> None:
+        with self.__condition:
+            self.__transfers.append((max(time.monotonic(), not_before) + self.usb_latency, data))
+            self.__condition.notify_all()
+
+    def read_transfer(self, size: int, timeout: int) -> bytes:
+        """
+        Read from the IN endpoint. A transfer never contains data of two different replies.
+        Parameters
+        ----------
+        size: int
+            The maximum number of bytes to read
+        timeout: int
+            The timeout in ms. Zero means forever.
+        Returns
+        -------
+        bytes
+            The data read
+        Raises
+        ------
+        usb.core.USBError
+            If there is no data available within the timeout or the adapter was unplugged
+        """
+        deadline = time.monotonic() + timeout / 1000 if timeout else None
+        with self.__condition:
+            while True:
+                self.__check_attached()
+                now = time.monotonic()
+                if self.__transfers and self.__transfers[0][0] <= now:
+                    data = self.__transfers[0][1]
+                    chunk = bytes(data[:size])
+                    del data[:size]
+                    if not data:
+                        self.__transfers.popleft()
+                    return chunk
+                if deadline is not None and now >= deadline:
+                    raise USBError("Operation timed out", errno=errno.ETIMEDOUT)
+                wait_until = self.__transfers[0][0] if self.__transfers else deadline
+                if deadline is not None and wait_until is not None:
+                    wait_until = min(wait_until, deadline)
+                self.__condition.wait(None if wait_until is None else max(wait_until - now, 0))
+
+    def write_transfer(self, data: bytes) -> int:
+        """
+        Process an OUT transfer. The transfer may contain several frames, each frame starts at a USB packet boundary.
+        Parameters
+        ----------
+        data: bytes
+            The data sent by the host
+        Returns
+        -------
+        int
+            The number of bytes processed
+        """
+        self.__check_attached()
+        packet_size = self.write_ep.wMaxPacketSize
+        position = 0
+        while position + 2 <= len(data):
+            command, length = data[position], data[position + 1]
+            if length < 2:
+                # Padding, continue with the next packet
+                position += packet_size - position % packet_size
+                continue
+            self.__process_frame(command, data[position + 2 : position + length])
+            # The rest of the last packet of the frame is padding
+            position += length
+            position += -position % packet_size
+        return len(data)
+
+    # Firmware
+    # ********
+    def __reply(self, command: UgPlusCommands, payload: bytes, extra: bytes = b"", not_before: float = 0.0) -> None:
+        """Queue a reply frame. The extra bytes are sent, but not included in the length field."""
+        self.__queue_transfer(bytearray((command, len(payload) + 2)) + payload + extra, not_before)
+
+    def __process_frame(self, command: int, payload: bytes) -> None:
+        quirks = self.firmware_version == (1, 0)
+        if command == UgPlusCommands.GET_FIRMWARE_VERSION:
+            self.__reply(UgPlusCommands.GET_FIRMWARE_VERSION, bytes(self.firmware_version))
+        elif command == UgPlusCommands.GET_SERIES:
+            self.__reply(UgPlusCommands.GET_SERIES, bytes((self.model,)) + self.series.to_bytes(3, "big"))
+        elif command == UgPlusCommands.GET_MANUFACTURER_ID:
+            # BUG: Firmware 1.0 sends an extra byte
+            self.__reply(
+                UgPlusCommands.GET_MANUFACTURER_ID, self.manufacturer_id.encode("ascii"), b"\x00" if quirks else b""
+            )
+        elif command == UgPlusCommands.DISCOVER_GPIB_DEVICES:
+            # The last byte is unknown, it depends on the number of devices
+            devices = bytes(sorted(self.instruments)) + bytes((0x0A if not self.instruments else 0x1E,))
+            # BUG: Firmware 1.0 sends an extra byte
+            self.__reply(UgPlusCommands.DISCOVER_GPIB_DEVICES, devices, b"\x00" if quirks else b"")
+        elif command == UgPlusCommands.RESET:
+            for attached_instrument in self.instruments.values():
+                attached_instrument.clear()
+        elif command == UgPlusCommands.WRITE:
+            instrument = self.instruments.get(payload[0])
+            if instrument is not None:
+                instrument.handle_write(payload[2:], eoi=payload[1] == FLAGS_EOI)
+        elif command == UgPlusCommands.READ:
+            self.__process_read(payload[0], quirks)
+
+    def __process_read(self, pad: int, quirks: bool) -> None:
+        instrument = self.instruments.get(pad)
+        ready_time = instrument.output_ready_time if instrument is not None else None
+        if instrument is not None and ready_time is not None and ready_time - time.monotonic() <= self.gpib_timeout:
+            # The reply is sent, when the instrument is ready
+            data = bytes((pad, _READ_SUCCESS)) + instrument.take_output(self.max_read_payload)
+            self.__last_read_byte = data[2] if len(data) > 2 else self.__last_read_byte
+            self.__reply(UgPlusCommands.READ, data, not_before=ready_time)
+            return
+
+        # There is nothing to read. The length is 3, if there is no device and 4 if there is nothing to read.
+        if quirks:
+            # BUG: Firmware 1.0 always sends 5 bytes. The last byte is leaked from the previous reply.
+            length = 4 if instrument is not None else 3
+            self.__queue_transfer(bytearray((UgPlusCommands.READ, length, pad, _READ_FAILED, self.__last_read_byte)))
+        else:
+            self.__reply(UgPlusCommands.READ, bytes((pad, _READ_FAILED)))
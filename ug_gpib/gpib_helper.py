@@ -7,7 +7,7 @@ from typing import Generator
 
 import usb.core
 from usb.core import USBError
-from usb.util import find_descriptor
+from usb.util import dispose_resources, find_descriptor
 
 
 def _device_matcher(device: usb.core.Device) -> bool:
@@ -59,6 +59,36 @@ def get_usb_devices(vendor_id: int = 0x04D8, product_id: int = 0x000C) -> Genera
     )
 
 
+def get_usb_device_at(
+    bus: int, port_numbers: tuple[int, ...], vendor_id: int = 0x04D8, product_id: int = 0x000C
+) -> usb.core.Device | None:
+    """
+    Get the USB device, that matches the vendor id and product id, at a given location. This does not talk to any
+    device.
+    Parameters
+    ----------
+    bus: int
+        The USB bus number
+    port_numbers: tuple of int
+        The port numbers leading from the root hub to the device
+    vendor_id: int, default=0x04d8
+        The usb vendor id
+    product_id: int, default=0x000c
+        The usb product id
+    Returns
+    -------
+    usb.Device or None
+        The device found or None if there is no matching device at that location
+    """
+    return usb.core.find(
+        idVendor=vendor_id,
+        idProduct=product_id,
+        custom_match=lambda device: device.bus == bus
+        and device.port_numbers == port_numbers
+        and _device_matcher(device),
+    )
+
+
 def get_usb_endpoints(device: usb.core.Device) -> tuple[usb.core.Endpoint, usb.core.Endpoint]:
     """
     Get the read and write endpoint for a given device
@@ -108,3 +138,16 @@ def get_usb_endpoints(device: usb.core.Device) -> tuple[usb.core.Endpoint, usb.c
             raise
 
     return read_ep, write_ep
+
+
+def release_usb_device(device: usb.core.Device) -> None:
+    """
+    Release the resources claimed by pyUSB for a device. Objects, that are not pyUSB devices, like the emulated
+    adapter, are ignored.
+    Parameters
+    ----------
+    device: usb.core.Device
+        The device to release
+    """
+    if isinstance(device, usb.core.Device):
+        dispose_resources(device)
@@ -0,0 +1,139 @@
+"""
+Learns the response time of GPIB devices to schedule read requests.
+"""
+
+from __future__ import annotations
+
+import math
+from collections import deque
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class LatencyStats:
+    """Response latency statistics of a single device. All times are in seconds."""
+
+    samples: int
+    mean: float
+    minimum: float
+    median: float
+    percentile: float
+    maximum: float
+
+
+class ResponseLatencyScheduler:
+    """
+    Keeps a moving window of the response latencies of each primary address. The latency is the time between writing
+    a query to a device and receiving the answer. The scheduler uses a (low) percentile of this window to decide how
+    long to wait before polling the device for the answer.
+    """
+
+    def __init__(
+        self, window: int = 32, percentile: float = 10, poll_interval: float = 0.002, max_wait: float = 1.0
+    ) -> None:
+        """
+        Create a response latency scheduler.
+        Parameters
+        ----------
+        window: int, default=32
+            The number of latencies per device used to calculate the statistics
+        percentile: float, default=10
+            The percentile of the latency window used as the initial delay before polling the device. Higher values
+            cause fewer polls, but increase the latency of fast replies.
+        poll_interval: float, default=0.002
+            The time in seconds between polls, if the device has not answered yet
+        max_wait: float, default=1.0
+            The time in seconds after writing the query, after which the device is considered unresponsive
+        """
+        assert window > 0
+        assert 0 <= percentile <= 100
+        self.__window = window
+        self.__percentile = percentile
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self.__latencies: dict[int, deque[float]] = {}
+
+    @staticmethod
+    def __get_percentile(sorted_values: list[float], percentile: float) -> float:
+        """Calculate the percentile of a sorted list using the nearest-rank method."""
+        rank = max(math.ceil(percentile / 100 * len(sorted_values)), 1)
+        return sorted_values[rank - 1]
+
+    def record(self, pad: int, latency: float) -> None:
+        """
+        Add a response latency to the statistics of a device.
+        Parameters
+        ----------
+        pad: int
+            The primary address of the device
+        latency: float
+            The time in seconds between writing the query and receiving the answer
+        """
+        latencies = self.__latencies.get(pad)
+        if latencies is None:
+            latencies = self.__latencies[pad] = deque(maxlen=self.__window)
+        latencies.append(latency)
+
+    def initial_delay(self, pad: int) -> float:
+        """
+        Get the time to wait after writing a query before polling for the answer.
+        Parameters
+        ----------
+        pad: int
+            The primary address of the device
+        Returns
+        -------
+        float
+            The delay in seconds. Zero if the device is unknown.
+        """
+        latencies = self.__latencies.get(pad)
+        if not latencies:
+            return 0
+        return self.__get_percentile(sorted(latencies), self.__percentile)
+
+    def stats(self, pad: int) -> LatencyStats | None:
+        """
+        Get the latency statistics of a device.
+        Parameters
+        ----------
+        pad: int
+            The primary address of the device
+        Returns
+        -------
+        LatencyStats or None
+            The statistics or None if there are no samples for the device
+        """
+        latencies = self.__latencies.get(pad)
+        if not latencies:
+            return None
+        sorted_latencies = sorted(latencies)
+        return LatencyStats(
+            samples=len(sorted_latencies),
+            mean=sum(sorted_latencies) / len(sorted_latencies),
+            minimum=sorted_latencies[0],
+            median=self.__get_percentile(sorted_latencies, 50),
+            percentile=self.__get_percentile(sorted_latencies, self.__percentile),
+            maximum=sorted_latencies[-1],
+        )
+
+    def all_stats(self) -> dict[int, LatencyStats]:
+        """
+        Returns
+        -------
+        dict of int and LatencyStats
+            The latency statistics of all devices with at least one sample
+        """
+        return {pad: stats for pad in self.__latencies if (stats := self.stats(pad)) is not None}
+
+    def reset(self, pad: int | None = None) -> None:
+        """
+        Discard the latencies of a single device or all devices.
+        Parameters
+        ----------
+        pad: int, optional
+            The primary address of the device. If not given, all devices are reset.
+        """
+        if pad is None:
+            self.__latencies.clear()
+        else:
+            self.__latencies.pop(pad, None)
@@ -0,0 +1,145 @@
+"""
+A persistent cache, that maps the series number of a UGPlus adapter to its location on the USB bus. This allows to
+connect to a known adapter without probing every device on the bus.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+from pathlib import Path
+
+
+class AdapterLocationCache:
+    """
+    Maps adapter series numbers to the USB bus number and port path of the adapter. The cache is stored as a json file.
+    A corrupt or outdated file is ignored and entries are invalidated by the driver when the device found at a cached
+    location does not match.
+    """
+
+    # Increment this, if the file format changes. Files with a different version are ignored.
+    FILE_FORMAT_VERSION = 1
+
+    def __init__(self, path: str | os.PathLike[str] | None = None) -> None:
+        """
+        Create a location cache.
+        Parameters
+        ----------
+        path: str or os.PathLike, optional
+            The cache file. Defaults to `ug_gpib/adapter_locations.json` in the user cache directory
+            (`$XDG_CACHE_HOME` or `~/.cache`).
+        """
+        if path is None:
+            cache_dir = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+            path = Path(cache_dir) / "ug_gpib" / "adapter_locations.json"
+        self.__path = Path(path)
+        self.__logger = logging.getLogger(__name__)
+
+    @property
+    def path(self) -> Path:
+        """
+        Returns
+        -------
+        Path
+            The location of the cache file
+        """
+        return self.__path
+
+    def __load(self) -> dict[str, dict[str, int | list[int]]]:
+        try:
+            with open(self.__path, encoding="utf-8") as cache_file:
+                content = json.load(cache_file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as exc:
+            self.__logger.warning("Ignoring unreadable adapter location cache '%s': %s", self.__path, exc)
+            return {}
+        if not isinstance(content, dict) or content.get("version") != self.FILE_FORMAT_VERSION:
+            return {}
+        adapters = content.get("adapters")
+        if not isinstance(adapters, dict):
+            return {}
+        # Drop corrupt entries, the others are still usable
+        return {key: entry for key, entry in adapters.items() if isinstance(entry, dict)}
+
+    def __store(self, adapters: dict[str, dict[str, int | list[int]]]) -> None:
+        # Write to a temporary file first, then atomically replace the cache, so that concurrent readers never see a
+        # partially written file. tempfile is imported here, because it is slow to import and rarely needed.
+        import tempfile  # pylint: disable=import-outside-toplevel
+
+        temporary: Path | None = None
+        try:
+            self.__path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=self.__path.parent, prefix=self.__path.name, suffix=".tmp", delete=False
+            ) as cache_file:
+                temporary = Path(cache_file.name)
+                json.dump({"version": self.FILE_FORMAT_VERSION, "adapters": adapters}, cache_file)
+            os.replace(temporary, self.__path)
+            temporary = None
+        except OSError as exc:
+            self.__logger.warning("Cannot write adapter location cache '%s': %s", self.__path, exc)
+        finally:
+            # Do not leave the temporary file behind, if writing or replacing the cache failed
+            if temporary is not None:
+                with contextlib.suppress(OSError):
+                    temporary.unlink()
+
+    def get(self, series: int) -> tuple[int, tuple[int, ...]] | None:
+        """
+        Look up the location of an adapter.
+        Parameters
+        ----------
+        series: int
+            The series number of the adapter
+        Returns
+        -------
+        tuple of int and tuple of int or None
+            The bus number and the port numbers of the adapter or None if the adapter is not cached
+        """
+        entry = self.__load().get(str(series))
+        try:
+            bus, port_numbers = entry["bus"], entry["port_numbers"]  # type: ignore[index]
+            if not isinstance(bus, int) or not isinstance(port_numbers, list):
+                return None
+            return bus, tuple(int(port) for port in port_numbers)
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def set(self, series: int, bus: int, port_numbers: tuple[int, ...]) -> None:
+        """
+        Store the location of an adapter. Any other adapter cached at the same location is removed.
+        Parameters
+        ----------
+        series: int
+            The series number of the adapter
+        bus: int
+            The USB bus number
+        port_numbers: tuple of int
+            The port numbers leading from the root hub to the adapter
+        """
+        adapters = {
+            key: entry
+            for key, entry in self.__load().items()
+            if not (entry.get("bus") == bus and entry.get("port_numbers") == list(port_numbers))
+        }
+        adapters[str(series)] = {"bus": bus, "port_numbers": list(port_numbers)}
+        self.__store(adapters)
+
+    def invalidate(self, series: int) -> None:
+        """
+        Remove an adapter from the cache.
+        Parameters
+        ----------
+        series: int
+            The series number of the adapter
+        """
+        adapters = self.__load()
+        if adapters.pop(str(series), None) is not None:
+            self.__store(adapters)
+
+    def clear(self) -> None:
+        """Remove all entries from the cache."""
+        self.__store({})
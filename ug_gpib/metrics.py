@@ -0,0 +1,210 @@
+"""
+Lightweight counters and latency histograms for the UGPlus driver.
+"""
+
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Callable
+
+# The upper bounds of the latency histogram buckets in seconds. The last bucket collects everything above.
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+@dataclass(frozen=True)
+class HistogramSnapshot:
+    """
+    A copy of a latency histogram. counts[i] is the number of samples less than or equal to `bounds[i]`, the last
+    entry counts all larger samples.
+    """
+
+    bounds: tuple[float, ...]
+    counts: tuple[int, ...]
+    count: int
+    total: float
+
+    @property
+    def mean(self) -> float:
+        """
+        Returns
+        -------
+        float
+            The mean latency in seconds or NaN, if there are no samples
+        """
+        return self.total / self.count if self.count else float("nan")
+
+
+class LatencyHistogram:
+    """A latency histogram with fixed, logarithmically spaced buckets."""
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, latency: float) -> None:
+        """
+        Add a sample to the histogram.
+        Parameters
+        ----------
+        latency: float
+            The latency in seconds
+        """
+        self.counts[bisect_left(LATENCY_BUCKETS, latency)] += 1
+        self.count += 1
+        self.total += latency
+
+    def snapshot(self) -> HistogramSnapshot:
+        """
+        Returns
+        -------
+        HistogramSnapshot
+            A copy of the histogram
+        """
+        return HistogramSnapshot(LATENCY_BUCKETS, tuple(self.counts), self.count, self.total)
+
+
+@dataclass(frozen=True)
+class MetricsSnapshot:  # pylint: disable=too-many-instance-attributes
+    """A copy of all driver metrics at a given time."""
+
+    timestamp: float
+    transfers_out: int
+    transfers_in: int
+    bytes_out: int
+    bytes_in: int
+    timeouts: int
+    framing_errors: int
+    discarded_bytes: int
+    command_latency: dict[str, HistogramSnapshot]
+    pad_latency: dict[int, HistogramSnapshot]
+
+
+class Metrics:  # pylint: disable=too-many-instance-attributes
+    """
+    Counters for USB transfers and errors, and latency histograms per adapter command and per primary address. The
+    counters are plain attributes, so updating them is as cheap as possible. The object is not thread-safe, it is
+    updated by the driver, which must not be used by multiple threads concurrently anyway.
+    """
+
+    def __init__(
+        self, export_hook: Callable[[MetricsSnapshot], None] | None = None, export_interval: float = 60
+    ) -> None:
+        """
+        Create a metrics object.
+        Parameters
+        ----------
+        export_hook: Callable, optional
+            A function called with a snapshot of the metrics every `export_interval` seconds. The hook is called from
+            the thread recording the metrics, so it should return quickly.
+        export_interval: float, default=60
+            The minimum time in seconds between two calls of the export hook
+        """
+        self.export_hook = export_hook
+        self.export_interval = export_interval
+        self.__next_export = time.monotonic() + export_interval
+        self.transfers_out = 0
+        self.transfers_in = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.timeouts = 0
+        self.framing_errors = 0
+        # Bytes dropped while resynchronizing to the reply stream or draining the endpoint
+        self.discarded_bytes = 0
+        self.command_latency: dict[IntEnum, LatencyHistogram] = {}
+        self.pad_latency: dict[int, LatencyHistogram] = {}
+
+    def record_command(self, command: IntEnum, latency: float) -> None:
+        """
+        Add the latency of an adapter command to its histogram.
+        Parameters
+        ----------
+        command: UgPlusCommands
+            The adapter command
+        latency: float
+            The latency in seconds
+        """
+        histogram = self.command_latency.get(command)
+        if histogram is None:
+            histogram = self.command_latency[command] = LatencyHistogram()
+        histogram.record(latency)
+        self.__check_export()
+
+    def record_pad(self, pad: int, latency: float) -> None:
+        """
+        Add the response latency of a GPIB device to its histogram.
+        Parameters
+        ----------
+        pad: int
+            The primary address of the device
+        latency: float
+            The latency in seconds
+        """
+        histogram = self.pad_latency.get(pad)
+        if histogram is None:
+            histogram = self.pad_latency[pad] = LatencyHistogram()
+        histogram.record(latency)
+
+    def __check_export(self) -> None:
+        if self.export_hook is not None and time.monotonic() >= self.__next_export:
+            self.export()
+
+    def export(self) -> None:
+        """Call the export hook with a snapshot of the metrics now."""
+        self.__next_export = time.monotonic() + self.export_interval
+        if self.export_hook is not None:
+            self.export_hook(self.snapshot())
+
+    def snapshot(self) -> MetricsSnapshot:
+        """
+        Returns
+        -------
+        MetricsSnapshot
+            A copy of the current metrics
+        """
+        return MetricsSnapshot(
+            timestamp=time.time(),
+            transfers_out=self.transfers_out,
+            transfers_in=self.transfers_in,
+            bytes_out=self.bytes_out,
+            bytes_in=self.bytes_in,
+            timeouts=self.timeouts,
+            framing_errors=self.framing_errors,
+            discarded_bytes=self.discarded_bytes,
+            command_latency={command.name: histogram.snapshot() for command, histogram in self.command_latency.items()},
+            pad_latency={pad: histogram.snapshot() for pad, histogram in self.pad_latency.items()},
+        )
+
+    def reset(self) -> None:
+        """Reset all counters and histograms."""
+        self.transfers_out = 0
+        self.transfers_in = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.timeouts = 0
+        self.framing_errors = 0
+        self.discarded_bytes = 0
+        self.command_latency.clear()
+        self.pad_latency.clear()
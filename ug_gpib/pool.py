@@ -0,0 +1,363 @@
+"""
+Drives several UGPlus adapters in parallel. Every adapter has its own driver and worker thread, so transfers on
+different GPIB buses overlap.
+"""
+
+from __future__ import annotations
+
+import logging
+import sys
+from concurrent.futures import Future, wait
+from types import TracebackType
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, TypeVar
+
+from .shared import Priority, SharedUGPlusGpib
+from .ug_gpib import UGPlusGpib
+
+if sys.version_info < (3, 11):
+    from typing_extensions import Self
+else:
+    from typing import Self
+
+if TYPE_CHECKING:
+    from usb.core import Device
+
+T = TypeVar("T")
+
+
+def _open_adapter(gpib: UGPlusGpib) -> int:
+    """Connect the driver and return the series number of the adapter."""
+    gpib.connect()
+    return gpib.get_series_number()[1]
+
+
+def _location(device: Device) -> tuple[int, tuple[int, ...]] | None:
+    """Return the bus and the port numbers of a device or None if the backend does not report them."""
+    return (device.bus, tuple(device.port_numbers)) if device.port_numbers is not None else None
+
+
+def _create_drivers(devices: list[Device], given: bool, timeout: float | None) -> list[UGPlusGpib]:
+    """
+    Create a driver for each device pinned to its USB location. The device is looked up again at that location, when
+    reconnecting, because the device object is stale after the adapter was replugged. Devices without a unique
+    location are pinned by the device object instead.
+    """
+    locations = [_location(device) for device in devices]
+    return [
+        (
+            UGPlusGpib(None, timeout, devices=devices if given else None, location=location, connect="lazy")
+            if location is not None and locations.count(location) == 1
+            else UGPlusGpib(None, timeout, devices=[device], connect="lazy")
+        )
+        for device, location in zip(devices, locations)
+    ]
+
+
+class AdapterPool:
+    """
+    A pool of all UGPlus adapters attached to the host. The USB devices are enumerated once and every adapter found is
+    opened with its own `SharedUGPlusGpib`, pinned to its USB location. Requests are addressed by a tuple of the series
+    number of the adapter and the primary address of the instrument. Requests to the same adapter are executed in
+    order of their priority, requests to different adapters run concurrently.
+    """
+
+    def __init__(self, devices: Iterable[Device] | None = None, timeout: float | None = None) -> None:
+        """
+        Enumerate the USB devices and open all adapters. The adapters are opened in parallel. Devices, that do not
+        answer like an adapter, are skipped.
+        Parameters
+        ----------
+        devices: Iterable of usb.core.Device, optional
+            The USB devices to search for adapters. Defaults to all candidates found by `get_usb_devices()`. This
+            can also be used to open emulated adapters, see `ug_gpib.emulator`. Each adapter is pinned to its USB
+            location. If the devices are given, they are searched for the location on reconnect, otherwise the USB
+            devices are enumerated again.
+        timeout: float, optional
+            The timeout for running commands in seconds
+        """
+        self.__logger = logging.getLogger(__name__)
+        given = devices is not None
+        if devices is None:
+            from .gpib_helper import get_usb_devices  # pylint: disable=import-outside-toplevel
+
+            devices = get_usb_devices()
+        candidates = [SharedUGPlusGpib(gpib) for gpib in _create_drivers(list(devices), given, timeout)]
+        # Each candidate is opened on its own worker thread
+        futures = [shared.submit(_open_adapter, Priority.HIGH) for shared in candidates]
+        self.__adapters: dict[int, SharedUGPlusGpib] = {}
+        for shared, future in zip(candidates, futures):
+            try:
+                series = future.result()
+            except (OSError, ValueError) as exc:
+                self.__logger.warning("Skipping USB device, that is not a GPIB adapter: %(error)s.", {"error": exc})
+                self.__close_adapter(shared)
+                continue
+            if series in self.__adapters:
+                self.__logger.warning("Skipping second adapter with series number %(series)s.", {"series": series})
+                self.__close_adapter(shared)
+                continue
+            self.__logger.info("Opened GPIB adapter %(series)s.", {"series": series})
+            self.__adapters[series] = shared
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.__adapters)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.__adapters)
+
+    def __contains__(self, series: object) -> bool:
+        return series in self.__adapters
+
+    def __getitem__(self, series: int) -> SharedUGPlusGpib:
+        return self.__adapters[series]
+
+    @property
+    def series(self) -> tuple[int, ...]:
+        """
+        Returns
+        -------
+        tuple of int
+            The series numbers of the adapters in the pool
+        """
+        return tuple(self.__adapters)
+
+    @staticmethod
+    def __close_adapter(shared: SharedUGPlusGpib, cancel_pending: bool = False) -> None:
+        """Release the USB device and stop the worker thread of an adapter."""
+        try:
+            shared.submit(lambda gpib: gpib.close(), Priority.HIGH).result()
+        except OSError:
+            # The device is gone, there is nothing left to release
+            pass
+        shared.close(cancel_pending)
+
+    def close(self, cancel_pending: bool = False) -> None:
+        """
+        Release all adapters and stop the worker threads.
+        Parameters
+        ----------
+        cancel_pending: bool, default=False
+            Cancel all requests, that have not been started yet, instead of waiting for them to complete
+        """
+        adapters, self.__adapters = self.__adapters, {}
+        for shared in adapters.values():
+            self.__close_adapter(shared, cancel_pending)
+
+    def submit(self, series: int, func: Callable[[UGPlusGpib], T], priority: int = Priority.NORMAL) -> Future[T]:
+        """
+        Run a function on the worker thread of an adapter. See `SharedUGPlusGpib.submit()`.
+        Parameters
+        ----------
+        series: int
+            The series number of the adapter
+        func: Callable
+            The function to run. It is called with the driver of the adapter.
+        priority: int, default=Priority.NORMAL
+            Requests with a lower value are processed first
+        Returns
+        -------
+        Future
+            The result of the function
+        Raises
+        ------
+        KeyError
+            If there is no adapter with the series number in the pool
+        """
+        return self.__adapters[series].submit(func, priority)
+
+    def write(self, address: tuple[int, int], data: bytes, priority: int = Priority.NORMAL) -> Future[None]:
+        """
+        Write data to a device. See `UGPlusGpib.write()`.
+        Parameters
+        ----------
+        address: tuple of int
+            The series number of the adapter and the primary address of the device
+        data: bytes
+            The data to send to the device
+        priority: int, default=Priority.NORMAL
+            Requests with a lower value are processed first
+        Returns
+        -------
+        Future
+            Completes when the data was written
+        """
+        series, pad = address
+        return self.__adapters[series].write(pad, data, priority)
+
+    def read(self, address: tuple[int, int], delay: float = 0, priority: int = Priority.NORMAL) -> Future[bytes | None]:
+        """
+        Read from a device. See `UGPlusGpib.read()`.
+        Parameters
+        ----------
+        address: tuple of int
+            The series number of the adapter and the primary address of the device
+        delay: float, default=0
+            The time in seconds to wait after the read request, before reading back the answer
+        priority: int, default=Priority.NORMAL
+            Requests with a lower value are processed first
+        Returns
+        -------
+        Future
+            The data read or None if there was an error
+        """
+        series, pad = address
+        return self.__adapters[series].read(pad, delay, priority)
+
+    def query(
+        self, address: tuple[int, int], data: bytes, delay: float = 0, priority: int = Priority.NORMAL
+    ) -> Future[bytes | None]:
+        """
+        Write data to a device and read back the answer as a single request. See `UGPlusGpib.query()`.
+        Parameters
+        ----------
+        address: tuple of int
+            The series number of the adapter and the primary address of the device
+        data: bytes
+            The data to send to the device
+        delay: float, default=0
+            The time in seconds to wait after the read request, before reading back the answer
+        priority: int, default=Priority.NORMAL
+            Requests with a lower value are processed first
+        Returns
+        -------
+        Future
+            The data read or None if there was an error
+        """
+        series, pad = address
+        return self.__adapters[series].query(pad, data, delay, priority)
+
+    def query_many(
+        self, address: tuple[int, int], commands: Iterable[bytes], priority: int = Priority.NORMAL
+    ) -> Future[list[bytes | None]]:
+        """
+        Send several queries to a device as a single request. See `UGPlusGpib.query_many()`.
+        Parameters
+        ----------
+        address: tuple of int
+            The series number of the adapter and the primary address of the device
+        commands: Iterable of bytes
+            The queries to send to the device
+        priority: int, default=Priority.NORMAL
+            Requests with a lower value are processed first
+        Returns
+        -------
+        Future
+            The answers in the same order as the commands
+        """
+        series, pad = address
+        return self.__adapters[series].query_many(pad, commands, priority)
+
+    def scatter(
+        self, func: Callable[[UGPlusGpib], T], series: Iterable[int] | None = None, priority: int = Priority.NORMAL
+    ) -> dict[int, Future[T]]:
+        """
+        Run a function on several adapters concurrently.
+        Parameters
+        ----------
+        func: Callable
+            The function to run. It is called with the driver of each adapter.
+        series: Iterable of int, optional
+            The series numbers of the adapters. Defaults to all adapters.
+        priority: int, default=Priority.NORMAL
+            Requests with a lower value are processed first
+        Returns
+        -------
+        dict of int and Future
+            The result of the function keyed by the series number of the adapter
+        """
+        return {
+            series_number: self.submit(series_number, func, priority)
+            for series_number in (self.__adapters if series is None else series)
+        }
+
+    def gather(
+        self, func: Callable[[UGPlusGpib], T], series: Iterable[int] | None = None, priority: int = Priority.NORMAL
+    ) -> dict[int, T]:
+        """
+        Run a function on several adapters concurrently and wait for all results. See `scatter()`.
+        Parameters
+        ----------
+        func: Callable
+            The function to run. It is called with the driver of each adapter.
+        series: Iterable of int, optional
+            The series numbers of the adapters. Defaults to all adapters.
+        priority: int, default=Priority.NORMAL
+            Requests with a lower value are processed first
+        Returns
+        -------
+        dict of int and Any
+            The result of the function keyed by the series number of the adapter
+        Raises
+        ------
+        Exception
+            The first error raised by the function in the order of the series numbers given. It is raised after all
+            adapters have finished.
+        """
+        futures = self.scatter(func, series, priority)
+        wait(futures.values())
+        for future in futures.values():
+            error = future.exception()
+            if error is not None:
+                raise error
+        return {series_number: future.result() for series_number, future in futures.items()}
+
+    def query_all(
+        self,
+        pad: int,
+        data: bytes,
+        delay: float = 0,
+        priority: int = Priority.NORMAL,
+        *,
+        raise_errors: bool = True,
+    ) -> dict[int, bytes | None]:
+        """
+        Send the same query to the device at pad on every bus and read back the answers.
+        Parameters
+        ----------
+        pad: int
+            The primary address of the device on each bus
+        data: bytes
+            The data to send to the devices
+        delay: float, default=0
+            The time in seconds to wait after the read request, before reading back the answer
+        priority: int, default=Priority.NORMAL
+            Requests with a lower value are processed first
+        raise_errors: bool, default=True
+            Raise an error, if a device did not answer. Otherwise, the answer of that device is None.
+        Returns
+        -------
+        dict of int and bytes or None
+            The answers keyed by the series number of the adapter
+        """
+
+        def query(gpib: UGPlusGpib) -> bytes | None:
+            try:
+                return gpib.query(pad, data, delay)
+            except OSError:
+                if raise_errors:
+                    raise
+                return None
+
+        return self.gather(query, priority=priority)
+
+    def get_gpib_devices(self, priority: int = Priority.NORMAL) -> dict[int, tuple[int, ...]]:
+        """
+        Discover the GPIB devices on every bus. See `UGPlusGpib.get_gpib_devices()`.
+        Parameters
+        ----------
+        priority: int, default=Priority.NORMAL
+            Requests with a lower value are processed first
+        Returns
+        -------
+        dict of int and tuple of int
+            The primary addresses of the devices found keyed by the series number of the adapter
+        """
+        return self.gather(lambda gpib: gpib.get_gpib_devices(), priority=priority)
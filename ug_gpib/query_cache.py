@@ -0,0 +1,183 @@
+"""
+A cache for the replies of idempotent queries like the adapter metadata or the identification of instruments.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """The counters of a query cache."""
+
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        Returns
+        -------
+        float
+            The fraction of lookups answered from the cache or NaN, if there were no lookups
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else float("nan")
+
+
+class QueryCache:
+    """
+    A least recently used cache with a time to live per entry. The driver stores the adapter metadata (manufacturer
+    id, series number and firmware version) and the replies to instrument queries registered using `register()`.
+    The cache is cleared, when the adapter is reset or (re-)connected.
+    """
+
+    def __init__(self, max_entries: int = 128, default_ttl: float | None = None) -> None:
+        """
+        Create a query cache.
+        Parameters
+        ----------
+        max_entries: int, default=128
+            The maximum number of entries. The least recently used entry is evicted when the cache is full. Set to 0
+            to disable caching.
+        default_ttl: float, optional
+            The time to live of an entry in seconds, if no other TTL is given. By default, entries do not expire.
+        """
+        assert max_entries >= 0
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        # Maps the key to a tuple of the expiry time and the value
+        self.__entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.__registered: dict[Hashable, float | None] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def register(self, pad: int, command: bytes | bytearray | memoryview, ttl: float | None = None) -> None:
+        """
+        Cache the reply of an instrument query. Only register queries, that do not change the state of the
+        instrument and always return the same answer, like b"*IDN?\\n".
+        Parameters
+        ----------
+        pad: int
+            The primary address of the instrument
+        command: bytes or bytearray or memoryview
+            The query exactly as written to the instrument
+        ttl: float, optional
+            The time to live of the reply in seconds. Defaults to `default_ttl`.
+        """
+        self.__registered[(pad, bytes(command))] = ttl
+
+    def unregister(self, pad: int, command: bytes | bytearray | memoryview) -> None:
+        """
+        Stop caching the reply of an instrument query and drop the cached reply.
+        Parameters
+        ----------
+        pad: int
+            The primary address of the instrument
+        command: bytes or bytearray or memoryview
+            The query as passed to `register()`
+        """
+        key = (pad, bytes(command))
+        self.__registered.pop(key, None)
+        self.invalidate(key)
+
+    def is_registered(self, key: Hashable) -> bool:
+        """
+        Parameters
+        ----------
+        key: Hashable
+            A tuple of the primary address and the query
+
+        Returns
+        -------
+        bool
+            True if the query was registered
+        """
+        return key in self.__registered
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Look up a value and mark it as recently used.
+        Parameters
+        ----------
+        key: Hashable
+            The key of the value
+
+        Returns
+        -------
+        Any
+            The cached value or None, if the key is not cached or has expired
+        """
+        entry = self.__entries.get(key)
+        if entry is not None:
+            expires, value = entry
+            if expires > time.monotonic():
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self.__entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """
+        Store a value. None is not cached.
+        Parameters
+        ----------
+        key: Hashable
+            The key of the value
+        value: Any
+            The value to store
+        ttl: float, optional
+            The time to live in seconds. Defaults to the TTL of the registered query or to `default_ttl`.
+        """
+        if value is None or self.max_entries == 0:
+            return
+        if ttl is None:
+            ttl = self.__registered.get(key)
+        if ttl is None:
+            ttl = self.default_ttl
+        self.__entries[key] = (time.monotonic() + ttl if ttl is not None else float("inf"), value)
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.max_entries:
+            self.__entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Drop a single value.
+        Parameters
+        ----------
+        key: Hashable
+            The key of the value
+        """
+        self.__entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop all values. The registered queries and the counters are kept."""
+        self.__entries.clear()
+
+    def stats(self) -> CacheStats:
+        """
+        Returns
+        -------
+        CacheStats
+            A copy of the cache counters
+        """
+        return CacheStats(hits=self.hits, misses=self.misses, evictions=self.evictions, entries=len(self.__entries))
+
+    def reset_stats(self) -> None:
+        """Reset the hit, miss and eviction counters."""
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
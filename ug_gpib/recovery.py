@@ -0,0 +1,140 @@
+"""
+Automatic recovery of the connection to the adapter after USB errors, for example when the adapter was unplugged,
+reset or lost power.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterator
+
+
+@dataclass(frozen=True)
+class RecoveryStats:
+    """The counters of a recovery policy. All times are in seconds."""
+
+    errors: int
+    reconnects: int
+    failed_reconnects: int
+    retries: int
+    downtime: float
+    last_downtime: float
+    last_error: str | None
+
+
+class RecoveryPolicy:  # pylint: disable=too-many-instance-attributes
+    """
+    Decides how the driver reacts to USB errors, that leave the connection unusable. These are all USB errors except
+    read timeouts and all errors while writing to the adapter. The driver then releases the device and reconnects,
+    trying the USB location of the adapter first. Reconnect attempts are repeated with an exponential backoff until
+    `reconnect_timeout` has passed. A call with a deadline or a cancellation token stops reconnecting earlier and raises
+    a `TimeoutError` or `OperationCancelled` instead.
+
+    After reconnecting, idempotent operations like querying the adapter metadata or discovering the GPIB devices are
+    retried up to `max_retries` times. All other operations raise the original error, because it is unknown whether
+    the instrument has received the command.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 2,
+        reconnect_timeout: float = 5.0,
+        initial_backoff: float = 0.01,
+        max_backoff: float = 0.5,
+        *,
+        enabled: bool = True,
+    ) -> None:
+        """
+        Create a recovery policy.
+        Parameters
+        ----------
+        max_retries: int, default=2
+            The maximum number of times an idempotent operation is repeated after reconnecting
+        reconnect_timeout: float, default=5.0
+            The time in seconds after which reconnecting is given up. The driver is left disconnected and the next
+            command tries to connect again.
+        initial_backoff: float, default=0.01
+            The time in seconds to wait after the first failed reconnect attempt. The time is doubled after every
+            further attempt.
+        max_backoff: float, default=0.5
+            The maximum time in seconds between two reconnect attempts
+        enabled: bool, default=True
+            Set to False to disable the recovery. USB errors are then raised and the driver stays unusable until
+            `close()` and `connect()` are called.
+        """
+        assert max_retries >= 0
+        assert 0 < initial_backoff <= max_backoff
+        self.max_retries = max_retries
+        self.reconnect_timeout = reconnect_timeout
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.enabled = enabled
+        self.errors = 0
+        self.reconnects = 0
+        self.failed_reconnects = 0
+        self.retries = 0
+        self.downtime = 0.0
+        self.last_downtime = 0.0
+        self.last_error: str | None = None
+
+    def backoff(self) -> Iterator[float]:
+        """
+        Returns
+        -------
+        Iterator of float
+            The times in seconds to wait between consecutive reconnect attempts
+        """
+        delay = self.initial_backoff
+        while True:
+            yield delay
+            delay = min(delay * 2, self.max_backoff)
+
+    def record_error(self, error: BaseException) -> None:
+        """
+        Count an error, that caused the connection to be lost.
+        Parameters
+        ----------
+        error: BaseException
+            The error
+        """
+        self.errors += 1
+        self.last_error = str(error)
+
+    def record_reconnect(self, downtime: float) -> None:
+        """
+        Count a successful reconnect.
+        Parameters
+        ----------
+        downtime: float
+            The time in seconds between losing the connection and reconnecting
+        """
+        self.reconnects += 1
+        self.downtime += downtime
+        self.last_downtime = downtime
+
+    def stats(self) -> RecoveryStats:
+        """
+        Returns
+        -------
+        RecoveryStats
+            A copy of the recovery counters
+        """
+        return RecoveryStats(
+            errors=self.errors,
+            reconnects=self.reconnects,
+            failed_reconnects=self.failed_reconnects,
+            retries=self.retries,
+            downtime=self.downtime,
+            last_downtime=self.last_downtime,
+            last_error=self.last_error,
+        )
+
+    def reset_stats(self) -> None:
+        """Reset all counters."""
+        self.errors = 0
+        self.reconnects = 0
+        self.failed_reconnects = 0
+        self.retries = 0
+        self.downtime = 0.0
+        self.last_downtime = 0.0
+        self.last_error = None
@@ -0,0 +1,267 @@
+"""
+A daemon, that shares a single UGPlus adapter with many processes. The adapter is opened once and requests are served
+over a Unix domain socket using a compact binary protocol. Use `UGPlusGpibClient` to connect to the server.
+
+Usage: python -m ug_gpib.server [--socket PATH] [--series SERIES] [--timeout SECONDS]
+
+Protocol
+--------
+Every request is a header (request id: uint32, opcode: uint8, pad: uint8, payload length: uint32, little-endian)
+followed by the payload. Every response is a header (request id: uint32, status: uint8, payload length: uint32)
+followed by the payload. Requests on a single connection may be pipelined, the responses carry the id of the request
+they answer. The payload of WRITE requests starts with the timeout of the call (float64, NaN for the timeout of the
+driver), the payload of READ and QUERY requests with the delay (float64), the timeout and the adaptive flag (uint8).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import math
+import os
+import struct
+from enum import IntEnum
+from pathlib import Path
+from typing import Any
+
+from .async_ug_gpib import AsyncUGPlusGpib
+
+REQUEST_HEADER = struct.Struct("<IBBI")
+RESPONSE_HEADER = struct.Struct("<IBI")
+# The timeout argument of WRITE requests, prepended to the payload. NaN selects the timeout of the driver.
+TIMEOUT = struct.Struct("<d")
+# The delay, timeout and adaptive arguments of READ and QUERY requests, prepended to the payload
+READ_ARGUMENTS = struct.Struct("<dd?")
+# The errno prepended to the message of an OS_ERROR response
+ERROR_NUMBER = struct.Struct("<i")
+SERIES = struct.Struct("<BI")
+
+
+class Opcode(IntEnum):
+    """The requests understood by the server."""
+
+    WRITE = 0x01
+    READ = 0x02
+    QUERY = 0x03
+    DISCOVER = 0x04
+    VERSION = 0x05
+    SERIES = 0x06
+    MANUFACTURER_ID = 0x07
+    RESET = 0x08
+
+
+class Status(IntEnum):
+    """The status of a response."""
+
+    OK = 0x00
+    NO_DATA = 0x01  # The read returned None
+    OS_ERROR = 0x02  # The payload is the errno followed by the error message
+    VALUE_ERROR = 0x03  # The payload is the error message
+    ERROR = 0x04  # The payload is the error message
+
+
+# Requests without side effects. Identical requests in flight at the same time are answered by a single adapter command.
+COALESCABLE_OPCODES = frozenset({Opcode.DISCOVER, Opcode.VERSION, Opcode.SERIES, Opcode.MANUFACTURER_ID})
+
+
+def _optional_timeout(timeout: float) -> float | None:
+    """Decode a timeout argument, NaN selects the timeout of the driver."""
+    return None if math.isnan(timeout) else timeout
+
+
+def default_socket_path(device_series: int) -> Path:
+    """
+    Get the default location of the server socket.
+    Parameters
+    ----------
+    device_series: int
+        The series number of the adapter
+    Returns
+    -------
+    Path
+        The socket path. It is placed in `$XDG_RUNTIME_DIR` if set, else in the temp directory.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    return Path(runtime_dir) / f"ug_gpib-{device_series}.sock"
+
+
+class GpibServer:
+    """Serves a UGPlus adapter over a Unix domain socket."""
+
+    def __init__(self, gpib: AsyncUGPlusGpib, path: str | os.PathLike[str]) -> None:
+        """
+        Create a server. The adapter must be connected before serving requests.
+        Parameters
+        ----------
+        gpib: AsyncUGPlusGpib
+            The adapter to share
+        path: str or os.PathLike
+            The location of the Unix domain socket
+        """
+        self.__gpib = gpib
+        self.__path = Path(path)
+        self.__logger = logging.getLogger(__name__)
+        self.__server: asyncio.AbstractServer | None = None
+        self.__in_flight: dict[Opcode, asyncio.Future[bytes | None]] = {}
+        self.requests_served = 0
+        self.requests_coalesced = 0
+
+    @property
+    def path(self) -> Path:
+        """
+        Returns
+        -------
+        Path
+            The location of the Unix domain socket
+        """
+        return self.__path
+
+    async def start(self) -> None:
+        """Start listening on the socket. A stale socket file is replaced."""
+        self.__path.unlink(missing_ok=True)
+        self.__server = await asyncio.start_unix_server(self.__handle_connection, path=self.__path)
+        self.__logger.info("Serving GPIB adapter on %s.", self.__path)
+
+    async def serve_forever(self) -> None:
+        """Start the server if necessary, then serve requests until cancelled."""
+        if self.__server is None:
+            await self.start()
+        assert self.__server is not None
+        try:
+            await self.__server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """Stop serving and remove the socket."""
+        if self.__server is not None:
+            self.__server.close()
+            await self.__server.wait_closed()
+            self.__server = None
+            self.__path.unlink(missing_ok=True)
+
+    async def __execute(  # pylint: disable=too-many-return-statements
+        self, opcode: Opcode, pad: int, payload: bytes
+    ) -> bytes | None:
+        """Run a single request on the adapter and encode the result."""
+        gpib = self.__gpib
+        result: Any
+        if opcode == Opcode.WRITE:
+            (timeout,) = TIMEOUT.unpack_from(payload)
+            await gpib.write(pad, payload[TIMEOUT.size :], timeout=_optional_timeout(timeout))
+            return b""
+        if opcode in (Opcode.READ, Opcode.QUERY):
+            delay, timeout, adaptive = READ_ARGUMENTS.unpack_from(payload)
+            if opcode == Opcode.READ:
+                return await gpib.read(pad, delay, adaptive, timeout=_optional_timeout(timeout))
+            return await gpib.query(
+                pad, payload[READ_ARGUMENTS.size :], delay, adaptive, timeout=_optional_timeout(timeout)
+            )
+        if opcode == Opcode.DISCOVER:
+            return bytes(await gpib.get_gpib_devices())
+        if opcode == Opcode.VERSION:
+            return bytes(await gpib.version())
+        if opcode == Opcode.SERIES:
+            result = await gpib.get_series_number()
+            return SERIES.pack(*result)
+        if opcode == Opcode.MANUFACTURER_ID:
+            return (await gpib.get_manufacturer_id()).encode("latin-1")
+        if opcode == Opcode.RESET:
+            await gpib.reset()
+            return b""
+        raise ValueError(f"Invalid opcode: {opcode}.")
+
+    async def __execute_coalesced(self, opcode: Opcode, pad: int, payload: bytes) -> bytes | None:
+        """Run a request, sharing the result with identical requests in flight, if the request has no side effects."""
+        if opcode not in COALESCABLE_OPCODES:
+            return await self.__execute(opcode, pad, payload)
+        in_flight = self.__in_flight.get(opcode)
+        if in_flight is not None:
+            self.requests_coalesced += 1
+            return await asyncio.shield(in_flight)
+        future = asyncio.ensure_future(self.__execute(opcode, pad, payload))
+        self.__in_flight[opcode] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self.__in_flight.get(opcode) is future:
+                del self.__in_flight[opcode]
+
+    async def __answer(
+        self, writer: asyncio.StreamWriter, request_id: int, opcode_value: int, pad: int, payload: bytes
+    ) -> None:
+        """Execute a request and send the response."""
+        status, response = Status.OK, b""
+        try:
+            result = await self.__execute_coalesced(Opcode(opcode_value), pad, payload)
+            if result is None:
+                status = Status.NO_DATA
+            else:
+                response = result
+        except OSError as exc:
+            status = Status.OS_ERROR
+            response = ERROR_NUMBER.pack(exc.errno or 0) + str(exc.strerror or exc).encode()
+        except ValueError as exc:
+            status, response = Status.VALUE_ERROR, str(exc).encode()
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            self.__logger.exception("Error while processing request %d.", request_id)
+            status, response = Status.ERROR, str(exc).encode()
+        self.requests_served += 1
+        if not writer.is_closing():
+            writer.write(RESPONSE_HEADER.pack(request_id, status, len(response)) + response)
+
+    async def __handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Read pipelined requests from a client. Requests are executed in the order they arrive at the adapter."""
+        tasks: set[asyncio.Task[None]] = set()
+        try:
+            while True:
+                header = await reader.readexactly(REQUEST_HEADER.size)
+                request_id, opcode, pad, length = REQUEST_HEADER.unpack(header)
+                payload = await reader.readexactly(length) if length else b""
+                task = asyncio.create_task(self.__answer(writer, request_id, opcode, pad, payload))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                if writer.transport.get_write_buffer_size() > 2**16:
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+
+async def _serve(arguments: argparse.Namespace) -> None:
+    async with AsyncUGPlusGpib(arguments.series, arguments.timeout) as gpib:
+        server = GpibServer(gpib, arguments.socket or default_socket_path(arguments.series))
+        await server.serve_forever()
+
+
+def _parse_arguments(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m ug_gpib.server", description=__doc__.split("\n\n", 1)[0].strip())
+    parser.add_argument("--socket", type=Path, help="The location of the Unix domain socket")
+    parser.add_argument("--series", type=int, default=2654079, help="The series number of the adapter")
+    parser.add_argument("--timeout", type=float, default=1.0, help="The USB timeout in seconds")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Enable debug output")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Run the server until interrupted.
+    Parameters
+    ----------
+    argv: list of str, optional
+        The command line arguments. Defaults to `sys.argv`.
+    """
+    arguments = _parse_arguments(argv)
+    logging.basicConfig(level=logging.DEBUG if arguments.verbose else logging.INFO)
+    try:
+        asyncio.run(_serve(arguments))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
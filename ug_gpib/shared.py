@@ -0,0 +1,207 @@
+"""
+A thread-safe front end for the UGPlus driver. A single worker thread owns the adapter and processes requests from a
+priority queue.
+"""
+
+from __future__ import annotations
+
+import itertools
+import queue
+import sys
+import threading
+from concurrent.futures import Future
+from enum import IntEnum
+from types import TracebackType
+from typing import Any, BinaryIO, Callable, Iterable, TypeVar
+
+from .ug_gpib import UGPlusGpib
+
+if sys.version_info < (3, 11):
+    from typing_extensions import Self
+else:
+    from typing import Self
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    """The priority of a request. Requests with a lower value are processed first."""
+
+    HIGH = 0
+    NORMAL = 10
+    LOW = 20
+
+
+# Queued after all other requests to stop the worker
+_SHUTDOWN_PRIORITY = sys.maxsize
+
+
+class SharedUGPlusGpib:
+    """
+    Share a UGPlus adapter between threads. All requests are executed on a single worker thread in order of their
+    priority, then in the order they were submitted. Every request is atomic, so a query, which is a write followed by a
+    read, cannot be interleaved with requests from other threads.
+    """
+
+    def __init__(self, gpib: UGPlusGpib) -> None:
+        """
+        Create a shared controller. The worker thread is started immediately. The controller takes ownership of the
+        driver, which must not be used directly afterwards.
+        Parameters
+        ----------
+        gpib: UGPlusGpib
+            The driver of the adapter
+        """
+        self.__gpib = gpib
+        self.__queue: queue.PriorityQueue[tuple[int, int, Future[Any] | None, Callable[[UGPlusGpib], Any] | None]]
+        self.__queue = queue.PriorityQueue()
+        self.__sequence = itertools.count()
+        self.__closed = False
+        self.__close_lock = threading.Lock()
+        self.__worker = threading.Thread(target=self.__run, name="ug_gpib-shared", daemon=True)
+        self.__worker.start()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.close()
+
+    def __run(self) -> None:
+        while True:
+            _, _, future, func = self.__queue.get()
+            if future is None or func is None:
+                break
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = func(self.__gpib)
+            except BaseException as exc:  # pylint: disable=broad-exception-caught
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+    @property
+    def pending(self) -> int:
+        """
+        Returns
+        -------
+        int
+            The approximate number of requests waiting to be processed
+        """
+        return self.__queue.qsize()
+
+    def close(self, cancel_pending: bool = False) -> None:
+        """
+        Stop the worker thread.
+        Parameters
+        ----------
+        cancel_pending: bool, default=False
+            Cancel all requests, that have not been started yet, instead of waiting for them to complete
+        """
+        with self.__close_lock:
+            if self.__closed:
+                return
+            self.__closed = True
+        if cancel_pending:
+            try:
+                while True:
+                    _, _, future, _ = self.__queue.get_nowait()
+                    if future is not None:
+                        future.cancel()
+            except queue.Empty:
+                pass
+        self.__queue.put((_SHUTDOWN_PRIORITY, next(self.__sequence), None, None))
+        if threading.current_thread() is not self.__worker:
+            self.__worker.join()
+
+    def submit(self, func: Callable[[UGPlusGpib], T], priority: int = Priority.NORMAL) -> Future[T]:
+        """
+        Run a function on the worker thread. The function is called with the driver as its only argument and may run
+        any sequence of commands without being interrupted by other requests.
+        Parameters
+        ----------
+        func: Callable
+            The function to run
+        priority: int, default=Priority.NORMAL
+            Requests with a lower value are processed first
+        Returns
+        -------
+        Future
+            The result of the function
+        """
+        future: Future[T] = Future()
+        with self.__close_lock:
+            if self.__closed:
+                raise RuntimeError("The shared controller is closed.")
+            self.__queue.put((priority, next(self.__sequence), future, func))
+        return future
+
+    def write(self, pad: int, data: bytes, priority: int = Priority.NORMAL) -> Future[None]:
+        """
+        Write data to the device at pad. See `UGPlusGpib.write()`.
+        """
+        return self.submit(lambda gpib: gpib.write(pad, data), priority)
+
+    def write_stream(
+        self,
+        pad: int,
+        data: Iterable[bytes | bytearray | memoryview] | BinaryIO | bytes | bytearray | memoryview,
+        priority: int = Priority.NORMAL,
+    ) -> Future[int]:
+        """
+        Write a message, that is produced piecewise, to the device at pad. See `UGPlusGpib.write_stream()`.
+        """
+        return self.submit(lambda gpib: gpib.write_stream(pad, data), priority)
+
+    def read(self, pad: int, delay: float = 0, priority: int = Priority.NORMAL) -> Future[bytes | None]:
+        """
+        Read from the device at pad. See `UGPlusGpib.read()`.
+        """
+        return self.submit(lambda gpib: gpib.read(pad, delay), priority)
+
+    def query(self, pad: int, data: bytes, delay: float = 0, priority: int = Priority.NORMAL) -> Future[bytes | None]:
+        """
+        Write data to the device at pad and read back the answer as a single request. See `UGPlusGpib.query()`.
+        """
+        return self.submit(lambda gpib: gpib.query(pad, data, delay), priority)
+
+    def query_many(
+        self, pad: int, commands: Iterable[bytes], priority: int = Priority.NORMAL
+    ) -> Future[list[bytes | None]]:
+        """
+        Send several queries to the device at pad as a single request. See `UGPlusGpib.query_many()`.
+        """
+        return self.submit(lambda gpib: gpib.query_many(pad, commands), priority)
+
+    def get_gpib_devices(self, priority: int = Priority.NORMAL) -> Future[tuple[int, ...]]:
+        """
+        Identify all addresses, that have a GPIB device connected to it. See `UGPlusGpib.get_gpib_devices()`.
+        """
+        return self.submit(lambda gpib: gpib.get_gpib_devices(), priority)
+
+    def get_manufacturer_id(self, priority: int = Priority.NORMAL) -> Future[str]:
+        """
+        Get the manufacturer id of the GPIB adapter. See `UGPlusGpib.get_manufacturer_id()`.
+        """
+        return self.submit(lambda gpib: gpib.get_manufacturer_id(), priority)
+
+    def get_series_number(self, priority: int = Priority.NORMAL) -> Future[tuple[int, int]]:
+        """
+        Query the GPIB controller series number. See `UGPlusGpib.get_series_number()`.
+        """
+        return self.submit(lambda gpib: gpib.get_series_number(), priority)
+
+    def version(self, priority: int = Priority.NORMAL) -> Future[tuple[int, int]]:
+        """
+        Get the GPIB adapter firmware version. See `UGPlusGpib.version()`.
+        """
+        return self.submit(lambda gpib: gpib.version(), priority)
+
+    def reset(self, priority: int = Priority.NORMAL) -> Future[None]:
+        """
+        Reset the controller. See `UGPlusGpib.reset()`.
+        """
+        return self.submit(lambda gpib: gpib.reset(), priority)
@@ -0,0 +1,248 @@
+"""
+Tracks the devices attached to the GPIB bus without scanning the bus on every request.
+"""
+
+from __future__ import annotations
+
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import CancelledError
+from dataclasses import dataclass
+from enum import Enum
+from types import TracebackType
+from typing import Callable
+
+from .shared import Priority, SharedUGPlusGpib
+
+if sys.version_info < (3, 11):
+    from typing_extensions import Self
+else:
+    from typing import Self
+
+
+class TopologyChange(Enum):
+    """The kind of change of the bus topology."""
+
+    ADDED = "added"
+    REMOVED = "removed"
+
+
+@dataclass(frozen=True)
+class TopologyEvent:
+    """A device was added to or removed from the bus."""
+
+    change: TopologyChange
+    pad: int
+    timestamp: float
+
+
+class BusTopology:  # pylint: disable=too-many-instance-attributes
+    """
+    Keeps the set of primary addresses found on the bus. The bus is scanned in the background at a fixed interval
+    using low priority requests, so that the scans do not delay measurements. Additionally, the replies read by other
+    requests are used as evidence: A device, that sends data, is added immediately. If a known device fails to answer
+    several times in a row, a scan is scheduled as soon as the rate limit permits. A single failed read is not enough,
+    because it may also mean, that the device simply had nothing to say.
+    """
+
+    def __init__(
+        self,
+        shared: SharedUGPlusGpib,
+        interval: float = 10,
+        min_interval: float = 1,
+        priority: int = Priority.LOW,
+        failure_threshold: int = 3,
+    ) -> None:
+        """
+        Start tracking the bus topology. The first scan is started immediately.
+        Parameters
+        ----------
+        shared: SharedUGPlusGpib
+            The shared controller used to scan the bus and to observe replies
+        interval: float, default=10
+            The time in seconds between two periodic scans
+        min_interval: float, default=1
+            The minimum time in seconds between two scans, including scans requested by `scan()` or triggered by
+            failed reads
+        priority: int, default=Priority.LOW
+            The priority of the scan requests
+        failure_threshold: int, default=3
+            The number of consecutive failed reads from a known device, that trigger a scan
+        """
+        assert 0 <= min_interval <= interval
+        assert failure_threshold > 0
+        self.__shared = shared
+        self.interval = interval
+        self.min_interval = min_interval
+        self.priority = priority
+        self.failure_threshold = failure_threshold
+        self.__logger = logging.getLogger(__name__)
+        self.__lock = threading.Lock()
+        self.__devices: frozenset[int] = frozenset()
+        self.__subscribers: list[Callable[[TopologyEvent], None]] = []
+        # The number of consecutive failed reads per device
+        self.__failures: dict[int, int] = {}
+        self.__last_scan = float("-inf")
+        self.__next_scan = time.monotonic()
+        self.__wakeup = threading.Event()
+        self.__scanned = threading.Event()
+        self.__closed = False
+        self.scans = 0
+        self.__shared.submit(lambda gpib: gpib.add_read_listener(self.__on_read), priority=Priority.HIGH).result()
+        self.__thread = threading.Thread(target=self.__run, name="ug_gpib-topology", daemon=True)
+        self.__thread.start()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.close()
+
+    @property
+    def devices(self) -> frozenset[int]:
+        """
+        Returns
+        -------
+        frozenset of int
+            The primary addresses of the devices currently known to be attached. This does not access the bus.
+        """
+        return self.__devices
+
+    @property
+    def last_scan(self) -> float:
+        """
+        Returns
+        -------
+        float
+            The time of the last completed scan as returned by `time.monotonic()` or -inf, if there was none yet
+        """
+        return self.__last_scan
+
+    def wait_for_scan(self, timeout: float | None = None) -> bool:
+        """
+        Wait for the first scan to complete.
+        Parameters
+        ----------
+        timeout: float, optional
+            The maximum time to wait in seconds
+
+        Returns
+        -------
+        bool
+            True if a scan was completed
+        """
+        return self.__scanned.wait(timeout)
+
+    def subscribe(self, callback: Callable[[TopologyEvent], None]) -> None:
+        """
+        Register a function, that is called for every device added or removed. The function is called from the thread
+        that detected the change, so it should return quickly.
+        Parameters
+        ----------
+        callback: Callable
+            The function to call with the event
+        """
+        with self.__lock:
+            self.__subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[TopologyEvent], None]) -> None:
+        """
+        Unregister a function previously registered using `subscribe()`.
+        Parameters
+        ----------
+        callback: Callable
+            The function to remove
+        """
+        with self.__lock:
+            self.__subscribers.remove(callback)
+
+    def scan(self) -> None:
+        """Request a scan as soon as the rate limit permits. This does not wait for the scan to complete."""
+        with self.__lock:
+            self.__next_scan = min(self.__next_scan, self.__last_scan + self.min_interval)
+        self.__wakeup.set()
+
+    def close(self) -> None:
+        """Stop the background scans and stop observing replies. The shared controller is not closed."""
+        if self.__closed:
+            return
+        self.__closed = True
+        self.__wakeup.set()
+        self.__thread.join()
+        try:
+            self.__shared.submit(
+                lambda gpib: gpib.remove_read_listener(self.__on_read), priority=Priority.HIGH
+            ).result()
+        except RuntimeError:
+            # The shared controller was closed already
+            pass
+
+    def __update(self, added: frozenset[int], removed: frozenset[int]) -> None:
+        """Apply changes to the topology and notify the subscribers."""
+        with self.__lock:
+            added -= self.__devices
+            removed &= self.__devices
+            if not added and not removed:
+                return
+            self.__devices = (self.__devices | added) - removed
+            subscribers = list(self.__subscribers)
+        timestamp = time.monotonic()
+        events = [TopologyEvent(TopologyChange.ADDED, pad, timestamp) for pad in sorted(added)] + [
+            TopologyEvent(TopologyChange.REMOVED, pad, timestamp) for pad in sorted(removed)
+        ]
+        for event in events:
+            for callback in subscribers:
+                try:
+                    callback(event)
+                except Exception:  # pylint: disable=broad-exception-caught
+                    self.__logger.exception("Error in topology subscriber %(callback)r.", {"callback": callback})
+
+    def __on_read(self, pad: int, success: bool) -> None:
+        """Use the outcome of a read as evidence. Called from the worker thread of the shared controller."""
+        if success:
+            if pad in self.__failures:
+                with self.__lock:
+                    self.__failures.pop(pad, None)
+            if pad not in self.__devices:
+                self.__update(frozenset((pad,)), frozenset())
+        elif pad in self.__devices:
+            with self.__lock:
+                failures = self.__failures.get(pad, 0) + 1
+                if failures < self.failure_threshold:
+                    self.__failures[pad] = failures
+                    return
+                self.__failures.pop(pad, None)
+            self.scan()
+
+    def __run(self) -> None:
+        while not self.__closed:
+            timeout = self.__next_scan - time.monotonic()
+            if timeout > 0:
+                self.__wakeup.wait(timeout)
+                self.__wakeup.clear()
+                continue
+            try:
+                future = self.__shared.get_gpib_devices(priority=self.priority)
+            except RuntimeError:
+                # The shared controller was closed
+                break
+            try:
+                devices = frozenset(future.result())
+            except CancelledError:
+                break
+            except Exception:  # pylint: disable=broad-exception-caught
+                self.__logger.exception("Error while scanning the GPIB bus.")
+            else:
+                self.__update(devices - self.__devices, self.__devices - devices)
+                with self.__lock:
+                    self.__failures.clear()
+                self.scans += 1
+                self.__scanned.set()
+            now = time.monotonic()
+            with self.__lock:
+                self.__last_scan = now
+                self.__next_scan = now + self.interval
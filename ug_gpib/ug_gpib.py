@@ -2,113 +2,824 @@
 A pure Python module for the LQ Electronics Corp UGPlus USB to GPIB Controller using pyUSB.
 """
 
+# pylint: disable=too-many-lines
+
 from __future__ import annotations
 
+import array
+import contextlib
 import errno
+import functools
+import io
 import logging
+import math
+import sys
 import time
-from enum import IntEnum
-from typing import cast
+from collections import deque
+from types import TracebackType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Callable,
+    Generator,
+    Iterable,
+    Iterator,
+    Literal,
+    Sequence,
+    TypeVar,
+    cast,
+)
+
+from .cancellation import CancellationToken
+from .capture import Direction, TransferRecorder, TransferStatus
+from .codec import FLAGS_EOI, MAX_WRITE_DATA, Frame, FrameCodec, FramingError, UgPlusCommands, select_profile
+from .latency import ResponseLatencyScheduler
+from .location_cache import AdapterLocationCache
+from .metrics import Metrics
+from .query_cache import QueryCache
+from .recovery import RecoveryPolicy
+
+if sys.version_info < (3, 11):
+    from typing_extensions import Self
+else:
+    from typing import Self
+
+if TYPE_CHECKING:
+    from usb.core import Device, Endpoint
+
+
+def _is_usb_error(exc: BaseException) -> bool:
+    """
+    Test for a pyUSB error without importing pyUSB. If pyUSB was never imported, the error cannot be a pyUSB error.
+    Parameters
+    ----------
+    exc: BaseException
+        The exception to test
+    Returns
+    -------
+    bool
+        True if the exception is a usb.core.USBError
+    """
+    usb_core = sys.modules.get("usb.core")
+    return usb_core is not None and isinstance(exc, usb_core.USBError)
 
-from usb.core import Endpoint, USBError
 
-from .gpib_helper import get_usb_devices, get_usb_endpoints
+_Method = TypeVar("_Method", bound=Callable[..., Any])
 
 
-class UgPlusCommands(IntEnum):
-    """Internal commands used by the UGPlus"""
+def _recoverable(idempotent: bool) -> Callable[[_Method], _Method]:
+    """
+    Recover the connection, if a method of the driver fails with a USB error. See `RecoveryPolicy`.
+    Parameters
+    ----------
+    idempotent: bool
+        True if the method can be repeated safely after reconnecting
+    Returns
+    -------
+    Callable
+        The decorator
+    """
 
-    GET_FIRMWARE_VERSION = 0x00
-    GET_SERIES = 0x0E
-    RESET = 0x0F
-    WRITE = 0x32
-    READ = 0x33
-    DISCOVER_GPIB_DEVICES = 0x34
-    GET_MANUFACTURER_ID = 0xFE
+    def decorator(method: _Method) -> _Method:
+        @functools.wraps(method)
+        def wrapper(self: UGPlusGpib, *args: Any, **kwargs: Any) -> Any:
+            return self._call_recoverable(method, idempotent, *args, **kwargs)  # pylint: disable=protected-access
 
+        return cast(_Method, wrapper)
 
-class UGPlusGpib:
+    return decorator
+
+
+class UGPlusGpib:  # pylint: disable=too-many-instance-attributes,too-many-public-methods
     """A device driver for the LQ Electronics Corp UGPlus USB to GPIB Controller"""
 
-    def __init__(self, device_series: int = 2654079, timeout: float | None = None) -> None:
+    # Size of the preallocated USB receive buffer. It must hold the largest reply frame (255 bytes plus the firmware
+    # quirks) and at least one additional USB packet.
+    _USB_READ_BUFFER_SIZE = 4096
+    # The number of bytes skipped while searching for a valid reply, before giving up, draining the endpoint and raising
+    # an EPROTO error
+    _RESYNC_MAX_DISCARD = 4096
+    # The USB timeout in ms used when draining the endpoint. Data still pending is already queued by the adapter.
+    _DRAIN_TIMEOUT = 10
+    # Size of the preallocated buffer for outgoing WRITE frames. Long messages are sent in transfers of this size.
+    _USB_WRITE_BUFFER_SIZE = 16384
+    # The number of bytes read from a file at once by `write_stream()`
+    _STREAM_CHUNK_SIZE = 65536
+    # pyUSB uses a timeout of 1000 ms if None is given
+    _PYUSB_DEFAULT_TIMEOUT = 1000
+    # The USB timeout in ms of the short reads used to check the cancellation token
+    _CANCEL_POLL_INTERVAL = 20
+    # The adapter answers every request after at most its GPIB timeout. Replies to aborted calls, that have not arrived
+    # after this time in seconds, are assumed lost.
+    _ORPHAN_REPLY_TIMEOUT = 5.0
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-locals
+        self,
+        device_series: int | None = 2654079,
+        timeout: float | None = None,
+        *,
+        location_cache: AdapterLocationCache | None = None,
+        location: tuple[int, tuple[int, ...]] | None = None,
+        latency_scheduler: ResponseLatencyScheduler | None = None,
+        metrics: Metrics | None = None,
+        devices: Iterable[Device] | None = None,
+        recorder: TransferRecorder | None = None,
+        query_cache: QueryCache | None = None,
+        connect: Literal["eager", "lazy"] = "eager",
+        recovery: RecoveryPolicy | None = None,
+    ) -> None:
         """
         Create a UGPlus device driver object.
         Parameters
         ----------
-        device_series: int, optional
-            The device series number to connect to
+        device_series: int or None, default=2654079
+            The device series number to connect to. If None, connect to the first adapter found. The driver then stays
+            bound to the series number of that adapter.
         timeout: float, optional
             The timeout for running commands in seconds
+        location_cache: AdapterLocationCache, optional
+            If given, the device found at the cached location is tried first and only if this fails, all devices are
+            enumerated. The cache is updated with the location of the adapter found.
+        location: tuple of int and tuple of int, optional
+            Pin the driver to the adapter at a USB location, given as the bus and the port numbers. Only this location
+            is tried and the USB device is looked up again on every (re-)connect, so that the driver survives
+            replugging the adapter into the same port.
+        latency_scheduler: ResponseLatencyScheduler, optional
+            The scheduler used by adaptive reads. A new one is created if not given.
+        metrics: Metrics, optional
+            The object collecting transfer counters and latency histograms. A new one is created if not given.
+        devices: Iterable of usb.core.Device, optional
+            The USB devices to search for the adapter. Defaults to all candidates found by `get_usb_devices()`. This
+            can also be used to connect to emulated devices, see `ug_gpib.emulator`.
+        recorder: TransferRecorder, optional
+            Record all USB transfers, starting with the enumeration. See `ug_gpib.capture`. The recorder can also be
+            attached or detached later using the `recorder` attribute.
+        query_cache: QueryCache, optional
+            The cache for the adapter metadata and the registered instrument queries. A new one is created if not
+            given.
+        connect: {"eager", "lazy"}, default="eager"
+            Connect to the adapter immediately or defer enumerating the USB devices until the first command is sent
+            or `connect()` is called.
+        recovery: RecoveryPolicy, optional
+            Decides how to reconnect after the connection to the adapter was lost and collects the downtime and retry
+            counters. A new one is created if not given.
         """
         self.__timeout = timeout * 1000 if timeout is not None else None
-        self.__firmware_version = None
+        self.__firmware_version: tuple[int, int] | None = None
+        # Encodes and decodes the frames. Replaced when the firmware version is known.
+        self.__codec = FrameCodec()
         self.__logger = logging.getLogger(__name__)
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.recorder = recorder
+        self.query_cache = query_cache if query_cache is not None else QueryCache()
+        self.recovery = recovery if recovery is not None else RecoveryPolicy()
+        # The USB receive buffer is a sliding window over a preallocated bytearray. Valid data is stored in
+        # [__usb_read_start, __usb_read_end).
+        self.__usb_read_buf = bytearray(self._USB_READ_BUFFER_SIZE)
+        self.__usb_read_view = memoryview(self.__usb_read_buf)
+        self.__usb_read_start = 0
+        self.__usb_read_end = 0
+        # pyusb only reads into array.array buffers, so each USB packet is received into this buffer first
+        self.__usb_packet_buf = array.array("B")
+        self.__usb_write_buf = bytearray(self._USB_WRITE_BUFFER_SIZE)
+        self.__usb_write_view = memoryview(self.__usb_write_buf)
+        self.latency_scheduler = latency_scheduler if latency_scheduler is not None else ResponseLatencyScheduler()
+        # The time of the last write to each pad. Adaptive reads measure the response latency from there.
+        self.__last_write_time: dict[int, float] = {}
+        self.__read_request_time = 0.0
+        self.__read_listeners: list[Callable[[int, bool], None]] = []
+        self.read_ep: Endpoint | None
+        self.write_ep: Endpoint | None
+        self.read_ep, self.write_ep = None, None
+        self.__device: Device | None = None
+        self.__device_series = device_series
+        self.__location_cache = location_cache
+        self.__devices = list(devices) if devices is not None else None
+        self.__pinned_location = location
+        # The USB location and firmware version of the adapter last connected. The location is tried first when
+        # reconnecting and the firmware version is not queried again.
+        self.__last_location: tuple[int, tuple[int, ...]] | None = None
+        self.__last_firmware_version: tuple[int, int] | None = None
+        # The time the connection was lost or None while connected
+        self.__connection_lost: float | None = None
+        # Recovery is only done by the outermost call of a recoverable method and not while connecting
+        self.__recovery_suspended = 0
+        self.__write_failed = False
+        # The deadline and the cancellation token of the current call, see `__call_limits()`
+        self.__deadline: float | None = None
+        self.__cancel: CancellationToken | None = None
+        # The commands of replies, that are still expected from aborted calls, and the time they are assumed lost
+        self.__orphaned_replies: deque[tuple[int, float]] = deque()
+
+        if connect == "eager":
+            self.connect()
+        elif connect != "lazy":
+            raise ValueError(f"Invalid connection mode: {connect!r}.")
+
+    def __enter__(self) -> Self:
+        self.connect()
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.close()
+
+    @property
+    def is_connected(self) -> bool:
+        """
+        Returns
+        -------
+        bool
+            True if the driver is connected to an adapter
+        """
+        return self.write_ep is not None
+
+    def connect(self) -> None:
+        """
+        Enumerate the USB devices and connect to the adapter. This is done automatically when the driver is created
+        or, if created with `connect="lazy"`, when the first command is sent. Does nothing if already connected.
+        Raises
+        ------
+        ValueError
+            If the adapter was not found
+        """
+        if self.write_ep is not None:
+            return
+
+        self.__recovery_suspended += 1
+        try:
+            if self.__pinned_location is not None:
+                self.__connect_device_at(self.__device_series, self.__pinned_location, self.__devices)
+            elif self.__last_location is not None and self.__device_series is not None:
+                # Reconnect to the adapter used before without enumerating all devices
+                self.__connect_device_at(self.__device_series, self.__last_location, self.__devices)
+            elif self.__location_cache is not None and self.__device_series is not None:
+                self.__connect_cached_device(self.__device_series, self.__location_cache, self.__devices)
+
+            if self.read_ep is None and self.__pinned_location is None:
+                self.__connect_any_device(self.__device_series, self.__location_cache, self.__devices)
+
+            # No device found
+            if self.read_ep is None:
+                raise ValueError("GPIB Adapter not found.")
+
+            self.__logger.info("Connecting to device %(series)s.", {"series": self.__device_series})
+            if self.__last_firmware_version is not None:
+                # The series number matches, so this is the adapter connected before
+                self.query_cache.put(UgPlusCommands.GET_FIRMWARE_VERSION, self.__last_firmware_version)
+            # Get the firmware version to apply bug fixes on the fly. This command is also safe to run, because
+            # there are no known firmware bugs.
+            self.__firmware_version = self.version()
+            assert self.write_ep is not None
+            self.__codec = FrameCodec(select_profile(self.__firmware_version), self.write_ep.wMaxPacketSize)
+            self.__logger.debug("Using the %(profile)s framing.", {"profile": self.__codec.profile.name})
+        except BaseException:
+            self.__reset_connection()
+            raise
+        finally:
+            self.__recovery_suspended -= 1
+
+        assert self.__device is not None
+        port_numbers = self.__device.port_numbers
+        self.__last_location = (self.__device.bus, tuple(port_numbers)) if port_numbers is not None else None
+        self.__last_firmware_version = self.__firmware_version
+        if self.__connection_lost is not None:
+            downtime = time.monotonic() - self.__connection_lost
+            self.__connection_lost = None
+            self.recovery.record_reconnect(downtime)
+            self.__logger.info("Reconnected to the GPIB adapter after %(downtime).3f s.", {"downtime": downtime})
+
+    def close(self) -> None:
+        """
+        Release the USB device. The driver can be connected again using `connect()`.
+        """
+        device = self.__device
+        self.__reset_connection()
+        if device is not None and "usb.core" in sys.modules:
+            from .gpib_helper import release_usb_device  # pylint: disable=import-outside-toplevel
+
+            release_usb_device(device)
+
+    def __reset_connection(self) -> None:
+        """Forget the device and all state belonging to it."""
+        self.read_ep, self.write_ep = None, None
+        self.__device = None
+        self.__firmware_version = None
+        self.__clear_usb_read_buf()
+        self.__orphaned_replies.clear()
+        self.query_cache.clear()
+
+    def __open_device(self, device: Device) -> int:
+        """
+        Set up the endpoints of a USB device and query its series number.
+        Parameters
+        ----------
+        device: usb.core.Device
+            The device to open
+        Returns
+        -------
+        int
+            The series number of the device
+        """
+        from .gpib_helper import get_usb_endpoints  # pylint: disable=import-outside-toplevel
+
+        self.read_ep, self.write_ep = get_usb_endpoints(device)
+        self.__device = device
+
+        # Initialize usb read buffer
+        self.__usb_packet_buf = array.array("B", bytes(self.read_ep.wMaxPacketSize))
+        # The firmware version is not known yet, but the replies to the commands used to identify the adapter are not
+        # affected by the firmware bugs
+        self.__codec = FrameCodec(packet_size=self.write_ep.wMaxPacketSize)
+        self.__clear_usb_read_buf()
+        # The cached metadata belongs to the previous device
+        self.query_cache.clear()
+
+        # Now query the device, we can safely run this command, because there are no known firmware bugs so far
+        _, series = self.get_series_number()
+        self.__logger.info("Device found: Series number %(series)s.", {"series": series})
+        return series
+
+    def __connect_cached_device(
+        self, device_series: int, location_cache: AdapterLocationCache, devices: list[Device] | None
+    ) -> None:
+        """
+        Try to open the device at the location stored in the cache. Invalidate the cache entry if this fails.
+        """
+        location = location_cache.get(device_series)
+        if location is None:
+            return
+        self.__logger.debug("Trying cached location of device %(series)s.", {"series": device_series})
+        if not self.__connect_device_at(device_series, location, devices):
+            self.__logger.info("Cached location of device %(series)s is outdated.", {"series": device_series})
+            location_cache.invalidate(device_series)
+
+    def __connect_device_at(
+        self, device_series: int | None, location: tuple[int, tuple[int, ...]], devices: list[Device] | None
+    ) -> bool:
+        """
+        Try to open the device at a USB location.
+        Parameters
+        ----------
+        device_series: int or None
+            The series number of the adapter. If None, any adapter is accepted and the driver is bound to its series
+            number.
+        location: tuple of int and tuple of int
+            The bus and the port numbers of the device
+        devices: list of usb.core.Device, optional
+            The devices to search. Defaults to the devices attached to the host.
+        Returns
+        -------
+        bool
+            True if the adapter was opened
+        """
+        bus, port_numbers = location
+        self.__logger.debug(
+            "Trying to open the device at bus %(bus)s, ports %(ports)s.", {"bus": bus, "ports": port_numbers}
+        )
+        if devices is None:
+            from .gpib_helper import get_usb_device_at  # pylint: disable=import-outside-toplevel
+
+            device = get_usb_device_at(bus, port_numbers)
+        else:
+            device = next(
+                (
+                    device
+                    for device in devices
+                    if device.bus == bus
+                    and device.port_numbers is not None
+                    and tuple(device.port_numbers) == port_numbers
+                ),
+                None,
+            )
+        try:
+            if device is not None:
+                series = self.__open_device(device)
+                if device_series is None or series == device_series:
+                    self.__device_series = series
+                    return True
+        except (OSError, ValueError) as exc:
+            self.__logger.debug("Cannot open the device: %(error)s.", {"error": exc})
+        self.__reset_connection()
+        return False
+
+    def __connect_any_device(
+        self, device_series: int | None, location_cache: AdapterLocationCache | None, devices: list[Device] | None
+    ) -> None:
+        """
+        Enumerate all candidate devices and connect to the one matching the series number or, if no series number is
+        given, to the first adapter.
+        """
         # Search for the right GPIB device
         # This is a pain in the b***, because the USB iSerialNumber is always 0x00
         # So we will iterate over all possible PIC18 controllers and query them.
         # Note: this might break other stuff, if devices that match our search criterion
         # do not like to be talked to.
-
         self.__logger.debug("Enumerating GPIB USB devices.")
-        self.read_ep: Endpoint | None
-        self.write_ep: Endpoint | None
-        self.read_ep, self.write_ep = None, None
-        for device in get_usb_devices():
-            self.read_ep, self.write_ep = get_usb_endpoints(device)
+        if devices is None:
+            from .gpib_helper import get_usb_devices  # pylint: disable=import-outside-toplevel
 
-            # Initialize usb read buffer
-            self.__usb_read_buf = bytearray()
+            devices = list(get_usb_devices())
+        for device in devices:
+            series = self.__open_device(device)
+            if device_series is None or series == device_series:
+                self.__device_series = series
+                if location_cache is not None and device.port_numbers is not None:
+                    location_cache.set(series, device.bus, tuple(device.port_numbers))
+                return
 
-            # Now query the device, we can safely run this command, because there are no known firmware bugs so far
-            _, series = self.get_series_number()
-            self.__logger.info("Device found: Series number %(series)s.", {"series": series})
+            self.__reset_connection()
 
-            if series == device_series:
-                self.__logger.info("Connecting to device %(series)s.", {"series": series})
-                # Get the firmware version to apply bug fixes on the fly. This command is also safe to run, because
-                # there are no known firmware bugs.
-                self.__firmware_version = self.version()
-                break
+    def _call_recoverable(self, method: Callable[..., Any], idempotent: bool, *args: Any, **kwargs: Any) -> Any:
+        """
+        Call a method of the driver and recover the connection if it fails with a USB error, see `RecoveryPolicy`.
+        Parameters
+        ----------
+        method: Callable
+            The unbound method to call
+        idempotent: bool
+            True if the method can be repeated safely after reconnecting
+        *args: Any
+            The positional arguments of the method
+        **kwargs: Any
+            The keyword arguments of the method
+        Returns
+        -------
+        Any
+            The return value of the method
+        """
+        if self.__recovery_suspended or not self.recovery.enabled:
+            return method(self, *args, **kwargs)
+        # Reconnecting and retrying must end within the deadline of the call as well
+        with self.__call_limits(kwargs.get("timeout"), kwargs.get("deadline"), kwargs.get("cancel")):
+            return self.__call_retrying(method, idempotent, *args, **kwargs)
 
-            self.read_ep = None
-            self.write_ep = None
+    def __call_retrying(self, method: Callable[..., Any], idempotent: bool, *args: Any, **kwargs: Any) -> Any:
+        """Call a method of the driver, reconnect if it fails and retry it, if it is idempotent."""
+        retries = 0
+        while True:
+            self.__recovery_suspended += 1
+            self.__write_failed = False
+            try:
+                return method(self, *args, **kwargs)
+            except OSError as exc:
+                if self.__last_firmware_version is None or not (
+                    self.__write_failed or (_is_usb_error(exc) and exc.errno != errno.ETIMEDOUT)
+                ):
+                    # Either the adapter was never connected or the connection is still usable
+                    raise
+                self.__recover(exc)
+                if not idempotent or retries >= self.recovery.max_retries:
+                    raise
+                retries += 1
+                self.recovery.retries += 1
+                self.__logger.info(
+                    "Retrying %(method)s after reconnecting (attempt %(retry)d).",
+                    {"method": method.__name__, "retry": retries},
+                )
+            finally:
+                self.__recovery_suspended -= 1
+
+    def __recover(self, error: OSError) -> None:
+        """
+        Release the device and reconnect to the adapter, trying its last USB location first. Reconnecting is repeated
+        with an exponential backoff until the reconnect timeout of the recovery policy or the deadline of the current
+        call has passed, or the call is cancelled.
+        Parameters
+        ----------
+        error: OSError
+            The error, that caused the connection to be lost
+        Raises
+        ------
+        OSError
+            The original error, if reconnecting failed within the reconnect timeout. The driver is left disconnected.
+        TimeoutError
+            If the deadline of the current call passed before the driver could reconnect
+        OperationCancelled
+            If the current call was cancelled before the driver could reconnect
+        """
+        policy = self.recovery
+        policy.record_error(error)
+        self.__logger.warning("Connection to the GPIB adapter lost: %(error)s. Reconnecting.", {"error": error})
+        if self.__connection_lost is None:
+            self.__connection_lost = time.monotonic()
+        deadline = time.monotonic() + policy.reconnect_timeout
+        call_limited = self.__deadline is not None and self.__deadline < deadline
+        if call_limited:
+            deadline = cast(float, self.__deadline)
+        try:
+            self.close()
+        except OSError as exc:
+            # pyUSB may fail to release the interfaces of a device, that is gone. The driver is disconnected anyway.
+            self.__logger.debug("Cannot release the USB device: %(error)s.", {"error": exc})
+        for delay in policy.backoff():
+            if self.__cancel is not None:
+                self.__cancel.raise_if_cancelled()
+            try:
+                self.connect()
+                return
+            except (OSError, ValueError) as exc:
+                policy.failed_reconnects += 1
+                self.__logger.debug("Reconnecting failed: %(error)s.", {"error": exc})
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    if call_limited:
+                        self.__logger.info("Stopped reconnecting to the GPIB adapter, the deadline of the call passed.")
+                        raise TimeoutError(errno.ETIMEDOUT, "The deadline of the call has passed.") from error
+                    self.__logger.error(
+                        "Cannot reconnect to the GPIB adapter within %(timeout)s s.",
+                        {"timeout": policy.reconnect_timeout},
+                    )
+                    raise error from exc
+            self.__sleep(min(delay, remaining))
 
-        # No device found
+    def __clear_usb_read_buf(self) -> None:
+        """Discard all bytes in the USB receive buffer."""
+        self.__usb_read_start = 0
+        self.__usb_read_end = 0
+
+    def __compact_usb_read_buf(self) -> None:
+        """Move the bytes not consumed yet to the front of the receive buffer."""
+        pending = self.__usb_read_end - self.__usb_read_start
+        self.__usb_read_view[0:pending] = self.__usb_read_view[self.__usb_read_start : self.__usb_read_end]
+        self.__usb_read_start = 0
+        self.__usb_read_end = pending
+
+    def __fill_usb_read_buf(self, timeout: int | None = None) -> None:
+        """
+        Read a single USB packet from the endpoint and append it to the receive buffer. The buffer is compacted first
+        if there is not enough space left at its end.
+        Parameters
+        ----------
+        timeout: int, optional
+            The USB timeout in ms. Defaults to the timeout of the driver or to the time left until the deadline of the
+            current call. Timeouts are only counted in the metrics, if the default is used.
+        Raises
+        ------
+        TimeoutError
+            If the deadline of the current call has passed. A USB timeout is raised as usb.core.USBError.
+        OperationCancelled
+            If the current call was cancelled
+        OSError
+            With errno EPROTO, if the receive buffer is full of data, that does not form a frame
+        """
         if self.read_ep is None:
-            raise ValueError("GPIB Adapter not found.")
+            self.connect()
+        packet_size = len(self.__usb_packet_buf)
+        if self.__usb_read_end + packet_size > len(self.__usb_read_buf):
+            # This is rare and only copies the few bytes of the current frame, that have not been consumed yet
+            self.__compact_usb_read_buf()
+            if self.__usb_read_end + packet_size > len(self.__usb_read_buf):
+                self.__clear_usb_read_buf()
+                raise OSError(errno.EPROTO, "The USB receive buffer overflowed without a valid reply.")
 
-    def _usb_read(self, length: int = 1) -> bytes:
+        if self.__logger.isEnabledFor(logging.DEBUG):
+            self.__logger.debug("Reading %(no_bytes)s bytes from USB device.", {"no_bytes": packet_size})
+        try:
+            bytes_read = self.__read_usb_packet(timeout)
+        except OSError as exc:
+            if exc.errno == errno.ETIMEDOUT and timeout is None:
+                self.metrics.timeouts += 1
+            if self.recorder is not None and _is_usb_error(exc):
+                self.recorder.record(
+                    Direction.IN, b"", TransferStatus.TIMEOUT if exc.errno == errno.ETIMEDOUT else TransferStatus.ERROR
+                )
+            raise
+        if self.recorder is not None:
+            self.recorder.record(Direction.IN, memoryview(self.__usb_packet_buf)[:bytes_read])
+        self.metrics.transfers_in += 1
+        self.metrics.bytes_in += bytes_read
+        end = self.__usb_read_end + bytes_read
+        self.__usb_read_view[self.__usb_read_end : end] = memoryview(self.__usb_packet_buf)[:bytes_read]
+        self.__usb_read_end = end
+
+    def __read_usb_packet(self, timeout: int | None) -> int:
         """
-        Read bytes from USB endpoint.
+        Read a single USB transfer into the packet buffer. If the current call has a deadline or a cancellation
+        token, the transfer is split into short reads, so that the deadline and the token are checked in between.
         Parameters
         ----------
-        length: int
-            The number of bytes to read
+        timeout: int or None
+            The USB timeout in ms or None for the default, see `__fill_usb_read_buf()`
         Returns
         -------
-        bytes
-            The bytes read
+        int
+            The number of bytes read
         """
         assert self.read_ep is not None
-        # Read USB in 64 byte chunks, store bytes until empty, then read again
-        self.__logger.debug(
-            "Trying to read %(length)s bytes from adapter. Number of bytes in buffer. %(size_of_buffer)s.",
-            {"length": length, "size_of_buffer": len(self.__usb_read_buf)},
-        )
-        while len(self.__usb_read_buf) < length:
-            bytes_to_read = self.read_ep.wMaxPacketSize
-            self.__logger.debug("Reading %(no_bytes)s bytes from USB device.", {"no_bytes": bytes_to_read})
-            self.__usb_read_buf += self.read_ep.read(size_or_buffer=bytes_to_read, timeout=self.__timeout)
+        deadline, cancel = self.__deadline, self.__cancel
+        if deadline is None and cancel is None:
+            return self.read_ep.read(
+                size_or_buffer=self.__usb_packet_buf, timeout=self.__timeout if timeout is None else timeout
+            )
+        # The deadline of the call replaces the timeout of the driver. An explicit timeout is converted into a
+        # deadline, so that it is kept across the short reads.
+        call_limited = deadline is not None
+        if timeout is not None or deadline is None:
+            usb_timeout = timeout if timeout is not None else self.__timeout
+            transfer_deadline = (
+                time.monotonic() + (usb_timeout if usb_timeout is not None else self._PYUSB_DEFAULT_TIMEOUT) / 1000
+            )
+            if deadline is None or transfer_deadline < deadline:
+                deadline, call_limited = transfer_deadline, False
+        while True:
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            remaining = math.ceil((deadline - time.monotonic()) * 1000)
+            if remaining <= 0 and call_limited:
+                raise TimeoutError(errno.ETIMEDOUT, "The deadline of the call has passed.")
+            # A timeout of 0 means forever
+            remaining = max(remaining, 1)
+            slice_timeout = min(remaining, self._CANCEL_POLL_INTERVAL) if cancel is not None else remaining
+            try:
+                return self.read_ep.read(size_or_buffer=self.__usb_packet_buf, timeout=slice_timeout)
+            except OSError as exc:
+                if exc.errno != errno.ETIMEDOUT:
+                    raise
+                if slice_timeout < remaining:
+                    # Only the short read has timed out
+                    continue
+                if call_limited:
+                    # The adapter may still send the reply, so this is not a USB timeout
+                    raise TimeoutError(errno.ETIMEDOUT, "The deadline of the call has passed.") from exc
+                raise
 
-        self.__logger.debug(
-            "USB read buffer: %(buffer)s, size: %(size_of_buffer)s.",
-            {"buffer": self.__usb_read_buf, "size_of_buffer": len(self.__usb_read_buf)},
+    def __check_call_limits(self) -> None:
+        """
+        Raises
+        ------
+        TimeoutError
+            If the deadline of the current call has passed
+        OperationCancelled
+            If the current call was cancelled
+        """
+        if self.__cancel is not None:
+            self.__cancel.raise_if_cancelled()
+        if self.__deadline is not None and time.monotonic() >= self.__deadline:
+            raise TimeoutError(errno.ETIMEDOUT, "The deadline of the call has passed.")
+
+    def __sleep(self, seconds: float) -> None:
+        """Sleep, but return early, if the current call is cancelled."""
+        if self.__cancel is None:
+            time.sleep(seconds)
+            return
+        self.__cancel.wait(seconds)
+        self.__cancel.raise_if_cancelled()
+
+    @contextlib.contextmanager
+    def __call_limits(
+        self, timeout: float | None, deadline: float | None, cancel: CancellationToken | None
+    ) -> Iterator[None]:
+        """
+        Set the deadline and the cancellation token of a call. Nested calls keep the earlier deadline and the token of
+        the outer call, unless they are given their own token.
+        Parameters
+        ----------
+        timeout: float or None
+            The time in seconds the call may take
+        deadline: float or None
+            The time of `time.monotonic()`, when the call must be finished
+        cancel: CancellationToken or None
+            The token to abort the call
+        """
+        previous_deadline, previous_cancel = self.__deadline, self.__cancel
+        if timeout is not None:
+            deadline = min(deadline, time.monotonic() + timeout) if deadline is not None else time.monotonic() + timeout
+        if previous_deadline is not None:
+            deadline = min(deadline, previous_deadline) if deadline is not None else previous_deadline
+        self.__deadline = deadline
+        self.__cancel = cancel if cancel is not None else previous_cancel
+        try:
+            yield
+        finally:
+            self.__deadline, self.__cancel = previous_deadline, previous_cancel
+
+    def __orphan_reply(self, command: UgPlusCommands) -> None:
+        """
+        Remember, that the reply to a command was abandoned, because the call ran out of time or was cancelled. The
+        adapter still sends the reply, so it is skipped by the next call instead of being taken for its reply.
+        """
+        self.__logger.debug("Abandoning the reply to command %(command)r.", {"command": command})
+        self.__orphaned_replies.append((command, time.monotonic() + self._ORPHAN_REPLY_TIMEOUT))
+
+    def __is_orphaned_reply(self, command: int) -> bool:
+        """Test whether a reply with this command belongs to an aborted call."""
+        orphans = self.__orphaned_replies
+        now = time.monotonic()
+        while orphans and orphans[0][1] < now:
+            self.__logger.warning("The reply to an aborted command %(command)r was lost.", {"command": orphans[0][0]})
+            orphans.popleft()
+        return bool(orphans) and orphans[0][0] == command
+
+    def drain(self) -> int:
+        """
+        Discard the receive buffer and all data pending on the USB endpoint, for example stale replies to requests,
+        that timed out.
+        Returns
+        -------
+        int
+            The number of bytes discarded
+        """
+        discarded = self.__usb_read_end - self.__usb_read_start
+        self.__clear_usb_read_buf()
+        if self.read_ep is not None:
+            while True:
+                try:
+                    self.__fill_usb_read_buf(self._DRAIN_TIMEOUT)
+                except OSError as exc:
+                    if exc.errno == errno.ETIMEDOUT:
+                        break
+                    raise
+                discarded += self.__usb_read_end - self.__usb_read_start
+                self.__clear_usb_read_buf()
+        self.metrics.discarded_bytes += discarded
+        return discarded
+
+    def __is_confirmed_frame(self) -> bool:
+        """
+        Test whether the candidate frame at the start of the receive buffer is complete and followed by another
+        complete frame. Pipelined replies arrive back to back, so the candidate cannot be validated by waiting for the
+        endpoint to fall silent.
+        """
+        try:
+            frame = self.__codec.decode(self.__usb_read_buf, self.__usb_read_start, self.__usb_read_end)
+            return frame is not None and (
+                self.__codec.decode(self.__usb_read_buf, frame.end, self.__usb_read_end) is not None
+            )
+        except FramingError:
+            return False
+
+    def __resynchronize(self, command: UgPlusCommands) -> bool:
+        """
+        Skip the bytes in front of the next plausible reply frame to a command. Data is read from the endpoint, until
+        a frame is found or the USB read times out. A candidate is accepted as soon as it is followed by another frame,
+        so that pipelined replies are taken out of the buffer one by one instead of piling up.
+        Parameters
+        ----------
+        command: UgPlusCommands
+            The command of the reply
+        Returns
+        -------
+        bool
+            True if the receive buffer now starts with a frame header, False if the USB read timed out without a
+            valid reply. The endpoint is drained in that case.
+        Raises
+        ------
+        OSError
+            With errno EPROTO, if `_RESYNC_MAX_DISCARD` bytes have been skipped without finding a reply. The endpoint
+            is drained first.
+        """
+        discarded = 1  # The invalid header byte has been consumed already
+        # The number of bytes at the start of the buffer, that belong to a rejected candidate
+        offset = 0
+        while discarded < self._RESYNC_MAX_DISCARD:
+            candidate = self.__codec.find_frame(
+                self.__usb_read_buf, command, self.__usb_read_start + offset, self.__usb_read_end
+            )
+            offset = 0
+            if candidate is None:
+                discarded += self.__usb_read_end - self.__usb_read_start
+                self.__clear_usb_read_buf()
+            else:
+                discarded += candidate[0] - self.__usb_read_start
+                self.__usb_read_start = candidate[0]
+                if self.__is_confirmed_frame():
+                    self.__log_resynchronized(discarded)
+                    return True
+            # Only the candidate is kept, so the buffer never fills up
+            self.__compact_usb_read_buf()
+            try:
+                # Frames are sent as a whole, so a candidate is validated once no more data arrives within a short
+                # timeout. Otherwise, wait for the reply as usual.
+                self.__fill_usb_read_buf(None if candidate is None else self._DRAIN_TIMEOUT)
+            except OSError as exc:
+                if exc.errno != errno.ETIMEDOUT or not _is_usb_error(exc):
+                    raise
+                if candidate is None:
+                    break
+                if candidate[1]:
+                    self.__log_resynchronized(discarded)
+                    return True
+                # The candidate is incomplete and no more data arrives, so it is not a frame
+                offset = 1
+        exhausted = discarded >= self._RESYNC_MAX_DISCARD
+        self.metrics.discarded_bytes += discarded
+        discarded += self.drain()
+        self.__logger.error(
+            "No valid reply to command %(command)r found. Discarded %(discarded)d bytes.",
+            {"command": command, "discarded": discarded},
         )
-        # Retrieve the requested number of bytes, then remove them from the buffer
-        data = bytes(self.__usb_read_buf[0:length])
-        del self.__usb_read_buf[0:length]
+        if exhausted:
+            raise OSError(errno.EPROTO, f"No valid reply to command {command!r} found in {discarded} bytes.")
+        return False
 
-        return data
+    def __log_resynchronized(self, discarded: int) -> None:
+        self.metrics.discarded_bytes += discarded
+        self.__logger.warning(
+            "Discarded %(discarded)d bytes to resynchronize to the reply stream.", {"discarded": discarded}
+        )
 
     def __device_write(self, command: UgPlusCommands, data: bytes | None = None) -> None:
         """
@@ -121,17 +832,45 @@ class UGPlusGpib:
             The data to send along with the command. This is optional.
         """
         assert isinstance(command, UgPlusCommands)
-        assert self.write_ep is not None
-        if data is None:
-            data = b""
+        if self.write_ep is None:
+            self.connect()
         # Prepare packet for writing (add GPIB address and the size of the final packet)
-        packet = [command, len(data) + 2]
-
-        packet.extend(data)
-        self.__logger.debug("Package sent to adapter: %(data)s.", {"data": packet})
+        packet = self.__codec.encode(command, data or b"")
+        if self.__logger.isEnabledFor(logging.DEBUG):
+            self.__logger.debug("Package sent to adapter: %(data)s.", {"data": list(packet)})
 
         # Send packet via usb
-        self.write_ep.write(packet, self.__timeout)
+        self.__usb_write(packet)
+
+    def __usb_write(self, data: bytes | bytearray | memoryview | list[int]) -> None:
+        """
+        Send data to the USB endpoint in a single transfer. The deadline of the current call replaces the timeout of
+        the driver, like for reads.
+        Parameters
+        ----------
+        data: bytes or bytearray or memoryview or list of int
+            The data to send
+        """
+        assert self.write_ep is not None
+        timeout = self.__timeout
+        if self.__deadline is not None:
+            # A timeout of 0 means forever
+            timeout = max(math.ceil((self.__deadline - time.monotonic()) * 1000), 1)
+        try:
+            self.write_ep.write(data, timeout)
+        except OSError as exc:
+            self.__write_failed = True
+            if exc.errno == errno.ETIMEDOUT:
+                self.metrics.timeouts += 1
+            if self.recorder is not None:
+                self.recorder.record(
+                    Direction.OUT, b"", TransferStatus.TIMEOUT if exc.errno == errno.ETIMEDOUT else TransferStatus.ERROR
+                )
+            raise
+        if self.recorder is not None:
+            self.recorder.record(Direction.OUT, bytes(data))
+        self.metrics.transfers_out += 1
+        self.metrics.bytes_out += len(data)
 
     def __device_read(self, command_expected: UgPlusCommands) -> bytes | None:
         """
@@ -146,75 +885,89 @@ class UGPlusGpib:
         bytes or None:
             Either return the bytes read or None, if there was an error.
         """
-        assert isinstance(command_expected, UgPlusCommands)
-        # Read a single byte to see if a valid command has been received
-        command = self._usb_read()[0]
         try:
-            command = UgPlusCommands(command)
-        except ValueError:
-            # We will handle that later
-            pass
-
-        if command != command_expected:
-            self.__logger.error(
-                "Command '%(command)s' does not match expected command '%(expected_command)r.\nBytestream received.",
-                {"command": command, "expected_command": command_expected},
-            )
+            frame = self.__receive_frame(command_expected)
+        except OSError as exc:
+            if exc.errno in (errno.ETIMEDOUT, errno.ECANCELED) and not _is_usb_error(exc):
+                # The call was aborted, but the adapter still sends the reply
+                self.__orphan_reply(command_expected)
+            raise
+        if frame is None:
             return None
+        start = self.__usb_read_start
 
-        self.__logger.debug("Got reply to command %(command)s.", {"command": command})
-
-        # Valid command, read next byte to determine length of command
-        length = self._usb_read()[0]
-        self.__logger.debug("Size of reply: %(length)s.", {"length": length})
-
-        # Handle firmware quirks
-        # **********************
-        if self.__firmware_version == (1, 0):
-            if command == UgPlusCommands.GET_MANUFACTURER_ID:
-                # BUG: The GET_MANUFACTURER_ID command returns an extra byte in UGPlus Firmware 1.0, possibly
-                # an out-of-bounds read!
-                self.__logger.debug(
-                    "Patching bug in GET_MANUFACTURER_ID command."
-                    " Increasing length of packet from %(length)s to %(new_length)s bytes.",
-                    {"length": length, "new_length": length + 1},
-                )
-                length += 1
-            elif command == UgPlusCommands.DISCOVER_GPIB_DEVICES:
-                # BUG: The DISCOVER_GPIB_DEVICES command returns an extra byte in UGPlus Firmware 1.0, possibly an
-                # out-of-bounds read!
-                self.__logger.debug(
-                    "Patching bug in DISCOVER_GPIB_DEVICES command."
-                    " Increasing length of packet from %(length)s to %(new_length)s bytes.",
-                    {"length": length, "new_length": length + 1},
-                )
-                length += 1
-            elif command == UgPlusCommands.READ:
-                # BUG: The READ command returns 2 more bytes if the read returns an empty string. This is an error code
-                # (1st byte is either 0x01 or 0x0A) and likely an out-of-bounds read.
-                # The last of the bytes depends on the previous payload! It is the same as the third byte of the
-                # previous payload.
-                if length < 5:
-                    # Note: if length == 3, there is no device connected. if length == 4, there is nothing to read.
-                    # Probably...
-                    self.__logger.debug(
-                        "Patching bug in READ command."
-                        " Increasing length of packet from %(length)s to %(new_length)s bytes.",
-                        {"length": length, "new_length": 5},
-                    )
-                    length = 5
-        # **********************
+        self.__usb_read_start = frame.end
+        if frame.end == self.__usb_read_end:
+            # The buffer is empty, rewind it to avoid compacting it later
+            self.__clear_usb_read_buf()
 
-        # Read the rest of the byte_data, the command and packet length field are included the length (hence -2)
-        byte_data = self._usb_read(length - 2)
+        if self.__logger.isEnabledFor(logging.DEBUG):
+            self.__logger.debug(
+                "Received packet:\n  Header:\n    Command: %(command)r\n    Length %(length)d\n  Payload:"
+                "\n    %(payload)s.",
+                {
+                    "command": command_expected,
+                    "length": self.__usb_read_buf[start + 1],
+                    "payload": [hex(i) for i in frame.payload],
+                },
+            )
 
-        self.__logger.debug(
-            "Received packet:\n  Header:\n    Command: %(command)r\n    Length %(length)d\n  Payload:"
-            "\n    %(payload)s.",
-            {"command": command, "length": length, "payload": [hex(i) for i in byte_data]},
-        )
+        return frame.payload
 
-        return byte_data
+    def __receive_frame(self, command_expected: UgPlusCommands) -> Frame | None:
+        """
+        Read the next reply frame to a command from the receive buffer and the endpoint. The frame is not consumed.
+        Replies to aborted calls are skipped.
+        Parameters
+        ----------
+        command_expected: UgPlusCommands
+            The command we expect to read
+
+        Returns
+        -------
+        Frame or None:
+            The frame at the start of the receive buffer or None, if no valid reply was found.
+        """
+        buffer = self.__usb_read_buf
+        while True:
+            start = self.__usb_read_start
+            try:
+                if start < self.__usb_read_end:
+                    orphaned = self.__orphaned_replies and self.__is_orphaned_reply(buffer[start])
+                    if not orphaned and buffer[start] != command_expected:
+                        raise FramingError(f"Unexpected command {buffer[start]:#04x}.")
+                    frame = self.__codec.decode(buffer, start, self.__usb_read_end)
+                    if frame is not None:
+                        if not orphaned:
+                            return frame
+                        self.__orphaned_replies.popleft()
+                        self.__logger.debug(
+                            "Skipping the reply to an aborted command %(command)r.", {"command": frame.command}
+                        )
+                        self.metrics.discarded_bytes += frame.end - start
+                        self.__usb_read_start = frame.end
+                        continue
+                try:
+                    self.__fill_usb_read_buf()
+                except OSError as exc:
+                    if (
+                        exc.errno != errno.ETIMEDOUT
+                        or not _is_usb_error(exc)
+                        or self.__usb_read_start == self.__usb_read_end
+                    ):
+                        raise
+                    # Frames are sent as a whole, so a frame, that is not completed in time, is garbage
+                    raise FramingError("Incomplete frame.") from exc
+            except FramingError as exc:
+                self.metrics.framing_errors += 1
+                self.__logger.warning(
+                    "Invalid reply to command %(expected_command)r: %(error)s",
+                    {"expected_command": command_expected, "error": exc},
+                )
+                # Skip the invalid header byte
+                self.__usb_read_start += 1
+                if not self.__resynchronize(command_expected):
+                    return None
 
     def _device_query(self, command: UgPlusCommands) -> bytes | None:
         """
@@ -228,9 +981,13 @@ class UGPlusGpib:
         bytes or None:
             Either return the bytes read or None, if there was an error.
         """
+        start = time.monotonic()
         self.__device_write(command)
-        return self.__device_read(command)
+        byte_data = self.__device_read(command)
+        self.metrics.record_command(command, time.monotonic() - start)
+        return byte_data
 
+    @_recoverable(idempotent=True)
     def get_manufacturer_id(self) -> str:
         """
         Get the manufacturer id of the GPIB adapter.
@@ -239,15 +996,17 @@ class UGPlusGpib:
         str
             The manufacturer id
         """
+        manufacturer_id = self.query_cache.get(UgPlusCommands.GET_MANUFACTURER_ID)
+        if manufacturer_id is not None:
+            return manufacturer_id
         byte_data = self._device_query(UgPlusCommands.GET_MANUFACTURER_ID)
         if byte_data is None:
             raise ValueError("No reply received from GPIB adapter.")
-        if self.__firmware_version == (1, 0):
-            # BUG: strip the last byte
-            byte_data = byte_data[:-1]
-
-        return "".join([chr(x) for x in byte_data])
+        manufacturer_id = "".join([chr(x) for x in byte_data])
+        self.query_cache.put(UgPlusCommands.GET_MANUFACTURER_ID, manufacturer_id)
+        return manufacturer_id
 
+    @_recoverable(idempotent=True)
     def get_series_number(self) -> tuple[int, int]:
         """
         Query the GPIB controller series number(?). It does not seem to have a serial number.
@@ -256,13 +1015,19 @@ class UGPlusGpib:
         tuple of int
             An integer that is the model number and an integer for the series number
         """
+        series_number = self.query_cache.get(UgPlusCommands.GET_SERIES)
+        if series_number is not None:
+            return series_number
         byte_data = self._device_query(UgPlusCommands.GET_SERIES)
         if byte_data is None:
             raise ValueError("No reply received from GPIB adapter.")
         model, *series = byte_data
 
-        return int(model), int.from_bytes(series, byteorder="big")
+        series_number = int(model), int.from_bytes(series, byteorder="big")
+        self.query_cache.put(UgPlusCommands.GET_SERIES, series_number)
+        return series_number
 
+    @_recoverable(idempotent=True)
     def version(self) -> tuple[int, int]:
         """
         Get the GPIB adapter firmware version
@@ -271,89 +1036,292 @@ class UGPlusGpib:
         tuple of int
             The major and minor firmware revision
         """
+        result = self.query_cache.get(UgPlusCommands.GET_FIRMWARE_VERSION)
+        if result is not None:
+            return result
         byte_data = self._device_query(UgPlusCommands.GET_FIRMWARE_VERSION)
         if byte_data is None:
             raise ValueError("No reply received from GPIB adapter.")
         result = tuple(byte_data)
         assert len(result) == 2
         result = cast(tuple[int, int], result)
+        self.query_cache.put(UgPlusCommands.GET_FIRMWARE_VERSION, result)
         return result
 
-    def get_gpib_devices(self) -> tuple[int, ...]:
+    @_recoverable(idempotent=True)
+    def get_gpib_devices(
+        self,
+        *,
+        timeout: float | None = None,
+        deadline: float | None = None,
+        cancel: CancellationToken | None = None,
+    ) -> tuple[int, ...]:
         """
         Try to identify all addresses, that have a GPIB device connected to it
+        Parameters
+        ----------
+        timeout: float, optional
+            The time in seconds the call may take. It replaces the timeout of the driver for this call.
+        deadline: float, optional
+            The time of `time.monotonic()`, when the call must be finished. If a timeout is given as well, the
+            earlier of both applies.
+        cancel: CancellationToken, optional
+            A token to abort the call from another thread
         Returns
         -------
         tuple of int
             The primary addresses of the GPIB devices discovered
+        Raises
+        ------
+        TimeoutError
+            If the deadline has passed
+        OperationCancelled
+            If the call was cancelled
         """
-        # Not sure what the last byte is for, maybe another out of bounds read
-        # Zero devices 0x0A
-        # One device  0x1E
-        # Two devices 0x7F
-        # Stripping for now
-        byte_data = self._device_query(UgPlusCommands.DISCOVER_GPIB_DEVICES)
+        # The unknown last byte of the reply and the firmware bugs are stripped by the codec
+        with self.__call_limits(timeout, deadline, cancel):
+            byte_data = self._device_query(UgPlusCommands.DISCOVER_GPIB_DEVICES)
         if byte_data is None:
             raise ValueError("No reply received from GPIB adapter.")
-        devices = byte_data[:-1]
-
-        # Handle firmware quirks
-        # **********************
-        if self.__firmware_version == (1, 0):
-            devices = devices[:-1]
-        return tuple(devices)
+        return tuple(byte_data)
 
+    @_recoverable(idempotent=False)
     def reset(self):
-        """Reset the controller."""
+        """Reset the controller. This also clears the query cache."""
         self.__logger.info("Resetting GPIB adapter.")
+        self.query_cache.clear()
         self.__device_write(UgPlusCommands.RESET)
 
-    def write(self, pad: int, data: bytes) -> None:
+    def __send_message(self, pad: int, chunks: Iterable[bytes | bytearray | memoryview]) -> int:
         """
-        Write data to the device at pad.
+        Send a message to the device at pad. The message is split into WRITE frames, which are built in the
+        preallocated write buffer and sent in as few USB transfers as possible. EOI is only asserted with the last
+        frame, the other frames use the experimental `FLAGS_NO_EOI` and are padded to the USB packet size. The last
+        frame is never padded, so a message, that fits into a single frame, is sent exactly like `write()` does.
         Parameters
         ----------
         pad: int
             The primary address of the device
-        data: bytes
-            The data to send to the device.
+        chunks: Iterable of bytes-like objects
+            The parts of the message. They do not need to be aligned to the frames.
         Returns
         -------
-
+        int
+            The number of bytes sent to the device
+        Raises
+        ------
+        TimeoutError
+            If the deadline of the current call passes before all transfers were sent. The message is then
+            incomplete.
+        OperationCancelled
+            If the current call was cancelled before all transfers were sent
         """
-        payload = bytes([pad, 0x0F]) + data
+        if self.write_ep is None:
+            self.connect()
+        codec = self.__codec
+        buffer = self.__usb_write_buf
+        # Send the buffer, when the next frame might not fit
+        limit = len(buffer) - codec.aligned_size(MAX_WRITE_DATA + 4)
+        position = 0
+        total = 0
+        # The last frame is only known, when the message ends, so the tail of the data is held back
+        tail = bytearray()
+        for chunk in chunks:
+            data = memoryview(chunk).cast("B")
+            total += len(data)
+            if tail:
+                missing = MAX_WRITE_DATA - len(tail)
+                tail += data[:missing]
+                data = data[missing:]
+                if not data:
+                    continue
+                if position > limit:
+                    self.__check_call_limits()
+                    self.__usb_write(self.__usb_write_view[:position])
+                    position = 0
+                position = codec.pack_write(buffer, position, pad, tail, eoi=False)
+                tail.clear()
+            # Hold back at least one byte, so that the message always ends with a frame from the tail
+            frames = (len(data) - 1) // MAX_WRITE_DATA
+            for start in range(0, frames * MAX_WRITE_DATA, MAX_WRITE_DATA):
+                if position > limit:
+                    self.__check_call_limits()
+                    self.__usb_write(self.__usb_write_view[:position])
+                    position = 0
+                position = codec.pack_write(buffer, position, pad, data[start : start + MAX_WRITE_DATA], eoi=False)
+            tail += data[frames * MAX_WRITE_DATA :]
+        if position > limit:
+            self.__check_call_limits()
+            self.__usb_write(self.__usb_write_view[:position])
+            position = 0
+        position = codec.pack_write(buffer, position, pad, tail, eoi=True, aligned=False)
+        if self.__logger.isEnabledFor(logging.DEBUG):
+            self.__logger.debug(
+                "Sending %(length)d bytes to GPIB device at address %(pad)d.", {"length": total, "pad": pad}
+            )
+        self.__check_call_limits()
+        self.__usb_write(self.__usb_write_view[:position])
+        return total
 
-        # Send write command (no return)
-        self.__device_write(UgPlusCommands.WRITE, payload)
+    @_recoverable(idempotent=False)
+    def write(
+        self,
+        pad: int,
+        data: bytes | bytearray | memoryview,
+        *,
+        timeout: float | None = None,
+        deadline: float | None = None,
+        cancel: CancellationToken | None = None,
+    ) -> None:
+        """
+        Write data to the device at pad. Data of up to 251 bytes is sent in a single frame with EOI asserted with the
+        last byte. Longer data is split into several frames like `write_stream()` does, which is experimental.
+        Parameters
+        ----------
+        pad: int
+            The primary address of the device
+        data: bytes or bytearray or memoryview
+            The data to send to the device.
+        timeout: float, optional
+            The time in seconds the call may take. It replaces the timeout of the driver for this call.
+        deadline: float, optional
+            The time of `time.monotonic()`, when the call must be finished. If a timeout is given as well, the
+            earlier of both applies.
+        cancel: CancellationToken, optional
+            A token to abort the call from another thread
+        Raises
+        ------
+        TimeoutError
+            If the deadline has passed. It is checked before each USB transfer, a transfer is never interrupted.
+        OperationCancelled
+            If the call was cancelled
+        """
+        start = time.monotonic()
+        with self.__call_limits(timeout, deadline, cancel):
+            self.__send_message(pad, (data,))
+        self.__last_write_time[pad] = now = time.monotonic()
+        self.metrics.record_command(UgPlusCommands.WRITE, now - start)
 
-    def read(self, pad: int, delay: float = 0) -> bytes | None:
+    @_recoverable(idempotent=False)
+    def write_stream(
+        self,
+        pad: int,
+        data: Iterable[bytes | bytearray | memoryview] | BinaryIO | bytes | bytearray | memoryview,
+        *,
+        timeout: float | None = None,
+        deadline: float | None = None,
+        cancel: CancellationToken | None = None,
+    ) -> int:
         """
-        Read from the device at pad (primary gpib address)
+        Write a message to the device at pad, that is produced piecewise, for example a waveform or a calibration
+        table read from a file. The data is sent as a single message, EOI is asserted with the last byte only. Only
+        a few frames are buffered, so the message does not need to fit into memory. Messages longer than a single
+        frame are experimental: all but the last frame are sent with the undocumented flags `FLAGS_NO_EOI`, that
+        are assumed to suppress EOI.
         Parameters
         ----------
         pad: int
-            The device pad
-        delay: float
-            The time in seconds to wait after issuing the read request for the device before attempting to read back
-            the answer.
+            The primary address of the device
+        data: Iterable of bytes-like objects or binary file or bytes-like object
+            The parts of the message or a file opened in binary mode, that is read until the end
+        timeout: float, optional
+            The time in seconds the call may take. It replaces the timeout of the driver for this call.
+        deadline: float, optional
+            The time of `time.monotonic()`, when the call must be finished. If a timeout is given as well, the
+            earlier of both applies.
+        cancel: CancellationToken, optional
+            A token to abort the call from another thread
         Returns
         -------
-        bytearray
+        int
+            The number of bytes sent to the device
+        Raises
+        ------
+        TimeoutError
+            If the deadline has passed. The device then has received an incomplete message without EOI.
+        OperationCancelled
+            If the call was cancelled. The device then has received an incomplete message without EOI.
+        """
+        chunks: Iterable[bytes | bytearray | memoryview]
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            chunks = (data,)
+        elif hasattr(data, "read"):
+            file = cast(BinaryIO, data)
+            chunks = iter(functools.partial(file.read, self._STREAM_CHUNK_SIZE), b"")
+        else:
+            chunks = cast("Iterable[bytes | bytearray | memoryview]", data)
+        start = time.monotonic()
+        with self.__call_limits(timeout, deadline, cancel):
+            total = self.__send_message(pad, chunks)
+        self.__last_write_time[pad] = now = time.monotonic()
+        self.metrics.record_command(UgPlusCommands.WRITE, now - start)
+        return total
 
+    def _request_read(self, pad: int) -> None:
+        """
+        Send a read request to the device at pad. The reply must be collected using `_read_reply()` before issuing
+        any other command.
+        Parameters
+        ----------
+        pad: int
+            The device pad
         """
         # Prepare read request command
-        payload = bytes([pad, 0x0F])
+        payload = bytes((pad, FLAGS_EOI))
 
         # Request read
+        self.__read_request_time = time.monotonic()
         self.__device_write(UgPlusCommands.READ, payload)
 
-        # Delay if necessary
-        time.sleep(delay)
+    def add_read_listener(self, listener: Callable[[int, bool], None]) -> None:
+        """
+        Register a function, that is called with the pad and the outcome of every reply read from a device. The outcome
+        is True, if the device sent data, and False, if the adapter reported an error. Timeouts are not reported and
+        neither are the failed polls of an adaptive read, unless the device did not answer at all. The listener is
+        called from the thread reading, so it should return quickly.
+        Parameters
+        ----------
+        listener: Callable
+            The function to call
+        """
+        self.__read_listeners.append(listener)
 
+    def remove_read_listener(self, listener: Callable[[int, bool], None]) -> None:
+        """
+        Unregister a function previously registered using `add_read_listener()`.
+        Parameters
+        ----------
+        listener: Callable
+            The function to remove
+        """
+        self.__read_listeners.remove(listener)
+
+    def __notify_read_listeners(self, pad: int, success: bool) -> None:
+        for listener in self.__read_listeners:
+            listener(pad, success)
+
+    def _read_reply(self, pad: int, more_replies_pending: bool = False, expect_failure: bool = False) -> bytes | None:
+        """
+        Read the reply to a read request previously sent using `_request_read()`.
+        Parameters
+        ----------
+        pad: int
+            The device pad
+        more_replies_pending: bool, default=False
+            Set, if more replies are expected after this one. Otherwise, bytes left in the USB read buffer after the
+            reply are stale and discarded, so that they cannot be mistaken for the next reply.
+        expect_failure: bool, default=False
+            Set, if the caller polls the device and expects it not to have answered yet. A failure is not reported to
+            the read listeners then.
+        Returns
+        -------
+        bytes or None
+            The data read or None if there was an error.
+        """
         # Read data sent from GPIB device
         try:
             byte_data = self.__device_read(UgPlusCommands.READ)
-        except USBError as exc:
+        except OSError as exc:
             if exc.errno == errno.ETIMEDOUT:
                 self.__logger.error("Reading from device timed out.")
                 return None
@@ -362,17 +1330,32 @@ class UGPlusGpib:
         if byte_data is None:
             return None
 
+        latency = time.monotonic() - self.__read_request_time
+        self.metrics.record_command(UgPlusCommands.READ, latency)
+        self.metrics.record_pad(pad, latency)
+
         # Strip the next two bytes, because the actual payload is prepended by a header containing the GPIB device ID
         # and a delimiter
         # addr = byte_data[0]
         success = byte_data[1] != 0x0A
+        if success or not expect_failure:
+            self.__notify_read_listeners(pad, success)
+
+        if self.__logger.isEnabledFor(logging.DEBUG):
+            self.__logger.debug(
+                "Final USB read buffer size: %(size_of_buffer)s.",
+                {"size_of_buffer": self.__usb_read_end - self.__usb_read_start},
+            )
 
-        self.__logger.debug("Final USB read buffer: %(buffer)s.", {"buffer": self.__usb_read_buf})
+        if not more_replies_pending and self.__usb_read_end > self.__usb_read_start:
+            self.__logger.warning(
+                "Discarding %(stale)d stale bytes after the reply.",
+                {"stale": self.__usb_read_end - self.__usb_read_start},
+            )
+            self.metrics.discarded_bytes += self.__usb_read_end - self.__usb_read_start
+            self.__clear_usb_read_buf()
 
         if not success:
-            if len(self.__usb_read_buf) > 0:
-                self.__logger.debug("Clearing USB read buffer.")
-                self.__usb_read_buf = bytearray()  # clear usb read buffer
             raise OSError(
                 errno.EIO, f"I/O error: Cannot read from GPIB device at address {pad}. Is the device attached?"
             )
@@ -386,3 +1369,485 @@ class UGPlusGpib:
         # byte_data = binascii.b2a_qp(byte_data)
 
         return byte_data
+
+    def __read_adaptive(self, pad: int) -> bytes | None:
+        """
+        Read from the device at pad, using the latency scheduler to decide when to poll for the answer.
+        """
+        scheduler = self.latency_scheduler
+        start = self.__last_write_time.pop(pad, None)
+        if start is None:
+            start = time.monotonic()
+        deadline = start + scheduler.max_wait
+        if self.__deadline is not None:
+            deadline = min(deadline, self.__deadline)
+
+        # Skip the time the device will most likely need to answer, then poll in short intervals
+        remaining_delay = start + scheduler.initial_delay(pad) - time.monotonic()
+        if remaining_delay > 0:
+            self.__sleep(remaining_delay)
+        while True:
+            self._request_read(pad)
+            try:
+                byte_data = self._read_reply(pad, expect_failure=True)
+            except OSError as exc:
+                # The device has not answered (yet). USB errors are not retried.
+                if _is_usb_error(exc):
+                    raise
+                if time.monotonic() + scheduler.poll_interval > deadline:
+                    # Only report the device to the read listeners, if it did not answer at all. The learned
+                    # latencies are discarded, because the device might have been replaced or reconfigured.
+                    self.__notify_read_listeners(pad, False)
+                    scheduler.reset(pad)
+                    raise
+                self.__sleep(scheduler.poll_interval)
+                continue
+            if byte_data is not None:
+                scheduler.record(pad, time.monotonic() - start)
+            return byte_data
+
+    @_recoverable(idempotent=False)
+    def read(  # pylint: disable=too-many-arguments
+        self,
+        pad: int,
+        delay: float = 0,
+        adaptive: bool = False,
+        *,
+        timeout: float | None = None,
+        deadline: float | None = None,
+        cancel: CancellationToken | None = None,
+    ) -> bytes | None:
+        """
+        Read from the device at pad (primary gpib address). If the deadline passes or the call is cancelled while
+        waiting for the reply, the reply is skipped, when it arrives later.
+        Parameters
+        ----------
+        pad: int
+            The device pad
+        delay: float
+            The time in seconds to wait after issuing the read request for the device before attempting to read back
+            the answer.
+        adaptive: bool, default=False
+            Instead of waiting for a fixed delay, wait for the typical response time of the device, then poll the
+            device until it answers or `latency_scheduler.max_wait` has passed since the last write to the device.
+            If the device does not answer in time, its learned response times are discarded. The delay parameter is
+            ignored.
+        timeout: float, optional
+            The time in seconds the call may take. It replaces the timeout of the driver for this call.
+        deadline: float, optional
+            The time of `time.monotonic()`, when the call must be finished. If a timeout is given as well, the
+            earlier of both applies.
+        cancel: CancellationToken, optional
+            A token to abort the call from another thread
+        Returns
+        -------
+        bytes or None
+            The data read or None if there was an error or the deadline has passed.
+        Raises
+        ------
+        OperationCancelled
+            If the call was cancelled
+        """
+        with self.__call_limits(timeout, deadline, cancel):
+            if adaptive:
+                return self.__read_adaptive(pad)
+
+            self._request_read(pad)
+
+            # Delay if necessary
+            try:
+                self.__sleep(delay)
+            except OSError:
+                self.__orphan_reply(UgPlusCommands.READ)
+                raise
+
+            return self._read_reply(pad)
+
+    @_recoverable(idempotent=False)
+    def query(  # pylint: disable=too-many-arguments
+        self,
+        pad: int,
+        data: bytes | bytearray | memoryview,
+        delay: float = 0,
+        adaptive: bool = False,
+        *,
+        timeout: float | None = None,
+        deadline: float | None = None,
+        cancel: CancellationToken | None = None,
+    ) -> bytes | None:
+        """
+        Write data to the device at pad and read back the answer. If the query was registered with the query cache,
+        a cached answer is returned without accessing the bus. The deadline applies to the write and the read.
+        Parameters
+        ----------
+        pad: int
+            The primary address of the device
+        data: bytes or bytearray or memoryview
+            The data to send to the device.
+        delay: float
+            The time in seconds to wait after issuing the read request for the device before attempting to read back
+            the answer.
+        adaptive: bool, default=False
+            Use the latency scheduler instead of a fixed delay. See `read()` for details.
+        timeout: float, optional
+            The time in seconds the call may take. It replaces the timeout of the driver for this call.
+        deadline: float, optional
+            The time of `time.monotonic()`, when the call must be finished. If a timeout is given as well, the
+            earlier of both applies.
+        cancel: CancellationToken, optional
+            A token to abort the call from another thread
+        Returns
+        -------
+        bytes or None
+            The data read or None if there was an error or the deadline has passed while reading.
+        Raises
+        ------
+        TimeoutError
+            If the deadline has passed before the query was written
+        OperationCancelled
+            If the call was cancelled
+        """
+        # The key must be hashable, but the query may be any bytes-like object
+        key = (pad, bytes(data))
+        with self.__call_limits(timeout, deadline, cancel):
+            if self.query_cache.is_registered(key):
+                reply = self.query_cache.get(key)
+                if reply is None:
+                    self.write(pad, data)
+                    reply = self.read(pad, delay, adaptive)
+                    self.query_cache.put(key, reply)
+                return reply
+            self.write(pad, data)
+            return self.read(pad, delay, adaptive)
+
+    def query_many(self, pad: int, commands: Iterable[bytes], batch_size: int = 16) -> list[bytes | None]:
+        """
+        Send several queries to the device at pad and read back the answers. See `query_batch()` for details.
+        Parameters
+        ----------
+        pad: int
+            The primary address of the device
+        commands: Iterable of bytes
+            The queries to send to the device.
+        batch_size: int, default=16
+            The maximum number of queries sent to the adapter in a single USB transfer
+        Returns
+        -------
+        list of bytes or None
+            The answers in the same order as the commands. An answer is None, if there was an error.
+        """
+        return self.query_batch([(pad, command) for command in commands], batch_size)
+
+    @_recoverable(idempotent=False)
+    def query_batch(
+        self, queries: Sequence[tuple[int, bytes]], batch_size: int = 16, *, raise_errors: bool = True
+    ) -> list[bytes | None]:
+        """
+        Send several queries to one or more devices and read back the answers. The WRITE and READ requests of up to
+        `batch_size` queries are packed into a single USB transfer, then the replies are read back in order.
+        Parameters
+        ----------
+        queries: Sequence of tuple of int and bytes
+            The primary address and the query for each device
+        batch_size: int, default=16
+            The maximum number of queries sent to the adapter in a single USB transfer
+        raise_errors: bool, default=True
+            Raise an error, if a device did not answer. Otherwise, the answer of that device is None.
+        Returns
+        -------
+        list of bytes or None
+            The answers in the same order as the queries. An answer is None, if there was an error.
+        Raises
+        ------
+        OSError
+            If one of the devices did not answer and `raise_errors` is set. The error is raised after all replies have
+            been read, so that no reply is left behind.
+        ValueError
+            If a query is longer than `MAX_WRITE_DATA` bytes. Nothing is sent to the adapter in this case.
+        """
+        assert batch_size > 0
+        # Check all queries first, so that nothing is sent to the bus, if one of them is invalid
+        for pad, data in queries:
+            if len(data) > MAX_WRITE_DATA:
+                raise ValueError(
+                    f"The query of {len(data)} bytes to the device at address {pad} does not fit into a frame. Queries "
+                    f"in a batch must not be longer than {MAX_WRITE_DATA} bytes."
+                )
+        if self.write_ep is None:
+            self.connect()
+        results: list[bytes | None] = []
+        error: OSError | None = None
+        transfer = bytearray()
+        for batch_start in range(0, len(queries), batch_size):
+            batch = queries[batch_start : batch_start + batch_size]
+            transfer.clear()
+            for pad, data in batch:
+                self.__codec.encode_into(transfer, UgPlusCommands.WRITE, bytes((pad, FLAGS_EOI)) + data, aligned=True)
+                self.__codec.encode_into(transfer, UgPlusCommands.READ, bytes((pad, FLAGS_EOI)), aligned=True)
+            self.__logger.debug(
+                "Sending %(no_queries)d queries in a single transfer of %(length)d bytes.",
+                {"no_queries": len(batch), "length": len(transfer)},
+            )
+            self.__read_request_time = time.monotonic()
+            self.__usb_write(transfer)
+
+            # Demultiplex the replies. They arrive in the same order as the requests.
+            for pad, _ in batch:
+                try:
+                    # Stale bytes are only discarded after the last reply of all batches
+                    results.append(self._read_reply(pad, more_replies_pending=len(results) + 1 < len(queries)))
+                except OSError as exc:
+                    if _is_usb_error(exc) or exc.errno == errno.EPROTO:
+                        # The reply stream is lost
+                        raise
+                    results.append(None)
+                    if error is None:
+                        error = exc
+        if error is not None and raise_errors:
+            raise error
+        return results
+
+    def __read_chunk(self, pad: int, delay: float = 0) -> bytes:
+        """
+        Read from the device at pad and raise an exception instead of returning None on timeouts.
+        """
+        byte_data = self.read(pad, delay)
+        if byte_data is None:
+            raise TimeoutError(errno.ETIMEDOUT, f"Timeout while reading from GPIB device at address {pad}.")
+        return byte_data
+
+    def __start_binary_block(self, pad: int, delay: float, termination: bytes) -> tuple[int, Iterator[memoryview]]:
+        """
+        Read the header of an IEEE 488.2 definite length arbitrary block (#<n><length><data>).
+        Parameters
+        ----------
+        pad: int
+            The device pad
+        delay: float
+            The time in seconds to wait before reading back the first chunk.
+        termination: bytes
+            The message terminator following the block
+        Returns
+        -------
+        tuple of int and Iterator of memoryview
+            The length of the block in bytes and an iterator over the payload chunks
+        """
+        # The header is short, but might be split across multiple READ replies
+        header = bytearray(self.__read_chunk(pad, delay))
+        while len(header) < 2:
+            header += self.__read_chunk(pad)
+        if header[0] != ord("#") or not 0x31 <= header[1] <= 0x39:  # The number of digits must be 1-9
+            raise ValueError(f"Invalid IEEE 488.2 definite length block header: {bytes(header[:12])!r}.")
+        header_length = 2 + header[1] - 0x30
+        while len(header) < header_length:
+            header += self.__read_chunk(pad)
+        length = int(header[2:header_length])
+
+        payload = memoryview(header)[header_length : header_length + length]
+        trailer = bytearray(header[header_length + length :])
+        return length, self.__iter_block_payload(pad, payload, length - len(payload), trailer, termination)
+
+    def __iter_block_payload(  # pylint: disable=too-many-arguments
+        self, pad: int, payload: memoryview, remaining: int, trailer: bytearray, termination: bytes
+    ) -> Iterator[memoryview]:
+        """
+        Yield the first payload chunk, then read the remaining bytes from the device. Finally, read the message
+        terminator, if it did not arrive with the last chunk, so that it is not mistaken for the reply to the next read.
+        """
+        if payload:
+            yield payload
+        while remaining > 0:
+            # Anything past the end of the block is the message terminator
+            chunk = memoryview(self.__read_chunk(pad))
+            trailer += chunk[remaining:]
+            chunk = chunk[:remaining]
+            remaining -= len(chunk)
+            yield chunk
+        while not trailer.endswith(termination):
+            trailer += self.__read_chunk(pad)
+
+    def iter_binary_block(
+        self, pad: int, delay: float = 0, *, termination: bytes = b"\n"
+    ) -> Generator[memoryview, None, None]:
+        """
+        Read an IEEE 488.2 definite length arbitrary block (#<n><length><data>) from the device at pad and yield the
+        payload as it arrives. The header and the message terminator are stripped. The terminator is read, once the
+        last chunk has been consumed, even if the device sends it in a separate READ reply.
+        Parameters
+        ----------
+        pad: int
+            The device pad
+        delay: float
+            The time in seconds to wait after issuing the first read request before attempting to read back the
+            answer.
+        termination: bytes, default=b"\\n"
+            The message terminator sent by the device after the block. Use b"" for devices, that end the block with
+            EOI only.
+        Yields
+        -------
+        memoryview
+            The payload chunks. Each chunk is at most one READ reply long.
+        Raises
+        ------
+        ValueError
+            If the reply does not start with a definite length block header
+        TimeoutError
+            If the device stops sending data before the end of the block or the terminator
+        """
+        _, chunks = self.__start_binary_block(pad, delay, termination)
+        yield from chunks
+
+    @_recoverable(idempotent=False)
+    def read_binary_block(  # pylint: disable=too-many-arguments
+        self, pad: int, dtype: Any = "B", out: Any = None, delay: float = 0, *, termination: bytes = b"\n"
+    ) -> Any:
+        """
+        Read an IEEE 488.2 definite length arbitrary block (#<n><length><data>) from the device at pad. The payload is
+        copied straight into a preallocated array, without concatenating the chunks first.
+        Parameters
+        ----------
+        pad: int
+            The device pad
+        dtype: numpy.dtype or str, default="B"
+            The data type of the block, for example ">f4" for big-endian single precision floats. Ignored if `out` is
+            given.
+        out: numpy.ndarray or writable buffer, optional
+            A C-contiguous buffer to write the payload to. If not given, a new numpy array is created, which
+            requires numpy.
+        delay: float
+            The time in seconds to wait after issuing the first read request before attempting to read back the
+            answer.
+        termination: bytes, default=b"\\n"
+            The message terminator sent by the device after the block. It is read, even if it arrives in a separate
+            READ reply. Use b"" for devices, that end the block with EOI only.
+        Returns
+        -------
+        numpy.ndarray or writable buffer
+            The array or `out` if it was given
+        Raises
+        ------
+        ValueError
+            If the reply does not start with a definite length block header or the block does not fit the buffer
+        TimeoutError
+            If the device stops sending data before the end of the block or the terminator
+        """
+        length, chunks = self.__start_binary_block(pad, delay, termination)
+        if out is None:
+            try:
+                import numpy  # pylint: disable=import-outside-toplevel
+            except ImportError as exc:
+                raise ImportError("read_binary_block() requires numpy, unless a buffer is given.") from exc
+            dtype = numpy.dtype(dtype)
+            if length % dtype.itemsize:
+                raise ValueError(f"The block length of {length} bytes is not a multiple of the size of {dtype}.")
+            out = numpy.empty(length // dtype.itemsize, dtype=dtype)
+
+        target = memoryview(out).cast("B")
+        if target.nbytes < length:
+            raise ValueError(f"The block length of {length} bytes exceeds the buffer size of {target.nbytes} bytes.")
+        position = 0
+        for chunk in chunks:
+            target[position : position + len(chunk)] = chunk
+            position += len(chunk)
+        return out
+
+    def __read_message(self, pad: int, termination: bytes, delay: float) -> bytearray:
+        """
+        Read from the device at pad until the reply ends with the termination characters.
+        """
+        message = bytearray(self.__read_chunk(pad, delay))
+        while not message.endswith(termination):
+            message += self.__read_chunk(pad)
+        return message
+
+    @_recoverable(idempotent=False)
+    def read_values(
+        self, pad: int, separator: str = ",", dtype: Any = float, *, termination: bytes = b"\n", delay: float = 0
+    ) -> Any:
+        """
+        Read a list of ASCII encoded numbers, like "1.0,2.0,3.0\\n", from the device at pad and parse it into a numpy
+        array. The reply may span several READ replies and is read until it ends with the termination characters. The
+        numbers are parsed by `numpy.loadtxt()` without creating a Python object per value.
+        Parameters
+        ----------
+        pad: int
+            The device pad
+        separator: str, default=","
+            The separator between the values. Whitespace around the separator is ignored. A whitespace separator
+            also matches runs of whitespace.
+        dtype: numpy.dtype or type, default=float
+            The data type of the array
+        termination: bytes, default=b"\\n"
+            The message terminator sent by the device
+        delay: float
+            The time in seconds to wait after issuing the first read request before attempting to read back the
+            answer.
+        Returns
+        -------
+        numpy.ndarray
+            The values read
+        Raises
+        ------
+        ValueError
+            If the reply cannot be parsed, for example if a field is empty or not a number
+        TimeoutError
+            If the device stops sending data before the message is terminated
+        """
+        import numpy  # pylint: disable=import-outside-toplevel
+
+        message = bytes(self.__read_message(pad, termination, delay))
+        if termination:
+            message = message[: -len(termination)]
+        if not message.strip():
+            return numpy.empty(0, dtype=dtype)
+        # Runs of whitespace are a single separator, like in str.split()
+        delimiter = separator.strip() or None
+        # numpy rejects empty fields, but an empty last field is checked explicitly, because it is a common mistake
+        if delimiter is not None and message.rstrip().endswith(delimiter.encode("ascii")):
+            raise ValueError(
+                f"Invalid reply from GPIB device at address {pad}: {message[-40:]!r} ends with a separator."
+            )
+        try:
+            values = numpy.loadtxt(io.BytesIO(message), dtype=dtype, delimiter=delimiter, comments=None, ndmin=1)
+        except ValueError as exc:
+            raise ValueError(f"Invalid reply from GPIB device at address {pad}: {exc}") from exc
+        if values.ndim != 1:
+            raise ValueError(f"Invalid reply from GPIB device at address {pad}: The values span several lines.")
+        return values
+
+    @_recoverable(idempotent=False)
+    def query_values(  # pylint: disable=too-many-arguments
+        self,
+        pad: int,
+        data: bytes,
+        separator: str = ",",
+        dtype: Any = float,
+        *,
+        termination: bytes = b"\n",
+        delay: float = 0,
+    ) -> Any:
+        """
+        Write data to the device at pad and read back a list of ASCII encoded numbers. See `read_values()` for
+        details.
+        Parameters
+        ----------
+        pad: int
+            The device pad
+        data: bytes
+            The data to send to the device.
+        separator: str, default=","
+            The separator between the values. Whitespace around the separator is ignored.
+        dtype: numpy.dtype or type, default=float
+            The data type of the array
+        termination: bytes, default=b"\\n"
+            The message terminator sent by the device
+        delay: float
+            The time in seconds to wait after issuing the first read request before attempting to read back the
+            answer.
+        Returns
+        -------
+        numpy.ndarray
+            The values read
+        """
+        self.write(pad, data)
+        return self.read_values(pad, separator, dtype, termination=termination, delay=delay)